@@ -1,17 +1,25 @@
 from django.contrib import admin
-from .models import TrafficEvent, SystemStatus
+from .models import TrafficEvent, SystemStatus, TrafficRollup
 
 
 @admin.register(TrafficEvent)
 class TrafficEventAdmin(admin.ModelAdmin):
-    list_display = ['timestamp', 'direction', 'event_type', 'vehicles_detected']
-    list_filter = ['direction', 'event_type', 'timestamp']
+    list_display = ['timestamp', 'intersection', 'direction', 'event_type', 'vehicles_detected']
+    list_filter = ['intersection', 'direction', 'event_type', 'timestamp']
     search_fields = ['description']
     ordering = ['-timestamp']
 
 
 @admin.register(SystemStatus)
 class SystemStatusAdmin(admin.ModelAdmin):
-    list_display = ['is_running', 'direction_1_light', 'direction_2_light', 'last_update']
+    list_display = ['intersection', 'is_running', 'direction_1_light', 'direction_2_light', 'last_update']
     list_filter = ['is_running']
     ordering = ['-last_update']
+
+
+@admin.register(TrafficRollup)
+class TrafficRollupAdmin(admin.ModelAdmin):
+    list_display = ['period_start', 'period', 'intersection', 'direction', 'vehicles_detected',
+                    'light_changes', 'green_seconds']
+    list_filter = ['period', 'intersection', 'direction']
+    ordering = ['-period_start']
@@ -0,0 +1,331 @@
+"""
+Detection Worker Processes Module
+Runs capture and detection for a camera in its own process
+"""
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from .frame_hub import FrameHub
+from . import metrics
+
+logger = logging.getLogger('traffic_control')
+
+# Frames kept in the shared-memory ring per camera
+RING_SLOTS = 4
+
+# Seconds to wait for a worker to open its camera
+WORKER_START_TIMEOUT = 15
+
+# Interval between worker statistics messages (seconds)
+STATS_INTERVAL = 1.0
+
+
+def _ring_views(buffer, slot_bytes):
+    """
+    Map the slot headers and frame slots onto a shared-memory buffer.
+
+    Layout: RING_SLOTS int64 sequence numbers followed by RING_SLOTS frames.
+
+    Args:
+        buffer: SharedMemory.buf
+        slot_bytes: Bytes reserved per frame
+
+    Returns:
+        tuple: (headers, slots) NumPy views
+    """
+    headers = np.ndarray((RING_SLOTS,), dtype=np.int64, buffer=buffer)
+    slots = np.ndarray((RING_SLOTS, slot_bytes), dtype=np.uint8, buffer=buffer,
+                       offset=headers.nbytes)
+    return headers, slots
+
+
+def camera_worker(camera_index, detector_options, results, stop_event):
+    """
+    Worker process entry point: capture, detect and publish frames.
+
+    The shared-memory ring is created here once the first frame arrives and
+    sized from it, so cameras that ignore the requested resolution and
+    recordings of any size fit; its name is sent with the ready message.
+    Each frame is written into the next ring slot using the slot header as a
+    sequence lock (-1 while writing), then announced on the results queue.
+    A frame larger than the first one (the source changed resolution) is
+    reported once and ends the worker, so the hub shows the camera inactive.
+
+    Args:
+        camera_index: Camera device index
+        detector_options: VehicleDetector keyword arguments
+        results: Queue for ready/frame/stats messages to the parent
+        stop_event: Set by the parent to stop the worker
+    """
+    from .vehicle_detector import VehicleDetector
+
+    detector = VehicleDetector(camera_index=camera_index, **detector_options)
+    shm = None
+    headers = slots = None
+
+    try:
+        if not detector.start():
+            results.put(('failed', f'camera {camera_index} not available'))
+            return
+
+        frame = None
+        while frame is None:
+            if stop_event.is_set():
+                return
+            time.sleep(0.005)
+            frame = detector.detect_vehicles()[1]
+        slot_bytes = frame.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=RING_SLOTS * 8 + RING_SLOTS * slot_bytes)
+        headers, slots = _ring_views(shm.buf, slot_bytes)
+        headers[:] = 0
+        results.put(('ready', os.getpid(), shm.name, slot_bytes))
+
+        sequence = 0
+        last_frame = None
+        detect_times = deque(maxlen=100)
+        window_start = time.monotonic()
+        window_frames = 0
+
+        while not stop_event.is_set():
+            started = time.monotonic()
+            vehicle_count, frame = detector.detect_vehicles()
+            if frame is None or frame is last_frame:
+                time.sleep(0.005)
+                continue
+            last_frame = frame
+            detect_times.append((time.monotonic() - started) * 1000)
+            captured_at = started - (detector.last_frame_age or 0.0)
+
+            if frame.nbytes > slot_bytes:
+                results.put(('failed', f'frame {frame.shape} is larger than the first frame '
+                                       f'({slot_bytes} bytes per ring slot)'))
+                return
+
+            sequence += 1
+            slot = sequence % RING_SLOTS
+            headers[slot] = -1
+            slots[slot, :frame.nbytes] = frame.reshape(-1)
+            headers[slot] = sequence
+            results.put(('frame', slot, sequence, vehicle_count, frame.shape, captured_at))
+
+            window_frames += 1
+            elapsed = time.monotonic() - window_start
+            if elapsed >= STATS_INTERVAL:
+                stats = detector.get_capture_stats()
+                stats.update({
+                    'pid': os.getpid(),
+                    'fps': window_frames / elapsed,
+                    'detect_ms_avg': float(np.mean(detect_times)),
+                    'detect_ms_p95': float(np.percentile(detect_times, 95)),
+                    'metrics': metrics.snapshot(),
+                })
+                results.put(('stats', stats))
+                window_start = time.monotonic()
+                window_frames = 0
+
+    except Exception as e:
+        logger.error(f"Detection worker for camera {camera_index} failed: {e}")
+        results.put(('failed', str(e)))
+    finally:
+        detector.stop()
+        if shm is not None:
+            headers = slots = None
+            shm.close()
+            shm.unlink()
+
+
+class ProcessFrameHub(FrameHub):
+    """
+    FrameHub whose capture and detection run in a dedicated worker process.
+
+    Frames come back through a shared-memory ring instead of being pickled;
+    only small result tuples travel over the queue. Each camera gets its own
+    core, so two cameras no longer compete with each other or with Django
+    request threads for the GIL. Note that the DNN backend cannot batch
+    across cameras in this mode since each worker owns its own network.
+    """
+
+    def __init__(self, camera_index=0, **detector_options):
+        """
+        Initialize process-backed frame hub.
+
+        Args:
+            camera_index: Camera device index
+            **detector_options: VehicleDetector arguments for the worker
+        """
+        super().__init__(camera_index=camera_index, **detector_options)
+        self.process = None
+        self.slot_bytes = None  # Sized by the worker from its first frame
+        self.frames_torn = 0
+        self.worker_stats = {}
+
+        self._context = multiprocessing.get_context('spawn')
+        self._shm = None
+        self._headers = None
+        self._slots = None
+        self._results = None
+        self._stop_event = None
+        self._transfer_ms = deque(maxlen=100)
+
+    def _create_detector(self):
+        """Detection happens in the worker process."""
+        return None
+
+    @property
+    def is_active(self):
+        """True while the worker process is delivering frames."""
+        return self.is_running and self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """Start the worker process and wait until its camera is open."""
+        if self.is_running:
+            return self.is_active
+
+        self._results = self._context.Queue()
+        self._stop_event = self._context.Event()
+
+        self.process = self._context.Process(
+            target=camera_worker,
+            args=(self.camera_index, self.detector_options, self._results, self._stop_event),
+            daemon=True
+        )
+        self.process.start()
+
+        try:
+            message = self._results.get(timeout=WORKER_START_TIMEOUT)
+        except queue.Empty:
+            message = ('failed', 'timed out waiting for worker')
+
+        if message[0] == 'ready':
+            _, _, shm_name, self.slot_bytes = message
+            try:
+                self._shm = shared_memory.SharedMemory(name=shm_name)
+                self._headers, self._slots = _ring_views(self._shm.buf, self.slot_bytes)
+            except FileNotFoundError:
+                message = ('failed', 'worker exited before sharing its frame ring')
+
+        if message[0] != 'ready':
+            logger.info(f"Camera {self.camera_index} worker not available: {message[1]}")
+            self._shutdown_worker()
+            return False
+
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._process_loop,
+                                              name=f'frame-hub-{self.camera_index}', daemon=True)
+        self.worker_thread.start()
+        logger.info(f"Detection worker for camera {self.camera_index} started (pid {message[1]})")
+        return True
+
+    def stop(self):
+        """Stop the worker process, free shared memory and wake up all waiters."""
+        self.is_running = False
+        self.is_closed = True
+
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=2)
+        self.worker_thread = None
+        self._shutdown_worker()
+
+        with self._condition:
+            self._condition.notify_all()
+        logger.info(f"Frame hub for camera {self.camera_index} stopped")
+
+    def _shutdown_worker(self):
+        """Terminate the worker and release the shared-memory ring."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self.process is not None:
+            self.process.join(timeout=3)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1)
+            self.process = None
+
+        if self._shm is not None:
+            self._headers = None
+            self._slots = None
+            self._shm.close()
+            try:
+                # The worker unlinks its ring on exit, unless it had to be terminated
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+    def _process_loop(self):
+        """Receive worker messages and publish frames copied out of the ring."""
+        while self.is_running:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    logger.error(f"Detection worker for camera {self.camera_index} exited")
+                    self.is_running = False
+                continue
+
+            try:
+                kind = message[0]
+                if kind == 'frame':
+                    _, slot, sequence, vehicle_count, shape, captured_at = message
+                    frame = self._read_slot(slot, sequence, shape)
+                    if frame is not None:
+                        self._transfer_ms.append((time.monotonic() - captured_at) * 1000)
+                        self._publish(vehicle_count, frame)
+                elif kind == 'stats':
+                    stats = message[1]
+                    # Stage histograms of the worker appear in this process's /metrics
+                    metrics.merge_remote(('worker', self.camera_index), stats.pop('metrics', {}))
+                    self.worker_stats = stats
+                elif kind == 'failed':
+                    logger.error(f"Detection worker for camera {self.camera_index}: {message[1]}")
+            except Exception as e:
+                logger.error(f"Error in frame hub for camera {self.camera_index}: {e}")
+
+    def _read_slot(self, slot, sequence, shape):
+        """
+        Copy a frame out of the ring if the worker has not overwritten it.
+
+        Args:
+            slot: Ring slot index
+            sequence: Sequence number announced by the worker
+            shape: Frame shape
+
+        Returns:
+            ndarray or None: Private copy of the frame, or None if it was torn
+        """
+        if self._headers[slot] != sequence:
+            self.frames_torn += 1
+            return None
+        nbytes = math.prod(shape)
+        frame = self._slots[slot, :nbytes].reshape(shape).copy()
+        if self._headers[slot] != sequence:
+            self.frames_torn += 1
+            return None
+        return frame
+
+    def get_stats(self):
+        """
+        Get hub and worker statistics.
+
+        Returns:
+            dict: Worker FPS/latency, capture stats and transfer latency
+        """
+        stats = dict(self.worker_stats)
+        transfer = list(self._transfer_ms)
+        stats.update({
+            'camera_index': self.camera_index,
+            'process_worker': True,
+            'subscribers': self.subscribers,
+            'frames_published': self._sequence,
+            'frames_torn': self.frames_torn,
+            'latency_ms_avg': float(np.mean(transfer)) if transfer else None,
+            'latency_ms_p95': float(np.percentile(transfer, 95)) if transfer else None,
+        })
+        return stats
@@ -0,0 +1,514 @@
+"""
+Detector Backends Module
+Interchangeable vehicle detection algorithms used by VehicleDetector
+"""
+import threading
+import time
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger('traffic_control')
+
+# Minimum contour area for a vehicle at full resolution (pixels)
+MIN_VEHICLE_AREA = 1000
+
+# COCO vehicle classes (car, motorcycle, bus, truck) per model output layout
+VEHICLE_CLASS_IDS = {
+    'yolov5': (2, 3, 5, 7),
+    'yolov8': (2, 3, 5, 7),
+    'ssd': (3, 4, 6, 8),  # SSD exports keep the background class at 0
+}
+
+# Shared DNN backends keyed by model path
+_dnn_backends = {}
+_dnn_backends_lock = threading.Lock()
+
+
+class DetectorBackend:
+    """
+    Base class for detection algorithms.
+
+    A backend turns a full-resolution frame into a list of boxes
+    (x, y, w, h, confidence) in frame pixels.
+    """
+
+    # True if the backend already restricts detections to the ROI
+    applies_roi = False
+
+    # (stage, seconds) pairs of the last detect() call, or None if not broken down
+    stage_times = None
+
+    def attach(self):
+        """Called when a camera starts feeding this backend."""
+
+    def detach(self):
+        """Called when a camera stops feeding this backend."""
+
+    def detect(self, frame):
+        """
+        Detect vehicles in a frame.
+
+        Args:
+            frame: Full-resolution BGR frame
+
+        Returns:
+            list: Boxes as (x, y, w, h, confidence)
+        """
+        raise NotImplementedError
+
+
+class MotionBackend(DetectorBackend):
+    """Background subtraction (MOG2) with morphology and contour filtering."""
+
+    applies_roi = True
+
+    def __init__(self, roi=None, detection_scale=1.0):
+        """
+        Initialize motion backend.
+
+        Args:
+            roi: Region of interest polygon as [(x, y), ...] in frame pixels,
+                 or None to use the whole frame
+            detection_scale: Resize factor applied before detection (0-1]
+
+        Raises:
+            ValueError: If the ROI is not a polygon inside the frame's quadrant
+        """
+        if roi:
+            points = np.array(roi, dtype=np.float32)
+            if points.ndim != 2 or points.shape[0] < 3 or points.shape[1] != 2:
+                raise ValueError(f"ROI must be a polygon of at least 3 (x, y) points: {roi}")
+            if points[:, 0].max() <= 0 or points[:, 1].max() <= 0:
+                raise ValueError(f"ROI lies entirely outside the frame: {roi}")
+        self.roi = roi
+        self.detection_scale = detection_scale
+
+        # Background subtractor for motion detection
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=500,
+            varThreshold=16,
+            detectShadows=True
+        )
+
+        # Morphology kernel scaled to the detection resolution
+        kernel_size = max(3, int(round(5 * detection_scale)) | 1)
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+        self.min_area = MIN_VEHICLE_AREA * detection_scale * detection_scale
+
+        # ROI crop, mask and output buffers, built once for the first frame size seen
+        self._pipeline_shape = None
+        self._detect_size = None
+        self._crop = None
+        self._roi_mask = None
+        self._resized = None
+        self._fg_mask = None
+        self._morph_mask = None
+
+    def _prepare_pipeline(self, frame_shape):
+        """
+        Precompute the detection size, ROI crop, ROI mask and the output
+        buffers reused by every detect call for a frame size.
+
+        Args:
+            frame_shape: Shape of the full-resolution frame
+        """
+        height, width = frame_shape[:2]
+        scale = self.detection_scale
+        detect_w = max(1, int(round(width * scale)))
+        detect_h = max(1, int(round(height * scale)))
+
+        crop = (0, 0, detect_w, detect_h)
+        roi_mask = None
+
+        if self.roi:
+            # Polygon in detection coordinates, cropped to its bounding box
+            polygon = np.round(np.array(self.roi, dtype=np.float32) * scale).astype(np.int32)
+            x, y, w, h = cv2.boundingRect(polygon)
+            x1, y1 = max(x, 0), max(y, 0)
+            x2, y2 = min(x + w, detect_w), min(y + h, detect_h)
+            if x2 <= x1 or y2 <= y1:
+                # Checked once per frame size, so a mismatched ROI is reported once
+                logger.error(f"ROI {self.roi} lies outside the {width}x{height} frame; "
+                             f"no vehicles will be detected")
+                crop = None
+            else:
+                crop = (x1, y1, x2 - x1, y2 - y1)
+                roi_mask = np.zeros((crop[3], crop[2]), dtype=np.uint8)
+                cv2.fillPoly(roi_mask, [polygon - (x1, y1)], 255)
+
+        self._pipeline_shape = frame_shape
+        self._detect_size = (detect_w, detect_h)
+        self._crop = crop
+        self._roi_mask = roi_mask
+
+        # Preallocated outputs so the hot path never allocates image buffers
+        if scale != 1.0:
+            self._resized = np.empty((detect_h, detect_w) + tuple(frame_shape[2:]), dtype=np.uint8)
+        else:
+            self._resized = None
+        if crop is not None:
+            self._fg_mask = np.empty((crop[3], crop[2]), dtype=np.uint8)
+            self._morph_mask = np.empty((crop[3], crop[2]), dtype=np.uint8)
+
+    def detect(self, frame):
+        """
+        Detect moving vehicles.
+
+        Detection runs on the frame downscaled by detection_scale and cropped
+        to the ROI; boxes are mapped back to full resolution.
+
+        Args:
+            frame: Full-resolution BGR frame
+
+        Returns:
+            list: Boxes as (x, y, w, h, confidence)
+        """
+        if frame.shape != self._pipeline_shape:
+            self._prepare_pipeline(frame.shape)
+        if self._crop is None:
+            return []
+        started = time.perf_counter()
+
+        # Downscale and crop to the region of interest
+        if self._resized is not None:
+            small = cv2.resize(frame, self._detect_size, dst=self._resized,
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+        cx, cy, cw, ch = self._crop
+        region = small[cy:cy + ch, cx:cx + cw]
+        resized = time.perf_counter()
+
+        # Apply background subtraction
+        fg_mask = self._fg_mask
+        self.bg_subtractor.apply(region, fgmask=fg_mask)
+
+        # Remove shadows and noise (in place)
+        cv2.threshold(fg_mask, 244, 255, cv2.THRESH_BINARY, dst=fg_mask)
+        if self._roi_mask is not None:
+            cv2.bitwise_and(fg_mask, self._roi_mask, dst=fg_mask)
+        subtracted = time.perf_counter()
+
+        # Morphological operations to remove noise (ping-pong between buffers)
+        cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, self.kernel, dst=self._morph_mask)
+        cv2.morphologyEx(self._morph_mask, cv2.MORPH_OPEN, self.kernel, dst=fg_mask)
+        filtered = time.perf_counter()
+
+        # Find contours
+        contours, _ = cv2.findContours(
+            fg_mask,
+            cv2.RETR_EXTERNAL,
+            cv2.CHAIN_APPROX_SIMPLE
+        )
+
+        # Keep significant contours (potential vehicles)
+        boxes = []
+        inv_scale = 1.0 / self.detection_scale
+
+        for contour in contours:
+            if cv2.contourArea(contour) > self.min_area:
+                x, y, w, h = cv2.boundingRect(contour)
+                boxes.append((
+                    int((x + cx) * inv_scale),
+                    int((y + cy) * inv_scale),
+                    int(w * inv_scale),
+                    int(h * inv_scale),
+                    1.0
+                ))
+
+        self.stage_times = (
+            ('resize', resized - started),
+            ('mog2', subtracted - resized),
+            ('morphology', filtered - subtracted),
+            ('contours', time.perf_counter() - filtered),
+        )
+        return boxes
+
+
+class DNNBackend(DetectorBackend):
+    """
+    OpenCV dnn inference on a local ONNX model (YOLOv5/v8 or MobileNet-SSD).
+
+    One instance is shared by all cameras using the same model. Frames
+    submitted by different camera threads are stacked into a single blob so
+    one forward pass serves every direction.
+    """
+
+    def __init__(self, model_path, model_format='yolov8', input_size=320,
+                 confidence_threshold=0.3, nms_threshold=0.45, class_ids=None,
+                 batch_timeout=0.02):
+        """
+        Initialize DNN backend.
+
+        Args:
+            model_path: Path to the ONNX model
+            model_format: Output layout: 'yolov5', 'yolov8' or 'ssd'
+            input_size: Square network input size in pixels
+            confidence_threshold: Minimum class confidence (DETECTION_THRESHOLD)
+            nms_threshold: IoU threshold for non-maximum suppression
+            class_ids: Class ids counted as vehicles (defaults to COCO vehicles)
+            batch_timeout: Seconds to wait for the other cameras' frames
+        """
+        if model_format not in VEHICLE_CLASS_IDS:
+            raise ValueError(f"Unknown DNN model format: {model_format}")
+
+        self.model_path = str(model_path)
+        self.model_format = model_format
+        self.input_size = (input_size, input_size)
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        self.class_ids = np.array(class_ids or VEHICLE_CLASS_IDS[model_format])
+        self.batch_timeout = batch_timeout
+
+        self.net = cv2.dnn.readNetFromONNX(self.model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+        # Batching state
+        self.participants = 0
+        self.supports_batching = True
+        self.batches_run = 0
+        self.frames_inferred = 0
+        self._condition = threading.Condition()
+        self._inference_lock = threading.Lock()
+        self._pending = []
+
+        logger.info(f"DNN backend loaded {self.model_path} ({model_format}, {input_size}px)")
+
+    def attach(self):
+        """Register a camera that takes part in batched inference."""
+        with self._condition:
+            self.participants += 1
+
+    def detach(self):
+        """Unregister a camera and release anyone waiting for its frame."""
+        with self._condition:
+            self.participants = max(0, self.participants - 1)
+            self._condition.notify_all()
+
+    def detect(self, frame):
+        """
+        Submit a frame for the next batch and wait for its boxes.
+
+        The call that completes the batch (or times out waiting for it)
+        takes the pending frames and runs the forward pass for all of them
+        without holding the condition, so other cameras can already submit
+        frames for the next batch.
+
+        Args:
+            frame: Full-resolution BGR frame
+
+        Returns:
+            list: Boxes as (x, y, w, h, confidence)
+        """
+        slot = {'frame': frame, 'boxes': None, 'done': False, 'taken': False}
+
+        with self._condition:
+            self._pending.append(slot)
+
+            if len(self._pending) < self.participants:
+                self._condition.wait_for(
+                    lambda: slot['taken'] or len(self._pending) >= self.participants,
+                    timeout=self.batch_timeout
+                )
+
+            if slot['taken']:
+                # Another camera's call is running the batch with this frame
+                self._condition.wait_for(lambda: slot['done'])
+                return slot['boxes']
+
+            batch = self._pending
+            self._pending = []
+            for pending in batch:
+                pending['taken'] = True
+
+        self._run_batch(batch)
+        return slot['boxes']
+
+    def _run_batch(self, batch):
+        """
+        Run one forward pass over a batch of frames and hand out the boxes.
+
+        Args:
+            batch: Slots taken from the pending list
+        """
+        results = [[] for _ in batch]
+        try:
+            frames = [slot['frame'] for slot in batch]
+            # cv2.dnn.Net is not thread-safe - one forward pass at a time
+            with self._inference_lock:
+                if self.supports_batching or len(frames) == 1:
+                    try:
+                        outputs = self._forward(frames)
+                    except cv2.error as e:
+                        if len(frames) == 1:
+                            raise
+                        # Model exported with a fixed batch size of 1
+                        logger.warning(f"DNN model does not accept batches, running per frame: {e}")
+                        self.supports_batching = False
+                        outputs = [self._forward([f])[0] for f in frames]
+                else:
+                    outputs = [self._forward([f])[0] for f in frames]
+
+                self.batches_run += 1
+                self.frames_inferred += len(batch)
+
+            results = [self._postprocess(output, slot['frame'].shape)
+                       for slot, output in zip(batch, outputs)]
+
+        except Exception as e:
+            logger.error(f"Error in DNN inference: {e}")
+
+        finally:
+            with self._condition:
+                for slot, boxes in zip(batch, results):
+                    slot['boxes'] = boxes
+                    slot['done'] = True
+                self._condition.notify_all()
+
+    def _forward(self, frames):
+        """
+        Run the network on a list of frames.
+
+        Args:
+            frames: BGR frames
+
+        Returns:
+            list: Raw network output per frame
+        """
+        blob = cv2.dnn.blobFromImages(
+            frames,
+            scalefactor=1.0 / 255 if self.model_format != 'ssd' else 1.0 / 127.5,
+            size=self.input_size,
+            mean=(0, 0, 0) if self.model_format != 'ssd' else (127.5, 127.5, 127.5),
+            swapRB=True,
+            crop=False
+        )
+        self.net.setInput(blob)
+        output = self.net.forward()
+
+        if self.model_format == 'ssd':
+            # DetectionOutput rows are [image_id, class, conf, x1, y1, x2, y2]
+            rows = output.reshape(-1, 7)
+            return [rows[rows[:, 0] == i] for i in range(len(frames))]
+        return [output[i] for i in range(len(frames))]
+
+    def _postprocess(self, output, frame_shape):
+        """
+        Decode one frame's raw output into vehicle boxes and apply NMS.
+
+        Args:
+            output: Raw network output for one frame
+            frame_shape: Shape of the original frame
+
+        Returns:
+            list: Boxes as (x, y, w, h, confidence)
+        """
+        height, width = frame_shape[:2]
+
+        if self.model_format == 'ssd':
+            class_ids = output[:, 1].astype(np.int32)
+            scores = output[:, 2]
+            keep = (scores >= self.confidence_threshold) & np.isin(class_ids, self.class_ids)
+            rows = output[keep]
+            x1 = rows[:, 3] * width
+            y1 = rows[:, 4] * height
+            xywh = np.stack([x1, y1, rows[:, 5] * width - x1, rows[:, 6] * height - y1], axis=1)
+            scores = rows[:, 2]
+        else:
+            if self.model_format == 'yolov8':
+                # (4 + classes, anchors) -> (anchors, 4 + classes)
+                predictions = output.T
+                class_scores = predictions[:, 4:]
+            else:
+                predictions = output
+                class_scores = predictions[:, 5:] * predictions[:, 4:5]
+
+            class_ids = np.argmax(class_scores, axis=1)
+            scores = class_scores[np.arange(len(class_ids)), class_ids]
+            keep = (scores >= self.confidence_threshold) & np.isin(class_ids, self.class_ids)
+
+            boxes = predictions[keep, :4]
+            scores = scores[keep]
+            x_factor = width / self.input_size[0]
+            y_factor = height / self.input_size[1]
+            xywh = np.stack([
+                (boxes[:, 0] - boxes[:, 2] / 2) * x_factor,
+                (boxes[:, 1] - boxes[:, 3] / 2) * y_factor,
+                boxes[:, 2] * x_factor,
+                boxes[:, 3] * y_factor,
+            ], axis=1)
+
+        if len(scores) == 0:
+            return []
+
+        indices = cv2.dnn.NMSBoxes(
+            xywh.tolist(),
+            scores.tolist(),
+            self.confidence_threshold,
+            self.nms_threshold
+        )
+        return [
+            (int(xywh[i, 0]), int(xywh[i, 1]), int(xywh[i, 2]), int(xywh[i, 3]), float(scores[i]))
+            for i in np.array(indices).flatten()
+        ]
+
+    def get_stats(self):
+        """
+        Get batching statistics.
+
+        Returns:
+            dict: Participants, batches run and average batch size
+        """
+        return {
+            'model_path': self.model_path,
+            'participants': self.participants,
+            'batches_run': self.batches_run,
+            'frames_inferred': self.frames_inferred,
+            'avg_batch_size': self.frames_inferred / self.batches_run if self.batches_run else 0,
+        }
+
+
+def get_dnn_backend(model_path, **options):
+    """
+    Get the DNN backend shared by all cameras using a model.
+
+    Args:
+        model_path: Path to the ONNX model
+        **options: DNNBackend arguments used if the backend is created
+
+    Returns:
+        DNNBackend: Shared backend
+    """
+    key = str(model_path)
+    with _dnn_backends_lock:
+        backend = _dnn_backends.get(key)
+        if backend is None:
+            backend = DNNBackend(model_path, **options)
+            _dnn_backends[key] = backend
+        return backend
+
+
+def create_backend(name='motion', detection_threshold=0.3, roi=None, detection_scale=1.0,
+                   dnn_options=None):
+    """
+    Create the detection backend for one camera.
+
+    Args:
+        name: 'motion' or 'dnn'
+        detection_threshold: Confidence threshold for detection (0-1)
+        roi: Region of interest polygon (motion backend)
+        detection_scale: Resize factor applied before detection (motion backend)
+        dnn_options: DNNBackend arguments including model_path (dnn backend)
+
+    Returns:
+        DetectorBackend: The backend
+    """
+    if name == 'dnn':
+        options = dict(dnn_options or {})
+        model_path = options.pop('model_path')
+        return get_dnn_backend(model_path, confidence_threshold=detection_threshold, **options)
+    if name == 'motion':
+        return MotionBackend(roi=roi, detection_scale=detection_scale)
+    raise ValueError(f"Unknown detector backend: {name}")
@@ -0,0 +1,315 @@
+"""
+Event Stream Module
+Server-Sent Events broadcaster for status changes and traffic events
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from .intersection import DEFAULT_INTERSECTION
+
+# Messages kept for clients resuming with Last-Event-ID
+HISTORY_SIZE = 500
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+# Reconnect delay suggested to EventSource clients (milliseconds)
+RETRY_MS = 2000
+
+# TrafficEvent fields included in 'traffic_event' messages (as in /api/events/)
+EVENT_FIELDS = ('direction', 'event_type', 'description', 'vehicles_detected', 'light_state')
+
+
+def encode_message(message_id, event, data):
+    """
+    Encode one SSE message.
+
+    Args:
+        message_id: Message ID clients resume from
+        event: SSE event name
+        data: JSON-serializable payload or pre-encoded JSON bytes
+
+    Returns:
+        bytes: Wire format of the message
+    """
+    if not isinstance(data, bytes):
+        data = json.dumps(data).encode()
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (message_id, event.encode(), data)
+
+
+class EventBroadcaster:
+    """
+    Fan-out of encoded SSE messages to any number of stream clients.
+
+    Each message is encoded once when it is published and kept in a short
+    history so a reconnecting client continues after its Last-Event-ID.
+    Synchronous clients wait on a Condition; asynchronous clients register
+    an asyncio.Event that is set from the publishing thread.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        """
+        Initialize broadcaster.
+
+        Args:
+            history_size: Number of recent messages kept for resuming clients
+        """
+        self._history = deque(maxlen=history_size)
+        self._last_id = 0
+        self._condition = threading.Condition()
+        self._async_waiters = set()
+        self.clients = 0
+        self.messages_published = 0
+
+    @property
+    def last_id(self):
+        """ID of the newest message."""
+        return self._last_id
+
+    def publish(self, event, data):
+        """
+        Publish a message to all clients.
+
+        Args:
+            event: SSE event name
+            data: JSON-serializable payload or pre-encoded JSON bytes
+        """
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+
+        with self._condition:
+            self._last_id += 1
+            message = encode_message(self._last_id, event, data)
+            self._history.append((self._last_id, message))
+            self.messages_published += 1
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    def messages_after(self, last_id):
+        """
+        Get the messages a client has not seen yet.
+
+        Args:
+            last_id: ID of the last message the client received
+
+        Returns:
+            tuple: (messages, newest_id, complete) - complete is False if
+                   older messages have already left the history, or if
+                   last_id is newer than any message (an ID from before
+                   a server restart, when IDs start again at 1)
+        """
+        with self._condition:
+            if last_id > self._last_id:
+                return [], self._last_id, False
+            if last_id == self._last_id:
+                return [], last_id, True
+            complete = bool(self._history) and self._history[0][0] <= last_id + 1
+            messages = [message for message_id, message in self._history if message_id > last_id]
+            return messages, self._last_id, complete
+
+    def wait(self, last_id, timeout):
+        """
+        Block until a message newer than last_id exists.
+
+        Args:
+            last_id: ID of the last message the client received
+            timeout: Maximum seconds to wait
+
+        Returns:
+            bool: True if a newer message is available
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._last_id > last_id, timeout)
+
+    def add_client(self):
+        """Count a connected stream client."""
+        with self._condition:
+            self.clients += 1
+
+    def remove_client(self):
+        """Count a disconnected stream client."""
+        with self._condition:
+            self.clients -= 1
+
+    async def wait_async(self, last_id, timeout):
+        """
+        Asynchronous version of wait() for ASGI clients.
+
+        Args:
+            last_id: ID of the last message the client received
+            timeout: Maximum seconds to wait
+
+        Returns:
+            bool: True if a newer message is available
+        """
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        with self._condition:
+            if self._last_id > last_id:
+                return True
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._last_id > last_id
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+    def get_stats(self):
+        """
+        Get broadcaster statistics.
+
+        Returns:
+            dict: Client count and message counters
+        """
+        return {
+            'clients': self.clients,
+            'last_event_id': self._last_id,
+            'messages_published': self.messages_published,
+            'history': len(self._history),
+        }
+
+
+# One broadcaster per intersection, so clients only receive their own messages
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+def get_broadcaster(intersection_id=DEFAULT_INTERSECTION):
+    """
+    Get (or create) the broadcaster of an intersection.
+
+    Args:
+        intersection_id: Intersection identifier
+
+    Returns:
+        EventBroadcaster: Broadcaster for the intersection
+    """
+    with _broadcasters_lock:
+        if intersection_id not in _broadcasters:
+            _broadcasters[intersection_id] = EventBroadcaster()
+        return _broadcasters[intersection_id]
+
+
+# Broadcaster of the default intersection
+broadcaster = get_broadcaster()
+
+
+def publish(event, data, intersection_id=DEFAULT_INTERSECTION):
+    """
+    Publish a message to the clients of an intersection.
+
+    Args:
+        event: SSE event name ('status' or 'traffic_event')
+        data: JSON-serializable payload or pre-encoded JSON bytes
+        intersection_id: Intersection identifier
+    """
+    get_broadcaster(intersection_id).publish(event, data)
+
+
+def publish_traffic_event(**fields):
+    """
+    Publish a new TrafficEvent.
+
+    Args:
+        **fields: TrafficEvent field values including timestamp and intersection
+    """
+    data = {'timestamp': fields['timestamp'].isoformat()}
+    data.update({name: fields.get(name) for name in EVENT_FIELDS})
+    publish('traffic_event', data, fields.get('intersection', DEFAULT_INTERSECTION))
+
+
+def get_stats():
+    """
+    Get statistics of every broadcaster.
+
+    Returns:
+        dict: {intersection_id: broadcaster statistics}
+    """
+    with _broadcasters_lock:
+        broadcasters = dict(_broadcasters)
+    return {intersection_id: b.get_stats() for intersection_id, b in broadcasters.items()}
+
+
+def _next_chunk(broadcaster, last_id, snapshot_message):
+    """
+    Collect everything a client has missed since last_id.
+
+    Args:
+        broadcaster: EventBroadcaster of the client's intersection
+        last_id: ID of the last message the client received, or None
+        snapshot_message: Callable(message_id) returning the current status message
+
+    Returns:
+        tuple: (chunk, last_id) - chunk is empty if there is nothing new
+    """
+    if last_id is not None:
+        messages, newest_id, complete = broadcaster.messages_after(last_id)
+        if complete:
+            return b''.join(messages), newest_id
+
+    # New client, or one that fell behind the history: start from the current status
+    current_id = broadcaster.last_id
+    return snapshot_message(current_id), current_id
+
+
+def stream(last_id, snapshot_message, intersection_id=DEFAULT_INTERSECTION):
+    """
+    Generate SSE messages for a WSGI client.
+
+    Args:
+        last_id: Last-Event-ID sent by the client, or None
+        snapshot_message: Callable(message_id) returning the current status message
+        intersection_id: Intersection identifier
+    """
+    broadcaster = get_broadcaster(intersection_id)
+    broadcaster.add_client()
+    try:
+        chunk, last_id = _next_chunk(broadcaster, last_id, snapshot_message)
+        yield b'retry: %d\n\n' % RETRY_MS + chunk
+
+        while True:
+            if not broadcaster.wait(last_id, KEEPALIVE_INTERVAL):
+                yield b': keepalive\n\n'
+                continue
+            chunk, last_id = _next_chunk(broadcaster, last_id, snapshot_message)
+            if chunk:
+                yield chunk
+    finally:
+        broadcaster.remove_client()
+
+
+async def stream_async(last_id, snapshot_message, intersection_id=DEFAULT_INTERSECTION):
+    """
+    Generate SSE messages for an ASGI client without holding a thread.
+
+    Args:
+        last_id: Last-Event-ID sent by the client, or None
+        snapshot_message: Callable(message_id) returning the current status message
+        intersection_id: Intersection identifier
+    """
+    broadcaster = get_broadcaster(intersection_id)
+    broadcaster.add_client()
+    try:
+        chunk, last_id = _next_chunk(broadcaster, last_id, snapshot_message)
+        yield b'retry: %d\n\n' % RETRY_MS + chunk
+
+        while True:
+            if not await broadcaster.wait_async(last_id, KEEPALIVE_INTERVAL):
+                yield b': keepalive\n\n'
+                continue
+            chunk, last_id = _next_chunk(broadcaster, last_id, snapshot_message)
+            if chunk:
+                yield chunk
+    finally:
+        broadcaster.remove_client()
@@ -0,0 +1,291 @@
+"""
+Frame Hub Module
+Shares one camera and one detection pipeline between all consumers
+"""
+import threading
+import time
+import logging
+from .vehicle_detector import VehicleDetector
+from .profiling import watchdog
+
+logger = logging.getLogger('traffic_control')
+
+# Window over which the published frame rate is measured (seconds)
+FPS_WINDOW = 1.0
+
+# Registry of running hubs keyed by camera index
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+class FrameHub:
+    """
+    Captures and processes frames from one camera exactly once and fans the
+    results out to any number of subscribers (control loop, video feeds).
+    """
+
+    def __init__(self, camera_index=0, **detector_options):
+        """
+        Initialize frame hub.
+
+        Args:
+            camera_index: Camera device index
+            **detector_options: Extra VehicleDetector arguments
+                (see get_detector_options)
+        """
+        self.camera_index = camera_index
+        self.detector_options = detector_options
+        self.detector = self._create_detector()
+        self.is_running = False
+        self.is_closed = False
+        self.worker_thread = None
+        self.subscribers = 0
+
+        # Callbacks run when the vehicle count changes
+        self._listeners = []
+
+        # Latest published result, guarded by the condition
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._vehicle_count = 0
+        self._frame = None
+        self._frame_time = None
+
+        # Published frame rate, measured over FPS_WINDOW
+        self.fps = None
+        self._fps_window_start = None
+        self._fps_frames = 0
+
+    def _create_detector(self):
+        """Create the detector that captures and processes frames in this process."""
+        return VehicleDetector(camera_index=self.camera_index, **self.detector_options)
+
+    @property
+    def is_active(self):
+        """True while the underlying camera is delivering frames."""
+        return self.is_running and self.detector.is_active
+
+    def start(self):
+        """Open the camera and start the processing thread."""
+        if self.is_running:
+            return self.detector.is_active
+
+        if not self.detector.start():
+            return False
+
+        self.is_running = True
+        self.worker_thread = threading.Thread(target=self._process_loop,
+                                              name=f'frame-hub-{self.camera_index}', daemon=True)
+        self.worker_thread.start()
+        logger.info(f"Frame hub for camera {self.camera_index} started")
+        return True
+
+    def stop(self):
+        """Stop processing, release the camera and wake up all waiters."""
+        self.is_running = False
+        self.is_closed = True
+
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=2)
+        self.worker_thread = None
+        self.detector.stop()
+
+        with self._condition:
+            self._condition.notify_all()
+        logger.info(f"Frame hub for camera {self.camera_index} stopped")
+
+    def _process_loop(self):
+        """Run detection on each new frame and publish the result."""
+        tick_key = f'frame-hub-{self.camera_index}'
+        while self.is_running:
+            try:
+                watchdog.tick_started(tick_key)
+                try:
+                    vehicle_count, frame = self.detector.detect_vehicles()
+                finally:
+                    watchdog.tick_finished(tick_key)
+
+                if frame is None or frame is self._frame:
+                    # Nothing new from the camera yet
+                    time.sleep(0.005)
+                    continue
+
+                self._publish(vehicle_count, frame)
+
+            except Exception as e:
+                logger.error(f"Error in frame hub for camera {self.camera_index}: {e}")
+                time.sleep(0.1)
+
+    def _publish(self, vehicle_count, frame):
+        """
+        Make a processed frame the latest result and wake up all waiters.
+
+        Args:
+            vehicle_count: Number of vehicles detected
+            frame: Annotated frame (becomes read-only)
+        """
+        # Frames are shared between subscribers - guard against mutation
+        frame.flags.writeable = False
+
+        with self._condition:
+            changed = vehicle_count != self._vehicle_count
+            self._sequence += 1
+            self._vehicle_count = vehicle_count
+            self._frame = frame
+            self._frame_time = time.monotonic()
+            self._condition.notify_all()
+
+        if self._fps_window_start is None:
+            self._fps_window_start = self._frame_time
+        else:
+            self._fps_frames += 1
+            if self._frame_time - self._fps_window_start >= FPS_WINDOW:
+                self.fps = self._fps_frames / (self._frame_time - self._fps_window_start)
+                self._fps_window_start = self._frame_time
+                self._fps_frames = 0
+
+        if changed:
+            for listener in list(self._listeners):
+                try:
+                    listener(self, vehicle_count)
+                except Exception as e:
+                    logger.error(f"Error in frame hub listener: {e}")
+
+    def add_listener(self, callback):
+        """
+        Register a callback for vehicle count changes.
+
+        Args:
+            callback: Called as callback(hub, vehicle_count) from the hub thread;
+                must return quickly
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        Unregister a callback added with add_listener.
+
+        Args:
+            callback: The registered callback
+        """
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def get_latest(self):
+        """
+        Get the most recent detection result without waiting.
+
+        Returns:
+            tuple: (vehicle_count, frame) - frame is read-only and may be None
+        """
+        with self._condition:
+            return self._vehicle_count, self._frame
+
+    def wait_for_frame(self, last_sequence=0, timeout=1.0):
+        """
+        Block until a frame newer than last_sequence is published.
+
+        Args:
+            last_sequence: Sequence number of the last frame the caller saw
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            tuple or None: (sequence, vehicle_count, frame), or None on timeout
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._sequence != last_sequence or self.is_closed,
+                timeout=timeout
+            )
+            if self._sequence == last_sequence or self._frame is None:
+                return None
+            return self._sequence, self._vehicle_count, self._frame
+
+    def get_stats(self):
+        """
+        Get hub statistics.
+
+        Returns:
+            dict: Subscriber count, published frames and capture stats
+        """
+        stats = self.detector.get_capture_stats()
+        stats.update({
+            'subscribers': self.subscribers,
+            'frames_published': self._sequence,
+            'fps': self.fps,
+        })
+        return stats
+
+
+def acquire_hub(camera_index, process_worker=False, **detector_options):
+    """
+    Subscribe to the shared hub for a camera, starting it if needed.
+
+    A camera can only be opened once, so later subscribers share the hub
+    with the options of the first one; a warning is logged when their
+    options differ. A hub whose camera fails to start is not shared, so
+    the next subscriber tries the camera again.
+
+    Args:
+        camera_index: Camera device index
+        process_worker: Run capture and detection in a separate process
+            if the hub is created
+        **detector_options: VehicleDetector arguments used if the hub is created
+
+    Returns:
+        FrameHub: The shared hub (check is_active before reading frames)
+    """
+    if process_worker:
+        from .detection_workers import ProcessFrameHub
+        hub_class = ProcessFrameHub
+    else:
+        hub_class = FrameHub
+
+    with _hubs_lock:
+        hub = _hubs.get(camera_index)
+        if hub is None:
+            hub = hub_class(camera_index=camera_index, **detector_options)
+            if hub.start():
+                _hubs[camera_index] = hub
+        elif type(hub) is not hub_class or hub.detector_options != detector_options:
+            logger.warning(f"Camera {camera_index} is already running with other detector options; "
+                           f"using the running {type(hub).__name__} and its options")
+        hub.subscribers += 1
+        return hub
+
+
+def release_hub(hub):
+    """
+    Unsubscribe from a hub, stopping it when the last subscriber leaves.
+
+    Args:
+        hub: Hub previously returned by acquire_hub
+    """
+    with _hubs_lock:
+        hub.subscribers -= 1
+        if hub.subscribers > 0:
+            return
+        if _hubs.get(hub.camera_index) is hub:
+            del _hubs[hub.camera_index]
+    hub.stop()
+
+
+def stop_all_hubs():
+    """Stop every hub and release all cameras."""
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+        _hubs.clear()
+    for hub in hubs:
+        hub.stop()
+
+
+def get_hub_stats():
+    """
+    Get statistics for all running hubs.
+
+    Returns:
+        list: One stats dict per hub
+    """
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+    return [hub.get_stats() for hub in hubs]
@@ -0,0 +1,181 @@
+"""
+Intersection Layout Module
+Approaches (camera + LED segment) and signal phases from TRAFFIC_CONFIG
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.text import slugify
+
+# Longest approach label that fits TrafficEvent.direction
+MAX_LABEL_LENGTH = 20
+
+# Intersection ID used when TRAFFIC_CONFIG['INTERSECTIONS'] is not set
+DEFAULT_INTERSECTION = 'default'
+
+# Longest intersection ID that fits TrafficEvent.intersection
+MAX_INTERSECTION_LENGTH = 50
+
+
+class Approach:
+    """One approach lane: its camera, its LED segment and its region of interest."""
+
+    __slots__ = ('index', 'name', 'label', 'camera', 'leds', 'roi')
+
+    def __init__(self, index, name, camera, leds, roi=None):
+        """
+        Initialize approach.
+
+        Args:
+            index: Position in the approach list
+            name: Identifier such as 'direction_1' (LED segment and status key)
+            camera: Camera index or video source
+            leds: LED indices (red, yellow, green)
+            roi: Approach lane polygon [(x, y), ...] or None for the full frame
+        """
+        self.index = index
+        self.name = name
+        self.label = name.upper()  # TrafficEvent.direction value
+        self.camera = camera
+        self.leds = tuple(leds)
+        self.roi = roi
+
+    @property
+    def number(self):
+        """1-based approach number (used in URLs and captions)."""
+        return self.index + 1
+
+    def __repr__(self):
+        return f"Approach({self.name!r}, camera={self.camera!r})"
+
+
+def get_approaches(config):
+    """
+    Build the approach list from TRAFFIC_CONFIG.
+
+    Uses TRAFFIC_CONFIG['APPROACHES'] if set, otherwise the two-way layout of
+    the CAMERA_DIRECTION_* and ROI_DIRECTION_* keys.
+
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+
+    Returns:
+        list: Approach instances
+
+    Raises:
+        ImproperlyConfigured: If the layout is invalid
+    """
+    entries = config.get('APPROACHES')
+    if not entries:
+        entries = [
+            {
+                'name': f'direction_{number}',
+                'camera': config[f'CAMERA_DIRECTION_{number}'],
+                'leds': [3 * (number - 1), 3 * (number - 1) + 1, 3 * (number - 1) + 2],
+                'roi': config.get(f'ROI_DIRECTION_{number}'),
+            }
+            for number in (1, 2)
+        ]
+
+    approaches = []
+    for index, entry in enumerate(entries):
+        try:
+            approach = Approach(index, entry['name'], entry['camera'], entry['leds'], entry.get('roi'))
+        except KeyError as e:
+            raise ImproperlyConfigured(f"TRAFFIC_CONFIG['APPROACHES'][{index}] is missing {e}")
+        if len(approach.leds) != 3:
+            raise ImproperlyConfigured(f"Approach {approach.name} needs 3 LEDs (red, yellow, green)")
+        if len(approach.label) > MAX_LABEL_LENGTH:
+            raise ImproperlyConfigured(f"Approach name {approach.name} is longer than {MAX_LABEL_LENGTH}")
+        approaches.append(approach)
+
+    names = [approach.name for approach in approaches]
+    if len(set(names)) != len(names):
+        raise ImproperlyConfigured("Approach names must be unique")
+    return approaches
+
+
+def get_phases(config, approaches):
+    """
+    Build the signal phases from TRAFFIC_CONFIG.
+
+    A phase is a group of approaches that may be green together; approaches
+    in different phases conflict. Without TRAFFIC_CONFIG['PHASES'] every
+    approach is its own phase.
+
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+        approaches: Result of get_approaches()
+
+    Returns:
+        list: Tuples of approach indices, in service order
+
+    Raises:
+        ImproperlyConfigured: If a phase names an unknown approach or an
+            approach is in no phase
+    """
+    groups = config.get('PHASES')
+    if not groups:
+        return [(approach.index,) for approach in approaches]
+
+    index_by_name = {approach.name: approach.index for approach in approaches}
+    phases = []
+    for group in groups:
+        unknown = [name for name in group if name not in index_by_name]
+        if unknown:
+            raise ImproperlyConfigured(f"Phase {group} names unknown approaches {unknown}")
+        phases.append(tuple(index_by_name[name] for name in group))
+
+    served = {index for phase in phases for index in phase}
+    missing = [approach.name for approach in approaches if approach.index not in served]
+    if missing:
+        raise ImproperlyConfigured(f"Approaches {missing} are not in any phase")
+    return phases
+
+
+def direction_labels(config):
+    """
+    Get every valid TrafficEvent.direction value for the configured layout.
+
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+
+    Returns:
+        set: Approach labels plus 'BOTH' for system-wide events
+    """
+    return {approach.label for approach in get_approaches(config)} | {'BOTH'}
+
+
+def get_intersection_configs(config):
+    """
+    Build the configuration of every intersection from TRAFFIC_CONFIG.
+
+    Each entry of TRAFFIC_CONFIG['INTERSECTIONS'] maps an intersection ID to
+    the keys that differ from the base TRAFFIC_CONFIG (typically APPROACHES,
+    PHASES and the LED settings). Without it there is a single intersection
+    named DEFAULT_INTERSECTION using TRAFFIC_CONFIG unchanged.
+
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+
+    Returns:
+        dict: {intersection_id: merged TRAFFIC_CONFIG dictionary}
+
+    Raises:
+        ImproperlyConfigured: If an intersection ID is not a valid URL slug
+            or an intersection layout is invalid
+    """
+    overrides = config.get('INTERSECTIONS')
+    if not overrides:
+        return {DEFAULT_INTERSECTION: config}
+
+    configs = {}
+    for intersection_id, override in overrides.items():
+        if slugify(intersection_id) != intersection_id or len(intersection_id) > MAX_INTERSECTION_LENGTH:
+            raise ImproperlyConfigured(
+                f"Intersection ID {intersection_id!r} must be a slug of at most "
+                f"{MAX_INTERSECTION_LENGTH} characters"
+            )
+        merged = {key: value for key, value in config.items() if key != 'INTERSECTIONS'}
+        merged.update(override or {})
+        get_phases(merged, get_approaches(merged))
+        configs[intersection_id] = merged
+    return configs
@@ -4,6 +4,8 @@ Controls addressable LED strip for traffic lights
 """
 import logging
 import platform
+import time
+from .metrics import LED_UPDATE_SECONDS
 
 logger = logging.getLogger('traffic_control')
 
@@ -35,7 +37,7 @@ class LEDController:
     COLOR_YELLOW = (255, 255, 0)
     COLOR_OFF = (0, 0, 0)
     
-    def __init__(self, led_pin=18, led_count=6, brightness=255):
+    def __init__(self, led_pin=18, led_count=6, brightness=255, segments=None):
         """
         Initialize LED controller.
         
@@ -43,6 +45,8 @@ class LEDController:
             led_pin: GPIO pin connected to the LED strip
             led_count: Total number of LEDs (3 per direction)
             brightness: LED brightness (0-255)
+            segments: {direction: (red, yellow, green) LED indices}; defaults
+                      to direction_1 on LEDs 0-2 and direction_2 on LEDs 3-5
         """
         self.led_pin = led_pin
         self.led_count = led_count
@@ -50,17 +54,14 @@ class LEDController:
         self.strip = None
         self.is_active = False
         
-        # LED assignments
-        # Direction 1: LEDs 0-2 (Red=0, Yellow=1, Green=2)
-        # Direction 2: LEDs 3-5 (Red=3, Yellow=4, Green=5)
-        self.direction_1_leds = [0, 1, 2]  # Red, Yellow, Green
-        self.direction_2_leds = [3, 4, 5]  # Red, Yellow, Green
+        # LED assignments: Red, Yellow, Green per direction
+        self.segments = dict(segments or {
+            'direction_1': (0, 1, 2),
+            'direction_2': (3, 4, 5),
+        })
         
         # Simulation mode state
-        self.simulated_state = {
-            'direction_1': 'RED',
-            'direction_2': 'RED'
-        }
+        self.simulated_state = {direction: 'RED' for direction in self.segments}
     
     def start(self):
         """Initialize the LED strip."""
@@ -83,8 +84,8 @@ class LEDController:
             self.is_active = True
             
             # Set initial state (all red)
-            self.set_red('direction_1')
-            self.set_red('direction_2')
+            for direction in self.segments:
+                self.set_red(direction)
             
             return True
             
@@ -118,77 +119,57 @@ class LEDController:
             # Simulation mode - just log
             pass
     
-    def set_red(self, direction):
+    def _set_light(self, direction, state, colors):
         """
-        Set traffic light to RED for specified direction.
+        Show one light state on a direction's segment.
         
         Args:
-            direction: 'direction_1' or 'direction_2'
+            direction: Direction name (key of self.segments)
+            state: 'RED', 'YELLOW' or 'GREEN'
+            colors: Colors for the red, yellow and green LEDs
         """
         try:
-            if direction == 'direction_1':
-                leds = self.direction_1_leds
-            else:
-                leds = self.direction_2_leds
-            
-            # Red LED on, others off
-            self.set_color(leds[0], self.COLOR_RED)    # Red ON
-            self.set_color(leds[1], self.COLOR_OFF)    # Yellow OFF
-            self.set_color(leds[2], self.COLOR_OFF)    # Green OFF
+            started = time.perf_counter()
+            leds = self.segments[direction]
+            if REAL_LED and self.strip:
+                # Update all three pixels, then latch them with a single show()
+                for led_index, (r, g, b) in zip(leds, colors):
+                    self.strip.setPixelColor(led_index, Color(r, g, b))
+                self.strip.show()
+            LED_UPDATE_SECONDS.observe(time.perf_counter() - started)
             
-            self.simulated_state[direction] = 'RED'
-            logger.info(f"{direction}: Set to RED")
+            self.simulated_state[direction] = state
+            logger.info(f"{direction}: Set to {state}")
             
         except Exception as e:
-            logger.error(f"Error setting RED light: {e}")
+            logger.error(f"Error setting {state} light: {e}")
+    
+    def set_red(self, direction):
+        """
+        Set traffic light to RED for specified direction.
+        
+        Args:
+            direction: Direction name, e.g. 'direction_1'
+        """
+        self._set_light(direction, 'RED', (self.COLOR_RED, self.COLOR_OFF, self.COLOR_OFF))
     
     def set_green(self, direction):
         """
         Set traffic light to GREEN for specified direction.
         
         Args:
-            direction: 'direction_1' or 'direction_2'
+            direction: Direction name, e.g. 'direction_1'
         """
-        try:
-            if direction == 'direction_1':
-                leds = self.direction_1_leds
-            else:
-                leds = self.direction_2_leds
-            
-            # Green LED on, others off
-            self.set_color(leds[0], self.COLOR_OFF)    # Red OFF
-            self.set_color(leds[1], self.COLOR_OFF)    # Yellow OFF
-            self.set_color(leds[2], self.COLOR_GREEN)  # Green ON
-            
-            self.simulated_state[direction] = 'GREEN'
-            logger.info(f"{direction}: Set to GREEN")
-            
-        except Exception as e:
-            logger.error(f"Error setting GREEN light: {e}")
+        self._set_light(direction, 'GREEN', (self.COLOR_OFF, self.COLOR_OFF, self.COLOR_GREEN))
     
     def set_yellow(self, direction):
         """
         Set traffic light to YELLOW for specified direction.
         
         Args:
-            direction: 'direction_1' or 'direction_2'
+            direction: Direction name, e.g. 'direction_1'
         """
-        try:
-            if direction == 'direction_1':
-                leds = self.direction_1_leds
-            else:
-                leds = self.direction_2_leds
-            
-            # Yellow LED on, others off
-            self.set_color(leds[0], self.COLOR_OFF)      # Red OFF
-            self.set_color(leds[1], self.COLOR_YELLOW)   # Yellow ON
-            self.set_color(leds[2], self.COLOR_OFF)      # Green OFF
-            
-            self.simulated_state[direction] = 'YELLOW'
-            logger.info(f"{direction}: Set to YELLOW")
-            
-        except Exception as e:
-            logger.error(f"Error setting YELLOW light: {e}")
+        self._set_light(direction, 'YELLOW', (self.COLOR_OFF, self.COLOR_YELLOW, self.COLOR_OFF))
     
     def turn_off_all(self):
         """Turn off all LEDs."""
@@ -198,10 +179,7 @@ class LEDController:
                     self.strip.setPixelColor(i, Color(0, 0, 0))
                 self.strip.show()
             
-            self.simulated_state = {
-                'direction_1': 'OFF',
-                'direction_2': 'OFF'
-            }
+            self.simulated_state = {direction: 'OFF' for direction in self.segments}
             logger.info("All LEDs turned off")
             
         except Exception as e:
@@ -212,7 +190,7 @@ class LEDController:
         Get current light state for a direction.
         
         Args:
-            direction: 'direction_1' or 'direction_2'
+            direction: Direction name, e.g. 'direction_1'
             
         Returns:
             str: Current state ('RED', 'GREEN', 'YELLOW', 'OFF')
@@ -0,0 +1,93 @@
+"""
+Live Status Module
+In-process snapshot of the current system status for the API
+"""
+import json
+import os
+import threading
+from django.utils import timezone
+from . import event_stream
+from .intersection import DEFAULT_INTERSECTION
+
+# Field values before anything has been published (SystemStatus defaults)
+DEFAULT_STATUS = {
+    'is_running': False,
+    'direction_1_light': 'RED',
+    'direction_2_light': 'RED',
+    'direction_1_vehicles': 0,
+    'direction_2_vehicles': 0,
+    'approaches': [],
+}
+
+# Distinguishes ETags of this process from those of a previous run
+_BOOT_ID = os.urandom(4).hex()
+
+_snapshots = {}
+_version = 0
+_publish_lock = threading.Lock()
+
+
+class StatusSnapshot:
+    """Immutable status snapshot with its pre-encoded JSON body and ETag."""
+
+    __slots__ = ('version', 'data', 'body', 'etag')
+
+    def __init__(self, version, data):
+        """
+        Initialize snapshot.
+
+        Args:
+            version: Monotonic version number
+            data: Status fields including last_update
+        """
+        self.version = version
+        self.data = data
+        self.body = json.dumps(data).encode()
+        self.etag = f'"{_BOOT_ID}-{version}"'
+
+
+def publish(last_update=None, intersection_id=DEFAULT_INTERSECTION, **fields):
+    """
+    Publish new status values of an intersection.
+
+    A new version is created only if a value actually changed, and is also
+    pushed to the intersection's event stream clients. Readers never take a
+    lock: they just pick up the current snapshot reference.
+
+    Args:
+        last_update: Timestamp to report (defaults to now)
+        intersection_id: Intersection identifier
+        **fields: Status fields to change (see DEFAULT_STATUS)
+
+    Returns:
+        StatusSnapshot: The current snapshot
+    """
+    global _version
+
+    with _publish_lock:
+        current = _snapshots.get(intersection_id)
+        if current is not None and all(current.data.get(k) == v for k, v in fields.items()):
+            return current
+
+        data = dict(current.data if current is not None else DEFAULT_STATUS)
+        data.update(fields)
+        data['last_update'] = (last_update or timezone.now()).isoformat()
+
+        _version += 1
+        snapshot = StatusSnapshot(_version, data)
+        _snapshots[intersection_id] = snapshot
+        event_stream.publish('status', snapshot.body, intersection_id)
+        return snapshot
+
+
+def get_snapshot(intersection_id=DEFAULT_INTERSECTION):
+    """
+    Get the current snapshot of an intersection.
+
+    Args:
+        intersection_id: Intersection identifier
+
+    Returns:
+        StatusSnapshot or None: None until something has been published
+    """
+    return _snapshots.get(intersection_id)
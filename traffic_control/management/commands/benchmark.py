@@ -0,0 +1,382 @@
+"""
+End-to-end benchmark suite for the detection, control and web paths.
+
+Scenarios (select with --scenarios, default all):
+
+    motion      per-frame cost of the motion detection path at several resolutions
+    throughput  detection frames/s with 1, 2 and 4 cameras running concurrently,
+                replaying synthetic frames or a recording (--source)
+    reaction    control-loop reaction latency from a camera's count change to
+                the light switch
+    web         /api/status/, /api/events/ and /video/feed/ under N concurrent
+                clients using Django's test client
+
+Results are printed (or written with --output) as JSON with latency
+percentiles and the machine they were measured on, so runs can be compared
+across commits on the Pi and on x86.
+
+Usage:
+    python manage.py benchmark --output bench-$(git rev-parse --short HEAD).json
+    python manage.py benchmark --scenarios throughput,web --source recordings/main-st.mp4
+"""
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+from traffic_control import views
+from traffic_control.intersection import get_approaches
+from traffic_control.simulation import SimulationRecorder
+from traffic_control.traffic_controller import TrafficController
+from traffic_control.vehicle_detector import VehicleDetector, get_detector_options
+from .benchmark_detection import synthetic_frames
+
+logger = logging.getLogger('traffic_control')
+
+SCENARIOS = ('motion', 'throughput', 'reaction', 'web')
+
+# Intersection registered for the duration of the web scenario
+BENCHMARK_INTERSECTION = 'benchmark'
+
+
+def summarize(samples):
+    """
+    Summarize latency samples.
+
+    Args:
+        samples: Durations in milliseconds
+
+    Returns:
+        dict: Count, mean and percentiles in milliseconds
+    """
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples, dtype=float)
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p90_ms': round(float(np.percentile(values, 90)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def machine_info():
+    """
+    Describe the machine and code version a run was measured on.
+
+    Returns:
+        dict: Platform, library versions and git commit
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'commit': commit,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def run_clients(count, work):
+    """
+    Run `work(client_number)` in `count` threads at the same time.
+
+    Args:
+        count: Number of concurrent clients
+        work: Callable returning a list of latency samples (ms)
+
+    Returns:
+        tuple: (all samples, wall seconds)
+    """
+    results = [None] * count
+    barrier = threading.Barrier(count + 1)
+
+    def client(number):
+        barrier.wait()
+        results[number] = work(number)
+
+    threads = [threading.Thread(target=client, args=(number,), daemon=True) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return [sample for samples in results for sample in (samples or [])], elapsed
+
+
+class ScriptedHub:
+    """Frame hub stand-in whose vehicle count is set by the benchmark."""
+
+    def __init__(self):
+        """Initialize hub without vehicles."""
+        self.camera_index = None
+        self.subscribers = 1
+        self.is_active = True
+        self.vehicle_count = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register a count-change callback."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Remove a count-change callback."""
+        self._listeners.remove(callback)
+
+    def get_latest(self):
+        """Current count, like FrameHub.get_latest()."""
+        return self.vehicle_count, None
+
+    def publish(self, vehicle_count):
+        """Change the count and notify listeners, like FrameHub._publish()."""
+        if vehicle_count == self.vehicle_count:
+            return
+        self.vehicle_count = vehicle_count
+        for listener in list(self._listeners):
+            listener(self, vehicle_count)
+
+    def stop(self):
+        """Nothing to release."""
+
+
+class ScriptedController(TrafficController):
+    """TrafficController reading scripted hubs instead of cameras."""
+
+    def _acquire_hub(self, approach):
+        """Use a scripted hub for every approach."""
+        return ScriptedHub()
+
+
+class Command(BaseCommand):
+    help = 'Run the detection, control and web benchmark scenarios and report JSON percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+        parser.add_argument('--frames', type=int, default=200, help='Frames per detection measurement')
+        parser.add_argument('--resolutions', default='320x240,640x480,1280x720',
+                            help='Frame sizes for the motion scenario')
+        parser.add_argument('--cameras', default='1,2,4', help='Camera counts for the throughput scenario')
+        parser.add_argument('--source', default=None,
+                            help='Recording (video file or image directory) instead of synthetic frames')
+        parser.add_argument('--switches', type=int, default=200, help='Light switches for the reaction scenario')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients for the web scenario')
+        parser.add_argument('--requests', type=int, default=100, help='API requests per client')
+        parser.add_argument('--feed-frames', type=int, default=30, help='Video frames read per feed client')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        report = {'machine': machine_info(), 'options': {
+            key: options[key] for key in ('frames', 'resolutions', 'cameras', 'source', 'switches',
+                                          'clients', 'requests', 'feed_frames')
+        }, 'scenarios': {}}
+
+        # Every light change is logged at INFO, which would dominate the timings
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                source = options['source'] or self._write_synthetic_source(directory, options['frames'])
+                for name in scenarios:
+                    self.stderr.write(f"Running {name}...")
+                    report['scenarios'][name] = getattr(self, f'_bench_{name}')(options, source)
+        finally:
+            logger.setLevel(level)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def _write_synthetic_source(self, directory, count):
+        """Store synthetic 640x480 frames as an image sequence to replay."""
+        for number, frame in enumerate(synthetic_frames(count)):
+            cv2.imwrite(os.path.join(directory, f'{number:05d}.bmp'), frame)
+        return directory
+
+    def _detector_options(self, **overrides):
+        """VehicleDetector arguments of the configured pipeline."""
+        config = settings.TRAFFIC_CONFIG
+        detector_options = get_detector_options(config, get_approaches(config)[0])
+        detector_options.update(roi=None, **overrides)
+        return detector_options
+
+    def _bench_motion(self, options, source):
+        """Per-frame cost of the motion detection path per resolution."""
+        results = {}
+        for resolution in options['resolutions'].split(','):
+            try:
+                width, height = (int(value) for value in resolution.lower().split('x'))
+            except ValueError:
+                raise CommandError(f'Invalid resolution: {resolution}')
+            frames = synthetic_frames(options['frames'], width=width, height=height)
+            detector = VehicleDetector(**self._detector_options(backend='motion', tracking=False,
+                                                                motion_gate_threshold=None))
+            work = np.empty_like(frames[0])
+            samples = []
+            for number, frame in enumerate(frames):
+                np.copyto(work, frame)
+                start = time.perf_counter()
+                detector._detect(work)
+                if number >= min(30, len(frames) // 5):  # Warm-up lets MOG2 learn the background
+                    samples.append((time.perf_counter() - start) * 1000)
+            results[f'{width}x{height}'] = summarize(samples)
+        return results
+
+    def _bench_throughput(self, options, source):
+        """Aggregate detection throughput with several cameras replaying at once."""
+        results = {}
+        for cameras in (int(value) for value in options['cameras'].split(',')):
+            detectors = [
+                VehicleDetector(camera_index=source, **self._detector_options(
+                    threaded_capture=False,
+                    replay_options={'playback': 'fast', 'loop': True}
+                ))
+                for _ in range(cameras)
+            ]
+            for detector in detectors:
+                if not detector.start():
+                    raise CommandError(f'Cannot open {source}')
+
+            def work(number):
+                detector = detectors[number]
+                samples = []
+                for _ in range(options['frames']):
+                    start = time.perf_counter()
+                    detector.detect_vehicles()
+                    samples.append((time.perf_counter() - start) * 1000)
+                return samples
+
+            try:
+                samples, elapsed = run_clients(cameras, work)
+            finally:
+                for detector in detectors:
+                    detector.stop()
+            results[f'{cameras}_cameras'] = {
+                'fps_total': round(len(samples) / elapsed, 1),
+                'fps_per_camera': round(len(samples) / elapsed / cameras, 1),
+                'frame': summarize(samples),
+            }
+        return results
+
+    def _bench_reaction(self, options, source):
+        """Time from a camera's count change to the control loop switching the lights."""
+        config = dict(settings.TRAFFIC_CONFIG, INTERSECTIONS=None, APPROACHES=None, PHASES=None,
+                      TIMING_MODE='fixed', MIN_GREEN_TIME=0)
+        controller = ScriptedController(config, BENCHMARK_INTERSECTION, writer=SimulationRecorder())
+        controller.start()
+        samples = []
+        timeouts = 0
+        try:
+            for number in range(options['switches']):
+                # Vehicles move to the other approach, so every change forces a switch
+                target = number % len(controller.hubs)
+                phase_before = controller.current_phase
+                for index, hub in enumerate(controller.hubs):
+                    if index != target:
+                        hub.publish(0)
+                controller.hubs[target].publish(1)
+
+                deadline = time.monotonic() + 2.0
+                while controller.current_phase == phase_before and time.monotonic() < deadline:
+                    time.sleep(0.0005)
+                if controller.current_phase == phase_before or controller.last_reaction_latency is None:
+                    timeouts += 1
+                    continue
+                samples.append(controller.last_reaction_latency * 1000)
+        finally:
+            controller.stop()
+        return {'switch': summarize(samples), 'timeouts': timeouts, 'wakeups': controller.wakeups}
+
+    def _bench_web(self, options, source):
+        """API and video feed throughput under concurrent clients."""
+        results = {}
+        for name, url in (('status', '/api/status/'), ('events', '/api/events/?limit=50')):
+            def work(number, url=url):
+                client = Client()
+                samples = []
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} returned {response.status_code}')
+                return samples
+
+            samples, elapsed = run_clients(options['clients'], work)
+            results[name] = {
+                'clients': options['clients'],
+                'requests_per_second': round(len(samples) / elapsed, 1),
+                'request': summarize(samples),
+            }
+
+        results['video_feed'] = self._bench_video_feed(options, source)
+        return results
+
+    def _bench_video_feed(self, options, source):
+        """MJPEG frames delivered per viewer of one camera replaying as fast as it can."""
+        config = dict(
+            settings.TRAFFIC_CONFIG, INTERSECTIONS=None, PHASES=None,
+            APPROACHES=[{'name': 'benchmark', 'camera': source, 'leds': [0, 1, 2]}],
+            REPLAY_PLAYBACK='fast', REPLAY_LOOP=True
+        )
+        views.supervisor.intersections[BENCHMARK_INTERSECTION] = config
+        url = f'/i/{BENCHMARK_INTERSECTION}/video/feed/1/'
+
+        def work(number):
+            response = Client().get(url)
+            chunks = iter(response.streaming_content)
+            samples = []
+            try:
+                next(chunks)
+                last = time.perf_counter()
+                for _ in range(options['feed_frames']):
+                    next(chunks)
+                    now = time.perf_counter()
+                    samples.append((now - last) * 1000)
+                    last = now
+            finally:
+                response.close()
+            return samples
+
+        try:
+            samples, elapsed = run_clients(options['clients'], work)
+        finally:
+            del views.supervisor.intersections[BENCHMARK_INTERSECTION]
+        return {
+            'clients': options['clients'],
+            'frames_per_second_total': round(len(samples) / elapsed, 1),
+            'frames_per_second_per_client': round(len(samples) / elapsed / options['clients'], 1),
+            'frame_interval': summarize(samples),
+        }
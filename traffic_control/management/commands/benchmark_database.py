@@ -0,0 +1,211 @@
+"""
+Concurrent read/write benchmark for the SQLite database profile.
+
+Copies the TrafficEvent/SystemStatus schema into temporary database files
+and runs the persistence writer's batched inserts against dashboard-style
+readers (recent events, events per direction, status) at the same time,
+once per profile:
+
+    default      Python sqlite3 defaults, new connection per dashboard request
+    pragmas      settings.SQLITE_PRAGMAS, new connection per request
+    tuned        settings.SQLITE_PRAGMAS with persistent connections (CONN_MAX_AGE)
+
+Usage:
+    python manage.py benchmark_database --seconds 10 --readers 4
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+# Tables copied into the benchmark database
+TABLES = ('traffic_control_trafficevent', 'traffic_control_systemstatus')
+
+# Queries one dashboard page load or API poll runs
+DASHBOARD_QUERIES = (
+    'SELECT * FROM traffic_control_trafficevent ORDER BY timestamp DESC LIMIT 20',
+    'SELECT COUNT(*) FROM traffic_control_trafficevent WHERE direction = ? AND timestamp >= ?',
+    'SELECT * FROM traffic_control_systemstatus LIMIT 1',
+)
+
+INSERT_EVENT = (
+    'INSERT INTO traffic_control_trafficevent '
+    '(timestamp, intersection, direction, event_type, description, vehicles_detected, light_state) '
+    "VALUES (?, 'default', ?, ?, ?, ?, ?)"
+)
+
+
+def schema_sql():
+    """
+    Read the CREATE statements of the benchmark tables from the app database.
+
+    Returns:
+        list: SQL statements for the tables and their indexes
+    """
+    with connection.cursor() as cursor:
+        placeholders = ', '.join('%s' for _ in TABLES)
+        cursor.execute(
+            f"SELECT sql FROM sqlite_master WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL "
+            "ORDER BY type DESC",
+            TABLES
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def connect(path, pragmas):
+    """
+    Open a connection the way Django would for the profile.
+
+    Args:
+        path: Database file
+        pragmas: PRAGMAs to apply, or {} for sqlite3 defaults
+
+    Returns:
+        sqlite3.Connection: Connection in autocommit mode
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent SQLite reads and writes with and without the tuned profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help='Duration per profile')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent dashboard clients')
+        parser.add_argument('--batch', type=int, default=50, help='Events per write transaction')
+        parser.add_argument('--seed-rows', type=int, default=20000, help='Events stored before measuring')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('This benchmark only applies to SQLite')
+            return
+
+        statements = schema_sql()
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+        profiles = (
+            ('default', {}, False),
+            ('pragmas', pragmas, False),
+            ('tuned', pragmas, True),
+        )
+
+        self.stdout.write(
+            f"{options['readers']} readers, 1 writer ({options['batch']} events/commit), "
+            f"{options['seconds']:.0f}s per profile"
+        )
+        self.stdout.write(f"{'profile':<8} {'reads/s':>9} {'read p95':>9} {'commits/s':>10} "
+                          f"{'commit p95':>11} {'locked':>7}")
+
+        for name, profile_pragmas, reuse in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self._prepare(path, statements, options['seed_rows'])
+                result = self._run(path, profile_pragmas, reuse, options)
+            self.stdout.write(
+                f"{name:<8} {result['reads']:>9.0f} {result['read_p95']:>7.1f}ms "
+                f"{result['commits']:>10.1f} {result['commit_p95']:>9.1f}ms {result['locked']:>7}"
+            )
+
+    def _prepare(self, path, statements, seed_rows):
+        """Create the schema and seed events."""
+        conn = sqlite3.connect(path, isolation_level=None)
+        for statement in statements:
+            conn.execute(statement)
+        now = timezone.now()
+        rows = [
+            ((now - timedelta(seconds=i)).isoformat(), f'DIRECTION_{i % 2 + 1}',
+             'LIGHT_CHANGE', 'seed', i % 5, 'GREEN')
+            for i in range(seed_rows)
+        ]
+        conn.execute('BEGIN')
+        conn.executemany(INSERT_EVENT, rows)
+        conn.execute(
+            'INSERT INTO traffic_control_systemstatus (intersection, is_running, direction_1_light, '
+            "direction_2_light, direction_1_vehicles, direction_2_vehicles, approaches, last_update) "
+            "VALUES ('default', 1, ?, ?, 0, 0, '[]', ?)",
+            ('RED', 'GREEN', now.isoformat())
+        )
+        conn.execute('COMMIT')
+        conn.close()
+
+    def _run(self, path, pragmas, reuse, options):
+        """
+        Run the writer and the readers concurrently.
+
+        Returns:
+            dict: Throughput, p95 latencies and lock errors
+        """
+        stop = threading.Event()
+        read_times = []
+        commit_times = []
+        locked = [0]
+        lock = threading.Lock()
+
+        def writer():
+            conn = connect(path, pragmas)
+            while not stop.is_set():
+                now = timezone.now().isoformat()
+                rows = [(now, 'DIRECTION_1', 'LIGHT_CHANGE', 'bench', 1, 'GREEN')] * options['batch']
+                started = time.perf_counter()
+                try:
+                    conn.execute('BEGIN')
+                    conn.executemany(INSERT_EVENT, rows)
+                    conn.execute('UPDATE traffic_control_systemstatus SET last_update = ?', (now,))
+                    conn.execute('COMMIT')
+                    commit_times.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    with lock:
+                        locked[0] += 1
+                time.sleep(0.01)
+            conn.close()
+
+        def reader():
+            since = (timezone.now() - timedelta(hours=1)).isoformat()
+            conn = connect(path, pragmas) if reuse else None
+            times = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    request_conn = conn or connect(path, pragmas)
+                    for query in DASHBOARD_QUERIES:
+                        params = ('DIRECTION_1', since) if '?' in query else ()
+                        request_conn.execute(query, params).fetchall()
+                    if conn is None:
+                        request_conn.close()
+                    times.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    with lock:
+                        locked[0] += 1
+            if conn is not None:
+                conn.close()
+            with lock:
+                read_times.extend(times)
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        seconds = options['seconds']
+        return {
+            'reads': len(read_times) / seconds,
+            'read_p95': float(np.percentile(read_times, 95)) * 1000 if read_times else 0.0,
+            'commits': len(commit_times) / seconds,
+            'commit_p95': float(np.percentile(commit_times, 95)) * 1000 if commit_times else 0.0,
+            'locked': locked[0],
+        }
@@ -0,0 +1,203 @@
+"""
+Micro-benchmark for the per-frame motion detection path.
+
+Compares the original allocate-per-call pipeline against the buffered
+VehicleDetector motion path and reports time and allocations per frame.
+With --source the whole VehicleDetector pipeline (motion gate, detection
+backend, tracker) instead runs on recorded footage, so regressions can be
+caught offline on any machine.
+
+Usage:
+    python manage.py benchmark_detection --frames 300
+    python manage.py benchmark_detection --source recordings/main-st.mp4 --playback fast
+"""
+import gc
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from traffic_control.vehicle_detector import VehicleDetector, get_detector_options
+from traffic_control.detector_backends import MIN_VEHICLE_AREA
+from traffic_control.intersection import get_approaches
+from traffic_control.video_sources import PLAYBACK_MODES
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """
+    Generate frames with a noisy background and a moving block.
+    
+    Args:
+        count: Number of frames
+        width: Frame width
+        height: Frame height
+        seed: Random seed for the background noise
+        
+    Returns:
+        list: BGR frames
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(30, 60, size=(height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = (i * 11) % max(1, width - width // 5)
+        frame[height // 2:height // 2 + height // 6, x:x + width // 5] = 220
+        frames.append(frame)
+    return frames
+
+
+class LegacyMotionDetector:
+    """The original pipeline: new kernel and new mask arrays on every call."""
+    
+    def __init__(self):
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=500,
+            varThreshold=16,
+            detectShadows=True
+        )
+    
+    def _detect(self, frame):
+        fg_mask = self.bg_subtractor.apply(frame)
+        _, fg_mask = cv2.threshold(fg_mask, 244, 255, cv2.THRESH_BINARY)
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)
+        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
+        contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        vehicle_count = 0
+        for contour in contours:
+            if cv2.contourArea(contour) > MIN_VEHICLE_AREA:
+                vehicle_count += 1
+                x, y, w, h = cv2.boundingRect(contour)
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+        return vehicle_count
+
+
+class Command(BaseCommand):
+    help = 'Benchmark time and allocations per frame of the motion detection path'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--frames', type=int, default=300, help='Frames per run')
+        parser.add_argument('--warmup', type=int, default=30, help='Frames before measuring')
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='detection_scale for the buffered pipeline')
+        parser.add_argument('--source', default=None,
+                            help='Video file or image directory to run the full pipeline on')
+        parser.add_argument('--playback', choices=PLAYBACK_MODES, default='fast',
+                            help='Playback mode for --source')
+        parser.add_argument('--fps', type=float, default=None,
+                            help='Frame rate for fixed playback and image directories')
+    
+    def handle(self, *args, **options):
+        if options['source']:
+            self._benchmark_replay(options)
+            return
+        
+        frames = synthetic_frames(options['frames'] + options['warmup'])
+        warmup = options['warmup']
+        
+        runs = [
+            ('legacy', LegacyMotionDetector),
+            ('buffered', lambda: VehicleDetector(detection_scale=options['scale'])),
+        ]
+        
+        self.stdout.write(f"{'pipeline':<10} {'ms/frame':>9} {'p95 ms':>8} "
+                          f"{'peak KiB/frame':>15} {'gc gen0':>8}")
+        for name, factory in runs:
+            timing = self._measure_time(factory(), frames, warmup)
+            allocs = self._measure_allocations(factory(), frames, warmup)
+            self.stdout.write(
+                f"{name:<10} {timing['mean_ms']:>9.3f} {timing['p95_ms']:>8.3f} "
+                f"{allocs['kib_per_frame']:>15.1f} "
+                f"{timing['gc_gen0']:>8}"
+            )
+    
+    def _measure_time(self, detector, frames, warmup):
+        """Time each call, working on a copy so boxes do not accumulate."""
+        work = np.empty_like(frames[0])
+        for frame in frames[:warmup]:
+            np.copyto(work, frame)
+            detector._detect(work)
+        
+        gen0_before = gc.get_stats()[0]['collections']
+        samples = []
+        for frame in frames[warmup:]:
+            np.copyto(work, frame)
+            start = time.perf_counter()
+            detector._detect(work)
+            samples.append((time.perf_counter() - start) * 1000)
+        gen0_after = gc.get_stats()[0]['collections']
+        
+        return {
+            'mean_ms': float(np.mean(samples)),
+            'p95_ms': float(np.percentile(samples, 95)),
+            'gc_gen0': gen0_after - gen0_before,
+        }
+    
+    def _measure_allocations(self, detector, frames, warmup):
+        """Measure peak transient memory (including NumPy buffers) per call."""
+        work = np.empty_like(frames[0])
+        for frame in frames[:warmup]:
+            np.copyto(work, frame)
+            detector._detect(work)
+        
+        measured = frames[warmup:]
+        total_bytes = 0
+        tracemalloc.start()
+        try:
+            for frame in measured:
+                np.copyto(work, frame)
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                detector._detect(work)
+                _, peak = tracemalloc.get_traced_memory()
+                total_bytes += peak - current
+        finally:
+            tracemalloc.stop()
+        
+        return {'kib_per_frame': total_bytes / len(measured) / 1024}
+    
+    def _benchmark_replay(self, options):
+        """Run the configured detection pipeline over a recording once."""
+        config = settings.TRAFFIC_CONFIG
+        detector_options = get_detector_options(config, get_approaches(config)[0])
+        detector_options.update(
+            threaded_capture=False,
+            roi=None,
+            replay_options={'playback': options['playback'], 'fps': options['fps'], 'loop': False},
+        )
+        detector = VehicleDetector(camera_index=options['source'], **detector_options)
+        if not detector.start():
+            raise CommandError(f"Cannot open {options['source']}")
+        
+        samples = []
+        counts = []
+        started = time.perf_counter()
+        try:
+            while True:
+                start = time.perf_counter()
+                vehicle_count, frame = detector.detect_vehicles()
+                if frame is None:
+                    break
+                samples.append((time.perf_counter() - start) * 1000)
+                counts.append(vehicle_count)
+            elapsed = time.perf_counter() - started
+            stats = detector.get_capture_stats()
+        finally:
+            detector.stop()
+        
+        if not samples:
+            raise CommandError(f"No frames decoded from {options['source']}")
+        replay = stats['replay']
+        self.stdout.write(
+            f"{options['source']}: {len(samples)} frames ({replay['position']:.1f}s of footage) "
+            f"in {elapsed:.2f}s, {options['playback']} playback"
+        )
+        self.stdout.write(f"{'fps':>8} {'ms/frame':>9} {'p95 ms':>8} {'processed':>10} "
+                          f"{'gated':>6} {'dropped':>8} {'avg count':>10} {'max count':>10}")
+        self.stdout.write(
+            f"{len(samples) / elapsed:>8.1f} {np.mean(samples):>9.3f} {np.percentile(samples, 95):>8.3f} "
+            f"{stats['frames_processed']:>10} {stats['frames_gated']:>6} {replay['frames_dropped']:>8} "
+            f"{np.mean(counts):>10.2f} {max(counts):>10}"
+        )
@@ -0,0 +1,58 @@
+"""
+Prune traffic events older than the retention period.
+
+Deletes in small transactions (archiving to gzip-compressed NDJSON files
+per day first, unless disabled), so it can run while the system is live.
+--vacuum additionally rebuilds the SQLite file to return the freed space
+to the SD card; that locks the database and is best run while stopped.
+
+Usage:
+    python manage.py prune_events
+    python manage.py prune_events --days 7 --no-archive --vacuum
+"""
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from traffic_control.retention import RetentionJob
+
+
+class Command(BaseCommand):
+    help = 'Delete (and archive) traffic events older than the retention period'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=None,
+                            help='Retention in days (default: EVENT_RETENTION_DAYS)')
+        parser.add_argument('--archive-dir', default=None,
+                            help='Archive directory (default: EVENT_ARCHIVE_DIR)')
+        parser.add_argument('--no-archive', action='store_true', help='Delete without archiving')
+        parser.add_argument('--batch-size', type=int, default=None, help='Events per transaction')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM the database afterwards')
+    
+    def handle(self, *args, **options):
+        job = RetentionJob.from_config(settings.TRAFFIC_CONFIG)
+        if options['days'] is not None:
+            job.retention_days = options['days']
+        if options['batch_size'] is not None:
+            job.batch_size = options['batch_size']
+        if options['archive_dir'] is not None:
+            job = RetentionJob(job.retention_days, options['archive_dir'], job.batch_size)
+        if options['no_archive']:
+            job.archive_dir = None
+        
+        job.run_once()
+        stats = job.get_stats()
+        self.stdout.write(
+            f"Pruned {stats['rows_pruned']} events ({stats['rows_archived']} archived) "
+            f"in {stats['batches']} batches, {stats['last_run_duration']:.2f}s"
+        )
+        
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            path = settings.DATABASES['default']['NAME']
+            before = os.path.getsize(path)
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            after = os.path.getsize(path)
+            self.stdout.write(f"Vacuumed {path}: {before // 1024} KiB -> {after // 1024} KiB")
+        
+        self.stdout.write(self.style.SUCCESS('Done'))
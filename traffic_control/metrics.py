@@ -0,0 +1,213 @@
+"""
+Metrics Module
+Low-overhead latency histograms and Prometheus text exposition
+"""
+import bisect
+import math
+import threading
+
+# Upper bounds (seconds) shared by all latency histograms: 100 us to 5 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Histograms by name, in registration order
+_registry = {}
+
+# Latest snapshots from other processes (detection workers), by source key
+_remote = {}
+_remote_lock = threading.Lock()
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with one series per combination of label values.
+
+    observe() only bisects the fixed bucket bounds and bumps three numbers
+    under a lock, so it costs about a microsecond and can stay enabled
+    on every frame and control tick. Buckets are stored per bucket and made
+    cumulative when rendered.
+    """
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Initialize histogram.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labels: Label names; observe() takes their values in this order
+            buckets: Sorted upper bounds in seconds (+Inf is implied)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record one measurement.
+
+        Args:
+            value: Duration in seconds
+            *label_values: Values of the histogram's labels, in order
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """
+        Copy the current series.
+
+        Returns:
+            dict: {label values: (bucket counts, sum, count)}
+        """
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    """
+    Get or register a histogram.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        labels: Label names
+        buckets: Upper bounds in seconds
+
+    Returns:
+        Histogram: The registered histogram
+    """
+    existing = _registry.get(name)
+    if existing is None:
+        existing = _registry[name] = Histogram(name, documentation, labels, buckets)
+    return existing
+
+
+# Stage timings of the detection and control paths
+DETECTOR_STAGE_SECONDS = histogram(
+    'traffic_detector_stage_seconds', 'Time spent per vehicle detection stage and frame',
+    labels=('camera', 'stage'))
+CONTROL_STAGE_SECONDS = histogram(
+    'traffic_control_stage_seconds', 'Time spent per control loop stage and tick',
+    labels=('intersection', 'stage'))
+REACTION_SECONDS = histogram(
+    'traffic_control_reaction_seconds', 'Time from a camera count change to the light switch',
+    labels=('intersection',))
+LED_UPDATE_SECONDS = histogram(
+    'traffic_led_update_seconds', 'Time to show a light state on the LED strip')
+DB_FLUSH_SECONDS = histogram(
+    'traffic_db_flush_seconds', 'Time to write one batch of queued events and status to the database')
+
+
+def snapshot():
+    """
+    Copy every histogram of this process, e.g. to send it to the parent process.
+
+    Returns:
+        dict: {metric name: Histogram.snapshot()}
+    """
+    return {name: metric.snapshot() for name, metric in _registry.items()}
+
+
+def merge_remote(source, histograms):
+    """
+    Include the histograms of another process in this process's output.
+
+    Each source replaces its previous snapshot, so send cumulative values.
+
+    Args:
+        source: Key identifying the other process, e.g. ('worker', camera_index)
+        histograms: Result of snapshot() in that process
+    """
+    with _remote_lock:
+        _remote[source] = histograms
+
+
+def _escape(value):
+    """Escape a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    """Format a label set like {camera="0",stage="mog2"}."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """Format a sample value."""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+def render_histograms():
+    """
+    Render every histogram, including those of other processes.
+
+    Returns:
+        list: Lines of the Prometheus text format
+    """
+    with _remote_lock:
+        remote = list(_remote.values())
+
+    lines = []
+    for name, metric in _registry.items():
+        series = metric.snapshot()
+        for histograms in remote:
+            for key, (counts, total, count) in histograms.get(name, {}).items():
+                if key in series:
+                    local_counts, local_total, local_count = series[key]
+                    series[key] = ([a + b for a, b in zip(local_counts, counts)],
+                                   local_total + total, local_count + count)
+                else:
+                    series[key] = (counts, total, count)
+
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} histogram')
+        for key in sorted(series, key=lambda values: tuple(str(value) for value in values)):
+            counts, total, count = series[key]
+            cumulative = 0
+            for bound, bucket_count in zip(metric.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{name}_bucket{_labels(metric.labels, key, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labels, key)} {_format_value(float(total))}')
+            lines.append(f'{name}_count{_labels(metric.labels, key)} {count}')
+    return lines
+
+
+def render_samples(name, documentation, kind, samples):
+    """
+    Render a gauge or counter.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        kind: 'gauge' or 'counter'
+        samples: Iterable of ({label: value}, value); None values are skipped
+
+    Returns:
+        list: Lines of the Prometheus text format
+    """
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        if value is None:
+            continue
+        lines.append(f'{name}{_labels(labels.keys(), labels.values())} {_format_value(value)}')
+    return lines
@@ -0,0 +1,38 @@
+# Adds pre-aggregated traffic statistics
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traffic_control', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrafficRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('MINUTE', 'Minute'), ('HOUR', 'Hour')], max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('direction', models.CharField(choices=[('DIRECTION_1', 'Direction 1'), ('DIRECTION_2', 'Direction 2'), ('BOTH', 'Both Directions')], max_length=20)),
+                ('vehicles_detected', models.IntegerField(default=0)),
+                ('light_changes', models.IntegerField(default=0)),
+                ('green_seconds', models.FloatField(default=0)),
+                ('max_green_hits', models.IntegerField(default=0)),
+                ('wait_seconds', models.FloatField(default=0)),
+                ('waits', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['period_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trafficrollup',
+            index=models.Index(fields=['period', 'period_start'], name='traffic_con_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trafficrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'direction', 'period_start'), name='unique_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Adds per-approach state for intersections with more than two approaches
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traffic_control', '0002_traffic_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemstatus',
+            name='approaches',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
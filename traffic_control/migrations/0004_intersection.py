@@ -0,0 +1,39 @@
+# Adds the intersection key for running several intersections in one process
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traffic_control', '0003_systemstatus_approaches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trafficevent',
+            name='intersection',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='trafficevent',
+            index=models.Index(fields=['intersection', '-timestamp'], name='traffic_con_interse_idx'),
+        ),
+        migrations.AddField(
+            model_name='systemstatus',
+            name='intersection',
+            field=models.CharField(default='default', max_length=50, unique=True),
+        ),
+        migrations.AddField(
+            model_name='trafficrollup',
+            name='intersection',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.RemoveConstraint(
+            model_name='trafficrollup',
+            name='unique_rollup_bucket',
+        ),
+        migrations.AddConstraint(
+            model_name='trafficrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'intersection', 'direction', 'period_start'), name='unique_intersection_rollup_bucket'),
+        ),
+    ]
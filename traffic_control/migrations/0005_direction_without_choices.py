@@ -0,0 +1,22 @@
+# Drops the fixed direction choices so approaches named in TRAFFIC_CONFIG validate
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traffic_control', '0004_intersection'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trafficevent',
+            name='direction',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='trafficrollup',
+            name='direction',
+            field=models.CharField(max_length=20),
+        ),
+    ]
@@ -14,14 +14,9 @@ class TrafficEvent(models.Model):
         ('ERROR', 'Error'),
     ]
     
-    DIRECTIONS = [
-        ('DIRECTION_1', 'Direction 1'),
-        ('DIRECTION_2', 'Direction 2'),
-        ('BOTH', 'Both Directions'),
-    ]
-    
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
-    direction = models.CharField(max_length=20, choices=DIRECTIONS)
+    intersection = models.CharField(max_length=50, default='default')
+    direction = models.CharField(max_length=20)  # Approach label (e.g. DIRECTION_1, NORTH) or BOTH
     event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
     description = models.TextField()
     vehicles_detected = models.IntegerField(default=0)
@@ -32,6 +27,7 @@ class TrafficEvent(models.Model):
         indexes = [
             models.Index(fields=['-timestamp']),
             models.Index(fields=['direction', '-timestamp']),
+            models.Index(fields=['intersection', '-timestamp'], name='traffic_con_interse_idx'),
         ]
     
     def __str__(self):
@@ -41,15 +37,55 @@ class TrafficEvent(models.Model):
 class SystemStatus(models.Model):
     """Model to store current system status."""
     
+    intersection = models.CharField(max_length=50, default='default', unique=True)
     is_running = models.BooleanField(default=False)
     direction_1_light = models.CharField(max_length=10, default='RED')
     direction_2_light = models.CharField(max_length=10, default='RED')
     direction_1_vehicles = models.IntegerField(default=0)
     direction_2_vehicles = models.IntegerField(default=0)
+    approaches = models.JSONField(default=list, blank=True)  # [{'name', 'light', 'vehicles'}] per approach
     last_update = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "System Status"
     
     def __str__(self):
-        return f"System Status - Running: {self.is_running}"
+        return f"System Status {self.intersection} - Running: {self.is_running}"
+
+
+class TrafficRollup(models.Model):
+    """Pre-aggregated traffic statistics per direction and minute or hour."""
+    
+    PERIODS = [
+        ('MINUTE', 'Minute'),
+        ('HOUR', 'Hour'),
+    ]
+    
+    period = models.CharField(max_length=10, choices=PERIODS)
+    period_start = models.DateTimeField()
+    intersection = models.CharField(max_length=50, default='default')
+    direction = models.CharField(max_length=20)  # Approach label, as in TrafficEvent
+    vehicles_detected = models.IntegerField(default=0)  # Vehicles waiting when the light turned green
+    light_changes = models.IntegerField(default=0)
+    green_seconds = models.FloatField(default=0)
+    max_green_hits = models.IntegerField(default=0)  # Green phases ended by MAX_GREEN_TIME
+    wait_seconds = models.FloatField(default=0)  # Total wait from first detection to green
+    waits = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'intersection', 'direction', 'period_start'],
+                                    name='unique_intersection_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='traffic_con_period_idx'),
+        ]
+    
+    @property
+    def average_wait(self):
+        """Average wait before green in seconds, or None without waits."""
+        return self.wait_seconds / self.waits if self.waits else None
+    
+    def __str__(self):
+        return f"{self.period} {self.period_start} - {self.intersection} {self.direction}"
@@ -0,0 +1,282 @@
+"""
+Persistence Writer Module
+Write-behind storage of traffic events and system status
+"""
+import queue
+import threading
+import time
+import logging
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import TrafficEvent, SystemStatus
+from . import event_stream
+from .rollups import apply_deltas
+from .intersection import DEFAULT_INTERSECTION
+from .metrics import DB_FLUSH_SECONDS
+
+logger = logging.getLogger('traffic_control')
+
+# Seconds before the one retry of a failed flush
+FLUSH_RETRY_DELAY = 0.5
+
+# Failed flushes (each retried once) after which an event is dropped
+MAX_EVENT_FLUSHES = 3
+
+
+class PersistenceWriter:
+    """
+    Background writer that batches TrafficEvent and SystemStatus writes.
+
+    The control loop only enqueues; a writer thread coalesces status updates
+    (only the newest matters) and stores events with bulk_create, all in one
+    transaction per flush, so a slow fsync or a locked database never delays
+    light switching. One writer can serve several intersections: events and
+    status updates carry their intersection field.
+
+    A failed flush is retried once. If that fails too, its events go back to
+    the head of the queue for the next flush; an event is only dropped (and
+    counted) after MAX_EVENT_FLUSHES failed flushes or when the writer stops,
+    so a broken row cannot block the queue forever. Status updates of a
+    failed flush are not kept, the next update supersedes them anyway.
+    """
+
+    def __init__(self, batch_size=50, flush_interval=1.0, max_queue=10000, rollups=None):
+        """
+        Initialize persistence writer.
+
+        Args:
+            batch_size: Flush as soon as this many items are queued
+            flush_interval: Maximum seconds an item waits before being flushed
+            max_queue: Queue capacity; items beyond it are dropped
+            rollups: Optional RollupAggregator updated with every flushed event
+        """
+        self.rollups = rollups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.is_running = False
+        self.writer_thread = None
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        # Statistics
+        self.flushes = 0
+        self.events_written = 0
+        self.status_writes = 0
+        self.items_dropped = 0
+        self.failed_flushes = 0
+        self.events_dropped = 0
+        self.last_flush_latency = None
+        self.max_flush_latency = 0.0
+
+    def start(self):
+        """Start the writer thread."""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.writer_thread = threading.Thread(target=self._writer_loop, name='persistence-writer', daemon=True)
+        self.writer_thread.start()
+        logger.info("Persistence writer started")
+
+    def stop(self):
+        """Flush everything still queued and stop the writer thread."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._queue.put(None)  # Wake the writer up
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=10)
+        self.writer_thread = None
+        logger.info("Persistence writer stopped")
+
+    def _put(self, item):
+        """Queue an item without blocking."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.items_dropped += 1
+            logger.warning("Persistence queue full - dropping write")
+
+    def enqueue_event(self, **fields):
+        """
+        Queue a TrafficEvent for insertion and push it to stream clients.
+
+        Args:
+            **fields: TrafficEvent field values
+        """
+        fields.setdefault('timestamp', timezone.now())
+        self._put(('event', fields))
+        event_stream.publish_traffic_event(**fields)
+
+    def enqueue_status(self, **fields):
+        """
+        Queue an update of a SystemStatus row.
+
+        Args:
+            **fields: SystemStatus field values, including intersection
+        """
+        self._put(('status', fields))
+
+    @property
+    def queue_depth(self):
+        """Number of items waiting to be written."""
+        return self._queue.qsize()
+
+    def _writer_loop(self):
+        """Collect items until the size or time threshold and flush them."""
+        retry = []  # (event fields, failed flushes) of the last failed flush, written first
+        try:
+            while True:
+                batch = [('event', fields) for fields, _ in retry]
+                stopping = False
+                deadline = time.monotonic() + self.flush_interval if batch else None
+
+                while len(batch) < self.batch_size:
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if stopping:
+                    # Drain whatever was queued before stop()
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not None:
+                            batch.append(item)
+
+                if batch:
+                    retry = [] if self._flush(batch) else self._requeue(batch, retry, stopping)
+                if stopping:
+                    break
+        finally:
+            connection.close()
+
+    def _flush(self, batch):
+        """
+        Write a batch, retrying once if the transaction fails.
+
+        Args:
+            batch: List of ('event' | 'status', fields) items
+
+        Returns:
+            bool: True if the batch was written
+        """
+        try:
+            self._write(batch)
+            return True
+        except Exception as e:
+            logger.warning(f"Error flushing {len(batch)} queued writes, retrying: {e}")
+        time.sleep(FLUSH_RETRY_DELAY)
+        try:
+            self._write(batch)
+            return True
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.error(f"Error flushing {len(batch)} queued writes: {e}")
+            return False
+
+    def _requeue(self, batch, retry, stopping):
+        """
+        Keep the events of a failed batch for the next flush.
+
+        Args:
+            batch: Items of the failed flush; its first len(retry) items are the retried events
+            retry: (event fields, failed flushes) pairs the batch started with
+            stopping: True if the writer is stopping (nothing is kept)
+
+        Returns:
+            list: (event fields, failed flushes) pairs to write first next time
+        """
+        kept = []
+        dropped = 0
+        event_fields = [fields for kind, fields in batch if kind == 'event']
+        for position, fields in enumerate(event_fields):
+            failures = (retry[position][1] if position < len(retry) else 0) + 1
+            if stopping or failures >= MAX_EVENT_FLUSHES:
+                dropped += 1
+            else:
+                kept.append((fields, failures))
+        if dropped:
+            self.events_dropped += dropped
+            logger.error(f"Dropped {dropped} events that could not be written")
+        return kept
+
+    def _write(self, batch):
+        """
+        Write a batch in one transaction.
+
+        Args:
+            batch: List of ('event' | 'status', fields) items
+
+        Raises:
+            Exception: Any database error; the rollup aggregator is restored first
+        """
+        event_fields = [fields for kind, fields in batch if kind == 'event']
+        events = [TrafficEvent(**fields) for fields in event_fields]
+
+        # Coalesce status updates per intersection - later values win
+        statuses = {}
+        for kind, fields in batch:
+            if kind == 'status':
+                fields = dict(fields)
+                intersection_id = fields.pop('intersection', DEFAULT_INTERSECTION)
+                statuses.setdefault(intersection_id, {}).update(fields)
+
+        # Rollup deltas are computed up front; the aggregator goes back to its
+        # checkpoint if the transaction fails, so it never runs ahead of the database
+        deltas = None
+        if events and self.rollups is not None:
+            checkpoint = self.rollups.checkpoint()
+            deltas = self.rollups.add_events(event_fields)
+
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                if events:
+                    TrafficEvent.objects.bulk_create(events)
+                if deltas:
+                    apply_deltas(deltas)
+                now = timezone.now()
+                for intersection_id, status in statuses.items():
+                    status['last_update'] = now
+                    if not SystemStatus.objects.filter(intersection=intersection_id).update(**status):
+                        SystemStatus.objects.create(intersection=intersection_id, **status)
+        except Exception:
+            if deltas is not None:
+                self.rollups.restore(checkpoint)
+            raise
+
+        latency = time.monotonic() - started
+        DB_FLUSH_SECONDS.observe(latency)
+        self.flushes += 1
+        self.events_written += len(events)
+        self.status_writes += len(statuses)
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+
+    def get_stats(self):
+        """
+        Get writer statistics.
+
+        Returns:
+            dict: Queue depth, flush and drop counts and flush latency
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'flushes': self.flushes,
+            'events_written': self.events_written,
+            'status_writes': self.status_writes,
+            'items_dropped': self.items_dropped,
+            'failed_flushes': self.failed_flushes,
+            'events_dropped': self.events_dropped,
+            'last_flush_latency': self.last_flush_latency,
+            'max_flush_latency': self.max_flush_latency,
+        }
@@ -0,0 +1,265 @@
+"""
+Profiling Module
+On-demand sampling profiler and slow-tick watchdog for the worker threads
+"""
+import os
+import sys
+import threading
+import time
+import logging
+import traceback
+from collections import Counter, deque
+from django.utils import timezone
+
+logger = logging.getLogger('traffic_control')
+
+# Thread name prefixes per group that can be profiled
+THREAD_GROUPS = {
+    'control': ('control-',),
+    'capture': ('capture-', 'frame-hub-', 'replay-'),
+    'streaming': ('mjpeg-',),
+    'persistence': ('persistence-writer', 'retention'),
+}
+
+# Slow-tick reports kept for the API
+MAX_SLOW_TICK_REPORTS = 20
+
+# Held while a profile runs, so concurrent requests do not add up
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    """Name a stack frame as module:function for collapsed stacks."""
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame, thread_name):
+    """
+    Turn a thread's current frame into a collapsed stack (root first).
+
+    Args:
+        frame: Innermost frame from sys._current_frames()
+        thread_name: Name placed at the root of the stack
+
+    Returns:
+        str: Frames joined by ';', as read by flamegraph.pl and speedscope
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name.replace(';', ':'))
+    return ';'.join(reversed(labels))
+
+
+def select_threads(groups):
+    """
+    Find the running threads of some groups.
+
+    Args:
+        groups: Names from THREAD_GROUPS, or None for every thread
+
+    Returns:
+        dict: {thread ident: thread name}
+
+    Raises:
+        ValueError: If a group is unknown
+    """
+    if groups is not None:
+        unknown = set(groups) - set(THREAD_GROUPS)
+        if unknown:
+            raise ValueError(f"Unknown thread groups: {', '.join(sorted(unknown))} "
+                             f"(expected {', '.join(THREAD_GROUPS)})")
+        prefixes = tuple(prefix for group in groups for prefix in THREAD_GROUPS[group])
+    threads = {}
+    for thread in threading.enumerate():
+        if groups is None or thread.name.startswith(prefixes):
+            threads[thread.ident] = thread.name
+    return threads
+
+
+def sample_profile(seconds, groups=None, interval=0.005):
+    """
+    Sample the stacks of running threads for a while.
+
+    Runs in the calling thread, so it does not profile itself. Threads that
+    start during the profile are picked up at the next sample.
+
+    Args:
+        seconds: Profile duration
+        groups: THREAD_GROUPS names to sample, or None for every thread
+        interval: Seconds between two samples
+
+    Returns:
+        tuple: (Counter of collapsed stacks, number of samples taken)
+
+    Raises:
+        ValueError: If a group is unknown
+        RuntimeError: If another profile is running
+    """
+    select_threads(groups)
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("Another profile is already running")
+    try:
+        stacks = Counter()
+        samples = 0
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            threads = select_threads(groups)
+            for ident, frame in sys._current_frames().items():
+                name = threads.get(ident)
+                if name is not None and ident != own_ident:
+                    stacks[collapse_stack(frame, name)] += 1
+            samples += 1
+            time.sleep(interval)
+        logger.info(f"Profiled {', '.join(groups or ['all'])} threads for {seconds}s ({samples} samples)")
+        return stacks, samples
+    finally:
+        _profile_lock.release()
+
+
+def format_collapsed(stacks):
+    """
+    Render collapsed stacks, one 'frame;frame;frame count' line each.
+
+    Args:
+        stacks: Counter from sample_profile()
+
+    Returns:
+        str: Text for flamegraph.pl, speedscope or inferno
+    """
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+class SlowTickWatchdog:
+    """
+    Captures the stack of a thread whose tick takes longer than a threshold.
+
+    Loops call tick_started()/tick_finished() around each unit of work (two
+    dict writes). A watchdog thread checks the open ticks a few times per
+    threshold; when one has been running too long it logs the thread's
+    stack while it is still stuck, so the log shows where the time goes,
+    and keeps the report for /api/profile/slow-ticks/.
+    """
+
+    def __init__(self, threshold=1.0):
+        """
+        Initialize watchdog.
+
+        Args:
+            threshold: Tick duration in seconds that counts as slow (None or 0 disables)
+        """
+        self.threshold = threshold
+        self.reports = deque(maxlen=MAX_SLOW_TICK_REPORTS)
+        self.slow_ticks = 0
+        self._ticks = {}  # key -> [thread ident, started (monotonic), report or None]
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def configure(self, threshold):
+        """
+        Set the slow-tick threshold.
+
+        Args:
+            threshold: Seconds, or None/0 to disable the watchdog
+        """
+        self.threshold = threshold
+
+    def tick_started(self, key):
+        """
+        Mark the start of a tick of the calling thread.
+
+        Args:
+            key: Name of the loop, e.g. 'control-default'
+        """
+        if not self.threshold:
+            return
+        self._ticks[key] = [threading.get_ident(), time.monotonic(), None]
+        if self._thread is None:
+            self._start()
+
+    def tick_finished(self, key):
+        """
+        Mark the end of a tick.
+
+        Args:
+            key: Name passed to tick_started()
+        """
+        tick = self._ticks.pop(key, None)
+        if tick is not None and tick[2] is not None:
+            report = tick[2]
+            report['duration'] = round(time.monotonic() - tick[1], 3)
+            report['finished'] = True
+            logger.warning(f"Slow tick in {key} finished after {report['duration']:.2f}s")
+
+    def _start(self):
+        """Start the watchdog thread once."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch_loop, name='slow-tick-watchdog',
+                                                daemon=True)
+                self._thread.start()
+
+    def _watch_loop(self):
+        """Check the open ticks against the threshold."""
+        while True:
+            threshold = self.threshold
+            time.sleep(min(max(threshold or 1.0, 0.01) / 4, 0.25))
+            if not threshold:
+                continue
+            try:
+                now = time.monotonic()
+                for key, tick in list(self._ticks.items()):
+                    ident, started, report = tick
+                    if report is None and now - started >= threshold:
+                        tick[2] = self._capture(key, ident, now - started)
+            except Exception as e:
+                logger.error(f"Error in slow-tick watchdog: {e}")
+
+    def _capture(self, key, ident, elapsed):
+        """
+        Record the stack of a thread stuck in a slow tick.
+
+        Args:
+            key: Loop name
+            ident: Thread identifier
+            elapsed: Seconds the tick has been running
+
+        Returns:
+            dict: The report
+        """
+        frame = sys._current_frames().get(ident)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        report = {
+            'key': key,
+            'detected_at': timezone.now().isoformat(),
+            'duration': round(elapsed, 3),
+            'finished': False,
+            'collapsed': collapse_stack(frame, key) if frame is not None else None,
+            'stack': [line.rstrip('\n') for line in stack],
+        }
+        self.slow_ticks += 1
+        self.reports.append(report)
+        logger.warning(f"Slow tick in {key}: running for {elapsed:.2f}s, stack:\n{''.join(stack)}")
+        return report
+
+    def get_stats(self):
+        """
+        Get watchdog statistics and recent reports.
+
+        Returns:
+            dict: Threshold, slow tick count and reports (newest last)
+        """
+        return {
+            'threshold': self.threshold,
+            'slow_ticks': self.slow_ticks,
+            'open_ticks': sorted(self._ticks),
+            'reports': list(self.reports),
+        }
+
+
+# Process-wide watchdog shared by all loops
+watchdog = SlowTickWatchdog()
@@ -0,0 +1,216 @@
+"""
+Event Retention Module
+Prunes old TrafficEvent rows in small batches, optionally archiving them
+"""
+import gzip
+import json
+import threading
+import time
+import logging
+from datetime import timedelta
+from pathlib import Path
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import TrafficEvent
+
+logger = logging.getLogger('traffic_control')
+
+# Columns written to the archive - every TrafficEvent field, so archived rows can be restored
+ARCHIVE_COLUMNS = ('id', 'timestamp', 'intersection', 'direction', 'event_type', 'description',
+                   'vehicles_detected', 'light_state')
+
+
+class RetentionJob:
+    """
+    Deletes events older than the retention period.
+
+    Rows are removed oldest first in batches of batch_size, each in its own
+    short transaction with a pause in between, so the persistence writer
+    never waits long for the SQLite write lock. Before a batch is deleted it
+    is appended to a gzip-compressed NDJSON file per day; a crash between
+    archiving and deleting can therefore archive a batch twice, but never
+    loses it.
+    """
+
+    def __init__(self, retention_days=30, archive_dir=None, batch_size=500, pause=0.05):
+        """
+        Initialize retention job.
+
+        Args:
+            retention_days: Keep events newer than this many days
+            archive_dir: Directory for archive files, or None to delete only
+            batch_size: Rows deleted per transaction
+            pause: Seconds to sleep between batches
+        """
+        self.retention_days = retention_days
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.batch_size = batch_size
+        self.pause = pause
+        self.is_running = False
+        self.worker_thread = None
+        self._stop_event = threading.Event()
+
+        # Statistics
+        self.runs = 0
+        self.rows_pruned = 0
+        self.rows_archived = 0
+        self.batches = 0
+        self.last_run = None
+        self.last_run_pruned = 0
+        self.last_run_duration = None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a job from TRAFFIC_CONFIG.
+
+        Args:
+            config: TRAFFIC_CONFIG dict
+
+        Returns:
+            RetentionJob: Configured job
+        """
+        return cls(
+            retention_days=config.get('EVENT_RETENTION_DAYS', 30),
+            archive_dir=config.get('EVENT_ARCHIVE_DIR'),
+            batch_size=config.get('RETENTION_BATCH_SIZE', 500)
+        )
+
+    def start(self, interval):
+        """
+        Run the job periodically in a background thread.
+
+        Args:
+            interval: Seconds between runs
+        """
+        if self.is_running:
+            return
+        self.is_running = True
+        self._stop_event.clear()
+        self.worker_thread = threading.Thread(target=self._run_loop, args=(interval,), name='retention',
+                                              daemon=True)
+        self.worker_thread.start()
+        logger.info(f"Event retention started ({self.retention_days} days, every {interval}s)")
+
+    def stop(self):
+        """Stop the background thread after the current batch."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=10)
+        self.worker_thread = None
+        logger.info("Event retention stopped")
+
+    def _run_loop(self, interval):
+        """Run the job until stopped."""
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Error pruning events: {e}")
+                self._stop_event.wait(interval)
+        finally:
+            connection.close()
+
+    def run_once(self, now=None):
+        """
+        Prune (and archive) everything older than the retention period.
+
+        Args:
+            now: Reference time (defaults to now)
+
+        Returns:
+            int: Rows pruned
+        """
+        cutoff = (now or timezone.now()) - timedelta(days=self.retention_days)
+        started = time.monotonic()
+        pruned = 0
+
+        while not self._stop_event.is_set():
+            batch_pruned = self._prune_batch(cutoff)
+            if not batch_pruned:
+                break
+            pruned += batch_pruned
+            if batch_pruned < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+        self.runs += 1
+        self.last_run = timezone.now()
+        self.last_run_pruned = pruned
+        self.last_run_duration = time.monotonic() - started
+        if pruned:
+            logger.info(f"Pruned {pruned} events older than {cutoff:%Y-%m-%d %H:%M} "
+                        f"in {self.last_run_duration:.1f}s")
+        return pruned
+
+    def _prune_batch(self, cutoff):
+        """
+        Archive and delete the oldest batch of expired events.
+
+        Args:
+            cutoff: Events before this time expire
+
+        Returns:
+            int: Rows deleted
+        """
+        rows = list(
+            TrafficEvent.objects.filter(timestamp__lt=cutoff)
+            .order_by('timestamp', 'id')
+            .values_list(*ARCHIVE_COLUMNS)[:self.batch_size]
+        )
+        if not rows:
+            return 0
+
+        if self.archive_dir is not None:
+            self._archive(rows)
+
+        with transaction.atomic():
+            deleted, _ = TrafficEvent.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+        self.batches += 1
+        self.rows_pruned += deleted
+        return deleted
+
+    def _archive(self, rows):
+        """
+        Append rows to their per-day compressed archive files.
+
+        Args:
+            rows: values_list rows in ARCHIVE_COLUMNS order
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        by_day = {}
+        for row in rows:
+            record = dict(zip(ARCHIVE_COLUMNS, row))
+            record['timestamp'] = row[1].isoformat()
+            by_day.setdefault(row[1].date(), []).append(json.dumps(record) + '\n')
+
+        for day, lines in by_day.items():
+            # Appending adds a gzip member; readers decompress all members in order
+            path = self.archive_dir / f'events-{day:%Y-%m-%d}.ndjson.gz'
+            with gzip.open(path, 'at', encoding='utf-8') as archive:
+                archive.writelines(lines)
+            self.rows_archived += len(lines)
+
+    def get_stats(self):
+        """
+        Get retention statistics.
+
+        Returns:
+            dict: Run counts, rows pruned/archived and last run details
+        """
+        return {
+            'retention_days': self.retention_days,
+            'runs': self.runs,
+            'batches': self.batches,
+            'rows_pruned': self.rows_pruned,
+            'rows_archived': self.rows_archived,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_run_pruned': self.last_run_pruned,
+            'last_run_duration': self.last_run_duration,
+        }
@@ -0,0 +1,219 @@
+"""
+Traffic Rollups Module
+Incrementally maintained per-minute and per-hour traffic statistics
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db.models import F
+from .models import TrafficEvent, TrafficRollup
+from .intersection import DEFAULT_INTERSECTION
+
+# Rollup periods and how to find the start of a timestamp's bucket
+PERIOD_FLOORS = {
+    'MINUTE': lambda timestamp: timestamp.replace(second=0, microsecond=0),
+    'HOUR': lambda timestamp: timestamp.replace(minute=0, second=0, microsecond=0),
+}
+
+# Counters kept per bucket
+ROLLUP_FIELDS = ('vehicles_detected', 'light_changes', 'green_seconds',
+                 'max_green_hits', 'wait_seconds', 'waits')
+
+
+class RollupAggregator:
+    """
+    Turns the ordered TrafficEvent stream into rollup counter deltas.
+
+    Per intersection and direction it remembers when the light turned green
+    and when a vehicle started waiting, so durations can be derived from
+    event pairs:
+
+    - GREEN light change: vehicles_detected and light_changes, plus one wait
+      (since the VEHICLE_DETECTED event) if the direction was waiting
+    - RED light change: light_changes, green_seconds and max_green_hits
+    - VEHICLE_DETECTED: starts a wait, NO_VEHICLE abandons it
+    - SYSTEM_START / SYSTEM_STOP: forget the intersection's open phases and waits
+
+    Durations are booked in the bucket of the event that ends them. The same
+    logic serves the live writer and the backfill command.
+    """
+
+    def __init__(self, max_green_time, max_green_times=None):
+        """
+        Initialize aggregator.
+
+        Args:
+            max_green_time: MAX_GREEN_TIME in seconds, to recognise forced switches
+            max_green_times: Optional {intersection_id: MAX_GREEN_TIME} overrides
+        """
+        self.max_green_time = max_green_time
+        self.max_green_times = max_green_times or {}
+        self._green_since = {}
+        self._waiting_since = {}
+
+    def checkpoint(self):
+        """
+        Copy the open phases and waits.
+
+        Returns:
+            tuple: State for restore()
+        """
+        return dict(self._green_since), dict(self._waiting_since)
+
+    def restore(self, checkpoint):
+        """
+        Return to a checkpoint, e.g. when the deltas computed since were not stored.
+
+        Args:
+            checkpoint: Result of checkpoint()
+        """
+        self._green_since, self._waiting_since = (dict(state) for state in checkpoint)
+
+    def _bump(self, deltas, timestamp, intersection_id, direction, **counters):
+        """Add counters to the minute and hour buckets of a timestamp."""
+        for period, floor in PERIOD_FLOORS.items():
+            bucket = deltas[(period, floor(timestamp), intersection_id, direction)]
+            for name, value in counters.items():
+                bucket[name] += value
+
+    def add_events(self, events, deltas=None):
+        """
+        Feed events in chronological order.
+
+        Args:
+            events: Iterable of dicts with TrafficEvent field values
+            deltas: Existing deltas to add to (a new dict if None)
+
+        Returns:
+            dict: {(period, period_start, intersection, direction): {counter: delta}}
+        """
+        if deltas is None:
+            deltas = defaultdict(lambda: defaultdict(int))
+
+        for event in events:
+            event_type = event['event_type']
+            intersection_id = event.get('intersection', DEFAULT_INTERSECTION)
+            direction = event['direction']
+            timestamp = event['timestamp']
+            key = (intersection_id, direction)
+
+            if event_type in ('SYSTEM_START', 'SYSTEM_STOP'):
+                for state in (self._green_since, self._waiting_since):
+                    for open_key in [k for k in state if k[0] == intersection_id]:
+                        del state[open_key]
+
+            elif direction == 'BOTH':
+                continue
+
+            elif event_type == 'VEHICLE_DETECTED':
+                self._waiting_since.setdefault(key, timestamp)
+
+            elif event_type == 'NO_VEHICLE':
+                self._waiting_since.pop(key, None)
+
+            elif event_type == 'LIGHT_CHANGE' and event.get('light_state') == 'GREEN':
+                counters = {'light_changes': 1, 'vehicles_detected': event.get('vehicles_detected', 0)}
+                waiting_since = self._waiting_since.pop(key, None)
+                if waiting_since is not None:
+                    counters['wait_seconds'] = (timestamp - waiting_since).total_seconds()
+                    counters['waits'] = 1
+                self._green_since[key] = timestamp
+                self._bump(deltas, timestamp, intersection_id, direction, **counters)
+
+            elif event_type == 'LIGHT_CHANGE' and event.get('light_state') == 'RED':
+                counters = {'light_changes': 1}
+                green_since = self._green_since.pop(key, None)
+                if green_since is not None:
+                    green_seconds = (timestamp - green_since).total_seconds()
+                    max_green_time = self.max_green_times.get(intersection_id, self.max_green_time)
+                    counters['green_seconds'] = green_seconds
+                    counters['max_green_hits'] = int(green_seconds >= max_green_time)
+                self._bump(deltas, timestamp, intersection_id, direction, **counters)
+
+        return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Add counter deltas to the rollup table (call inside a transaction).
+
+    Args:
+        deltas: Result of RollupAggregator.add_events
+    """
+    for (period, period_start, intersection_id, direction), counters in deltas.items():
+        bucket = {'period': period, 'period_start': period_start,
+                  'intersection': intersection_id, 'direction': direction}
+        updated = TrafficRollup.objects.filter(**bucket).update(
+            **{name: F(name) + value for name, value in counters.items()}
+        )
+        if not updated:
+            TrafficRollup.objects.create(**bucket, **counters)
+
+
+def rebuild_start(since=None):
+    """
+    Find the first hour whose rollups can be recomputed from stored events.
+
+    Retention deletes old events but keeps their rollups, so rollups older
+    than the oldest stored event must survive a rebuild. If rollups exist
+    before the oldest event's hour, that hour may have lost events too and
+    is kept as well.
+
+    Args:
+        since: Earliest time the caller wants rebuilt (None: as early as possible)
+
+    Returns:
+        datetime or None: Start of the first hour to rebuild, or None if no events are stored
+    """
+    oldest = TrafficEvent.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None:
+        return None
+    start = PERIOD_FLOORS['HOUR'](oldest)
+    if TrafficRollup.objects.filter(period_start__lt=start).exists():
+        start += timedelta(hours=1)
+    if since is not None:
+        start = max(start, PERIOD_FLOORS['HOUR'](since))
+    return start
+
+
+def rebuild_rollups(max_green_time, since=None, chunk_size=2000, max_green_times=None):
+    """
+    Recompute rollups from stored events (call inside a transaction).
+
+    Only hours that are fully covered by stored events are replaced (see
+    rebuild_start), so rollups of pruned events are kept.
+
+    Args:
+        max_green_time: MAX_GREEN_TIME in seconds
+        since: Only rebuild from the hour containing this time (None: all stored events)
+        chunk_size: Events fetched per database round trip
+        max_green_times: Optional {intersection_id: MAX_GREEN_TIME} overrides
+
+    Returns:
+        tuple: (events processed, rollup rows written)
+    """
+    since = rebuild_start(since)
+    if since is None:
+        return 0, 0
+    events = TrafficEvent.objects.filter(timestamp__gte=since).order_by('timestamp', 'id')
+    rollups = TrafficRollup.objects.filter(period_start__gte=since)
+
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    fields = ('timestamp', 'intersection', 'direction', 'event_type', 'vehicles_detected', 'light_state')
+    aggregator = RollupAggregator(max_green_time, max_green_times)
+    deltas = aggregator.add_events(counted(events.values(*fields).iterator(chunk_size=chunk_size)))
+
+    rollups.delete()
+    rows = [
+        TrafficRollup(period=period, period_start=period_start, intersection=intersection_id,
+                      direction=direction, **counters)
+        for (period, period_start, intersection_id, direction), counters in deltas.items()
+    ]
+    TrafficRollup.objects.bulk_create(rows, batch_size=500)
+    return count, len(rows)
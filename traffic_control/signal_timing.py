@@ -0,0 +1,265 @@
+"""
+Signal Timing Module
+Phase selection and green-time policies driven by measured demand
+"""
+import math
+
+# Policies selectable with TRAFFIC_CONFIG['TIMING_MODE']
+TIMING_MODES = ('fixed', 'adaptive')
+
+
+class ApproachDemand:
+    """
+    Demand of one approach, measured incrementally from its vehicle counts.
+
+    The queue is the latest count. Arrivals are count increases between two
+    ticks (a lower bound while the approach discharges on green), turned into
+    a rate by an exponentially decaying sum: rate = rate * exp(-dt / window)
+    + arrivals / window. The approach also remembers since when it has been
+    waiting at red and since when its count has read zero.
+    """
+
+    __slots__ = ('queue', 'arrival_rate', 'waiting_since', 'empty_since', '_last_update')
+
+    def __init__(self):
+        """Initialize an approach without demand."""
+        self.queue = 0
+        self.arrival_rate = 0.0
+        self.waiting_since = None
+        self.empty_since = None
+        self._last_update = None
+
+    def update(self, count, now, is_green, window):
+        """
+        Feed the vehicle count of a new tick.
+
+        Args:
+            count: Vehicles detected on the approach
+            now: Current time (seconds)
+            is_green: True if the approach currently has GREEN
+            window: Time constant of the arrival rate (seconds)
+        """
+        if self._last_update is not None:
+            elapsed = max(0.0, now - self._last_update)
+            self.arrival_rate *= math.exp(-elapsed / window)
+        self.arrival_rate += max(0, count - self.queue) / window
+
+        # A single empty reading (a missed detection) does not end the wait
+        if is_green or (count == 0 and self.empty_since is not None):
+            self.waiting_since = None
+        elif count > 0 and self.waiting_since is None:
+            self.waiting_since = now
+
+        if count == 0:
+            if self.empty_since is None:
+                self.empty_since = now
+        else:
+            self.empty_since = None
+
+        self.queue = count
+        self._last_update = now
+
+
+class FixedTiming:
+    """
+    The classic policy: phases are served round-robin whenever they have
+    vehicles, and a green phase lasts until its queue is empty (after
+    MIN_GREEN_TIME) or MAX_GREEN_TIME is reached.
+    """
+
+    def __init__(self, config, phases):
+        """
+        Initialize policy.
+
+        Args:
+            config: TRAFFIC_CONFIG dictionary
+            phases: Approach index tuples from get_phases()
+        """
+        self.phases = phases
+        self.min_green = config['MIN_GREEN_TIME']
+        self.max_green = config['MAX_GREEN_TIME']
+
+    def phase_queue(self, phase, demands):
+        """Vehicles waiting on the approaches of a phase."""
+        return sum(demands[index].queue for index in self.phases[phase])
+
+    def choose_phase(self, demands, last_phase, exclude, now):
+        """
+        Pick the phase to turn GREEN next.
+
+        Args:
+            demands: ApproachDemand per approach
+            last_phase: Most recently served phase, or None
+            exclude: Phase that must not be chosen (the one that just ended)
+            now: Current time (seconds)
+
+        Returns:
+            int or None: Phase index, or None if no phase has vehicles
+        """
+        start = 0 if last_phase is None else last_phase + 1
+        for offset in range(len(self.phases)):
+            phase = (start + offset) % len(self.phases)
+            if phase != exclude and self.phase_queue(phase, demands) > 0:
+                return phase
+        return None
+
+    def should_end(self, phase, demands, green_start, now):
+        """
+        Decide whether the green phase ends now.
+
+        Args:
+            phase: Index of the green phase
+            demands: ApproachDemand per approach
+            green_start: Time the phase turned GREEN
+            now: Current time (seconds)
+
+        Returns:
+            bool: True to switch the phase to RED
+        """
+        green_duration = now - green_start
+        if green_duration < self.min_green:
+            return False
+        return self.phase_queue(phase, demands) == 0 or green_duration >= self.max_green
+
+    def next_deadline(self, phase, demands, green_start, now):
+        """
+        Get the next time should_end() can change its answer without new counts.
+
+        Args:
+            phase: Index of the green phase
+            demands: ApproachDemand per approach
+            green_start: Time the phase turned GREEN
+            now: Current time (seconds)
+
+        Returns:
+            float: Deadline in the same clock as now
+        """
+        min_deadline = green_start + self.min_green
+        if now < min_deadline:
+            return min_deadline
+        return green_start + self.max_green
+
+
+class AdaptiveTiming(FixedTiming):
+    """
+    Queue-aware policy: max-pressure phase selection with actuated gap-out.
+
+    - The next phase is the one with the highest pressure: the vehicles it
+      would serve (queue plus arrivals expected during MIN_GREEN_TIME),
+      weighted up the longer they have waited at red. A phase that has
+      waited as long as round-robin could make it wait, MAX_GREEN_TIME for
+      each other phase, is served before any other, so none waits longer
+      than under FixedTiming. Ties fall back to round-robin order.
+    - A green phase gaps out once its count has read zero for GAP_OUT_TIME
+      rather than on the first zero, so a vehicle the detector misses for a
+      frame or two does not cut the green short and force an extra cycle.
+      It always ends at MAX_GREEN_TIME.
+    """
+
+    def __init__(self, config, phases):
+        """
+        Initialize policy.
+
+        Args:
+            config: TRAFFIC_CONFIG dictionary
+            phases: Approach index tuples from get_phases()
+        """
+        super().__init__(config, phases)
+        self.gap_out = config.get('GAP_OUT_TIME', 0.5)
+        # Longest wait at red under round-robin: every other phase runs to MAX_GREEN_TIME
+        self.starvation_time = max(len(phases) - 1, 1) * self.max_green
+
+    def pressure(self, phase, demands, now):
+        """
+        Get the pressure of a phase.
+
+        Args:
+            phase: Phase index
+            demands: ApproachDemand per approach
+            now: Current time (seconds)
+
+        Returns:
+            float: Expected vehicles served, weighted by waiting time
+        """
+        pressure = 0.0
+        for index in self.phases[phase]:
+            demand = demands[index]
+            if demand.queue == 0:
+                continue
+            waited = now - demand.waiting_since if demand.waiting_since is not None else 0.0
+            expected = demand.queue + demand.arrival_rate * self.min_green
+            # Doubles after waiting the starvation time (max() keeps MAX_GREEN_TIME 0 valid)
+            pressure += expected * (1.0 + waited / max(self.starvation_time, 1.0))
+        return pressure
+
+    def waited(self, phase, demands, now):
+        """Seconds the longest-waiting approach of a phase has been waiting at red."""
+        return max((now - demands[index].waiting_since for index in self.phases[phase]
+                    if demands[index].waiting_since is not None), default=0.0)
+
+    def choose_phase(self, demands, last_phase, exclude, now):
+        """Pick the waiting phase with the highest pressure (see FixedTiming.choose_phase)."""
+        start = 0 if last_phase is None else last_phase + 1
+        best_phase = None
+        best_key = (False, 0.0)
+        for offset in range(len(self.phases)):
+            phase = (start + offset) % len(self.phases)
+            if phase == exclude:
+                continue
+            pressure = self.pressure(phase, demands, now)
+            if not pressure:
+                continue
+            # Phases kept waiting for the starvation time go first, longest wait first
+            waited = self.waited(phase, demands, now)
+            starving = waited >= self.starvation_time
+            key = (starving, waited if starving else pressure)
+            if key > best_key:
+                best_phase, best_key = phase, key
+        return best_phase
+
+    def _empty_since(self, phase, demands):
+        """Time since when every approach of the phase reads zero, or None."""
+        times = [demands[index].empty_since for index in self.phases[phase]]
+        if any(empty_since is None for empty_since in times):
+            return None
+        return max(times)
+
+    def should_end(self, phase, demands, green_start, now):
+        """End after GAP_OUT_TIME without vehicles or at MAX_GREEN_TIME (see FixedTiming.should_end)."""
+        green_duration = now - green_start
+        if green_duration < self.min_green:
+            return False
+        if green_duration >= self.max_green:
+            return True
+        empty_since = self._empty_since(phase, demands)
+        return empty_since is not None and now - empty_since >= self.gap_out
+
+    def next_deadline(self, phase, demands, green_start, now):
+        """Include the gap-out time in the deadline (see FixedTiming.next_deadline)."""
+        deadline = super().next_deadline(phase, demands, green_start, now)
+        empty_since = self._empty_since(phase, demands)
+        if empty_since is not None:
+            deadline = min(deadline, max(empty_since + self.gap_out, green_start + self.min_green))
+        return deadline
+
+
+def get_timing_policy(config, phases):
+    """
+    Create the timing policy selected by TRAFFIC_CONFIG['TIMING_MODE'].
+
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+        phases: Approach index tuples from get_phases()
+
+    Returns:
+        FixedTiming: Policy instance
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    mode = config.get('TIMING_MODE', 'fixed')
+    if mode == 'fixed':
+        return FixedTiming(config, phases)
+    if mode == 'adaptive':
+        return AdaptiveTiming(config, phases)
+    raise ValueError(f"Unknown TIMING_MODE: {mode} (expected one of {TIMING_MODES})")
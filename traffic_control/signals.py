@@ -1 +1,29 @@
-# Placeholder for signals
+"""
+Signal handlers for the traffic control app
+"""
+import logging
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('traffic_control')
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to each new SQLite connection.
+    
+    Args:
+        sender: Database backend class
+        connection: New DatabaseWrapper
+    """
+    if connection.vendor != 'sqlite':
+        return
+    
+    try:
+        with connection.cursor() as cursor:
+            for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+    except Exception as e:
+        logger.error(f"Error applying SQLite pragmas: {e}")
@@ -0,0 +1,390 @@
+"""
+Traffic Simulation Module
+Seeded arrival models, a queueing intersection and a faster-than-real-time
+driver for the TrafficController
+"""
+import math
+import time
+import logging
+import numpy as np
+from .intersection import get_approaches
+
+logger = logging.getLogger('traffic_control')
+
+# Arrival models selectable with TRAFFIC_CONFIG['SIMULATION_MODEL']
+SIMULATION_MODELS = ('poisson', 'rush-hour', 'platoon')
+
+
+class SimulatedClock:
+    """Clock for the TrafficController that only moves when advanced."""
+
+    def __init__(self, start=0.0):
+        """
+        Initialize clock.
+
+        Args:
+            start: Initial time in seconds
+        """
+        self._now = start
+
+    def time(self):
+        """Current simulated time (stands in for time.time())."""
+        return self._now
+
+    def monotonic(self):
+        """Current simulated time (stands in for time.monotonic())."""
+        return self._now
+
+    def advance_to(self, now):
+        """Move the clock forward to `now`."""
+        self._now = max(self._now, now)
+
+
+class PoissonArrivals:
+    """Independent arrivals at a constant mean rate."""
+
+    def __init__(self, rate):
+        """
+        Initialize model.
+
+        Args:
+            rate: Mean arrivals per minute
+        """
+        self.rate = rate
+
+    def arrival_times(self, rng):
+        """
+        Generate arrival times in seconds from the start of the simulation.
+
+        Args:
+            rng: numpy Generator
+
+        Yields:
+            float: Increasing arrival times
+        """
+        if self.rate <= 0:
+            return
+        now = 0.0
+        while True:
+            now += rng.exponential(60.0 / self.rate)
+            yield now
+
+
+class RushHourArrivals:
+    """
+    Arrivals whose rate follows a daily profile with morning and evening peaks.
+
+    The rate at hour h of the day is rate * (1 + (peak_factor - 1) * bump),
+    where bump is a Gaussian of width `width` hours around each peak.
+    Arrival times are drawn by thinning a Poisson process at the peak rate.
+    """
+
+    def __init__(self, rate, peaks=(8.0, 17.5), peak_factor=3.0, width=1.0, start_hour=0.0):
+        """
+        Initialize model.
+
+        Args:
+            rate: Off-peak mean arrivals per minute
+            peaks: Hours of the day with the highest traffic
+            peak_factor: Rate multiplier at the top of a peak
+            width: Standard deviation of a peak in hours
+            start_hour: Hour of the day the simulation starts at
+        """
+        self.rate = rate
+        self.peaks = peaks
+        self.peak_factor = peak_factor
+        self.width = width
+        self.start_hour = start_hour
+
+    def rate_at(self, seconds):
+        """
+        Get the mean arrival rate at a time.
+
+        Args:
+            seconds: Seconds from the start of the simulation
+
+        Returns:
+            float: Arrivals per minute
+        """
+        hour = (self.start_hour + seconds / 3600.0) % 24
+        bump = 0.0
+        for peak in self.peaks:
+            distance = min(abs(hour - peak), 24 - abs(hour - peak))
+            bump = max(bump, math.exp(-0.5 * (distance / self.width) ** 2))
+        return self.rate * (1.0 + (self.peak_factor - 1.0) * bump)
+
+    def arrival_times(self, rng):
+        """Generate arrival times (see PoissonArrivals.arrival_times)."""
+        max_rate = self.rate * max(1.0, self.peak_factor)
+        if max_rate <= 0:
+            return
+        now = 0.0
+        while True:
+            now += rng.exponential(60.0 / max_rate)
+            if rng.random() * max_rate <= self.rate_at(now):
+                yield now
+
+
+class PlatoonArrivals:
+    """
+    Vehicles arriving in platoons, as released by an upstream signal.
+
+    Platoons arrive as a Poisson process; each holds 1 + Poisson(size - 1)
+    vehicles spaced `spacing` seconds apart, so the mean rate is `rate`.
+    """
+
+    def __init__(self, rate, size=5.0, spacing=2.0):
+        """
+        Initialize model.
+
+        Args:
+            rate: Mean arrivals per minute
+            size: Mean vehicles per platoon
+            spacing: Seconds between the vehicles of a platoon
+        """
+        self.rate = rate
+        self.size = max(1.0, size)
+        self.spacing = spacing
+
+    def arrival_times(self, rng):
+        """Generate arrival times (see PoissonArrivals.arrival_times)."""
+        if self.rate <= 0:
+            return
+        platoon_rate = self.rate / self.size
+        now = 0.0
+        while True:
+            now += rng.exponential(60.0 / platoon_rate)
+            vehicles = 1 + rng.poisson(self.size - 1.0)
+            for position in range(vehicles):
+                yield now + position * self.spacing
+            now += (vehicles - 1) * self.spacing
+
+
+def get_arrival_model(name, rate, **options):
+    """
+    Create an arrival model by name.
+
+    Args:
+        name: 'poisson', 'rush-hour' or 'platoon'
+        rate: Mean (off-peak) arrivals per minute
+        **options: Model-specific arguments
+
+    Returns:
+        Arrival model instance
+
+    Raises:
+        ValueError: If the model is unknown
+    """
+    if name == 'poisson':
+        return PoissonArrivals(rate)
+    if name == 'rush-hour':
+        return RushHourArrivals(rate, **options)
+    if name == 'platoon':
+        return PlatoonArrivals(rate, **options)
+    raise ValueError(f"Unknown simulation model: {name} (expected one of {SIMULATION_MODELS})")
+
+
+class IntersectionModel:
+    """
+    Vehicle queues of an intersection.
+
+    Vehicles join their approach's queue at their arrival time; a green
+    approach discharges one vehicle per saturation headway, starting one
+    headway after it turns green. Like a camera, the detector misses each
+    queued vehicle with probability miss_rate when counting. Each approach's
+    arrivals and the detector misses draw from their own generator spawned
+    from one seed, so a run is fully reproducible and the arrivals do not
+    depend on when the signal policy makes the detector count.
+    """
+
+    def __init__(self, models, headway=2.0, miss_rate=0.0, seed=None):
+        """
+        Initialize model.
+
+        Args:
+            models: Arrival model per approach
+            headway: Seconds between departures from a green approach
+            miss_rate: Probability that the detector misses a queued vehicle
+            seed: Random seed (None for a different run every time)
+        """
+        self.headway = headway
+        self.miss_rate = miss_rate
+        seeds = np.random.SeedSequence(seed).spawn(len(models) + 1)
+        self.rng = np.random.default_rng(seeds[-1])  # Detector misses
+        self._arrivals = [model.arrival_times(np.random.default_rng(approach_seed))
+                          for model, approach_seed in zip(models, seeds)]
+        self._next_arrival = [next(arrivals, math.inf) for arrivals in self._arrivals]
+        self.queues = [[] for _ in models]
+        self._heads = [0] * len(models)  # Index of the first queued vehicle
+        self._next_departure = [None] * len(models)
+        self.now = 0.0
+
+        # Statistics
+        self.arrived = 0
+        self.waits = []
+
+    def advance(self, now, green):
+        """
+        Move the queues forward to `now`.
+
+        Args:
+            now: Simulated time in seconds
+            green: Indices of the approaches that have GREEN
+        """
+        for index, queue in enumerate(self.queues):
+            while self._next_arrival[index] <= now:
+                queue.append(self._next_arrival[index])
+                self.arrived += 1
+                self._next_arrival[index] = next(self._arrivals[index], math.inf)
+
+            if index not in green:
+                self._next_departure[index] = None
+                continue
+            if self._next_departure[index] is None:
+                self._next_departure[index] = max(self.now, now - self.headway) + self.headway
+
+            head = self._heads[index]
+            while head < len(queue) and self._next_departure[index] <= now:
+                departure = max(self._next_departure[index], queue[head])
+                self.waits.append(departure - queue[head])
+                head += 1
+                self._next_departure[index] = departure + self.headway
+            if head == len(queue):
+                # Nobody left to discharge: the next arrival leaves one headway after it comes
+                self._next_departure[index] = max(self._next_departure[index], now)
+            if head > 1024:
+                del queue[:head]
+                head = 0
+            self._heads[index] = head
+
+        self.now = now
+
+    def queue_lengths(self):
+        """Vehicles currently queued per approach."""
+        return [len(queue) - head for queue, head in zip(self.queues, self._heads)]
+
+    def counts(self):
+        """
+        Get the vehicle counts the detector reports.
+
+        Returns:
+            list: Detected vehicles per approach
+        """
+        lengths = self.queue_lengths()
+        if not self.miss_rate:
+            return lengths
+        return [int(self.rng.binomial(length, 1.0 - self.miss_rate)) if length else 0
+                for length in lengths]
+
+
+def model_from_config(config, seed=None):
+    """
+    Build an IntersectionModel from the SIMULATION_* keys of TRAFFIC_CONFIG.
+
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+        seed: Random seed (defaults to SIMULATION_SEED)
+
+    Returns:
+        IntersectionModel: Model with one arrival model per approach
+    """
+    approaches = get_approaches(config)
+    rates = config.get('SIMULATION_RATES', 6)
+    if not isinstance(rates, (list, tuple)):
+        rates = [rates]
+    name = config.get('SIMULATION_MODEL', 'poisson')
+    models = [get_arrival_model(name, rates[index % len(rates)]) for index in range(len(approaches))]
+    return IntersectionModel(
+        models,
+        headway=config.get('SIMULATION_HEADWAY', 2.0),
+        miss_rate=config.get('SIMULATION_MISS_RATE', 0.0),
+        seed=config.get('SIMULATION_SEED') if seed is None else seed
+    )
+
+
+class SimulationRecorder:
+    """Stands in for the PersistenceWriter and counts the events of a run."""
+
+    def __init__(self):
+        """Initialize recorder."""
+        self.events = {}
+
+    def enqueue_event(self, **fields):
+        """Count a TrafficEvent by type."""
+        self.events[fields['event_type']] = self.events.get(fields['event_type'], 0) + 1
+
+    def enqueue_status(self, **fields):
+        """Status checkpoints are not needed in a simulation."""
+
+
+def run_simulation(controller, model, clock, duration, detection_interval=0.5):
+    """
+    Drive a TrafficController with simulated traffic faster than real time.
+
+    The controller must have been created with `clock`. Like the live
+    control loop, it is stepped when a detected count changes or when its
+    next timing deadline passes; in between the clock simply jumps ahead,
+    so idle periods cost nothing.
+
+    Args:
+        controller: TrafficController using the simulated clock
+        model: IntersectionModel providing the vehicle counts
+        clock: SimulatedClock shared with the controller
+        duration: Simulated seconds
+        detection_interval: Seconds between two detector readings
+
+    Returns:
+        dict: Throughput, wait distribution, switch counts and run time
+    """
+    started = time.perf_counter()
+    steps = 0
+    switches = 0
+    green_seconds = 0.0
+    last_counts = None
+
+    # Every light change is logged at INFO, far too much for a day of traffic
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for approach in controller.approaches:
+            controller.led_controller.set_red(approach.name)
+
+        ticks = int(duration / detection_interval)
+        for tick in range(ticks + 1):
+            now = tick * detection_interval
+            phase = controller.current_phase
+            green = controller.phases[phase] if phase is not None else ()
+            model.advance(now, green)
+            clock.advance_to(now)
+            if phase is not None:
+                green_seconds += detection_interval
+
+            counts = model.counts()
+            deadline = controller._next_deadline()
+            if counts != last_counts or (deadline is not None and now >= deadline):
+                controller.step(counts)
+                steps += 1
+                last_counts = counts
+                if controller.current_phase is not None and controller.current_phase != phase:
+                    switches += 1
+    finally:
+        logger.setLevel(level)
+
+    wall_seconds = time.perf_counter() - started
+    waits = np.asarray(model.waits) if model.waits else np.zeros(1)
+    return {
+        'simulated_seconds': duration,
+        'arrived': model.arrived,
+        'served': len(model.waits),
+        'queued': sum(model.queue_lengths()),
+        'throughput': len(model.waits) / (duration / 3600.0) if duration else 0.0,
+        'average_wait': float(waits.mean()),
+        'p50_wait': float(np.percentile(waits, 50)),
+        'p95_wait': float(np.percentile(waits, 95)),
+        'max_wait': float(waits.max()),
+        'switches': switches,
+        'green_seconds': green_seconds,
+        'controller_steps': steps,
+        'wall_seconds': wall_seconds,
+        'speedup': duration / wall_seconds if wall_seconds else math.inf,
+    }
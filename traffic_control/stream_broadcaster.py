@@ -0,0 +1,276 @@
+"""
+MJPEG Stream Broadcaster Module
+Annotates and JPEG-encodes each camera frame once for all video viewers
+"""
+import queue
+import threading
+import time
+import logging
+import cv2
+from .frame_hub import acquire_hub, release_hub
+
+logger = logging.getLogger('traffic_control')
+
+# Registry of running broadcasters keyed by camera index
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+class StreamClient:
+    """One connected viewer with its own bounded frame queue."""
+
+    def __init__(self, client_id, max_queue=2):
+        """
+        Initialize stream client.
+
+        Args:
+            client_id: Identifier unique within the broadcaster
+            max_queue: Frames buffered before old ones are dropped
+        """
+        self.client_id = client_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.connected_at = time.time()
+
+    def offer(self, chunk):
+        """
+        Queue a chunk without blocking, dropping the oldest one if full.
+
+        Args:
+            chunk: Encoded multipart chunk
+        """
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:
+            # Slow client - discard its oldest frame instead of stalling
+            try:
+                self.queue.get_nowait()
+                self.frames_dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(chunk)
+            except queue.Full:
+                self.frames_dropped += 1
+
+    def get_stats(self):
+        """
+        Get client statistics.
+
+        Returns:
+            dict: Frames sent/dropped and connection age
+        """
+        return {
+            'client_id': self.client_id,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'queued': self.queue.qsize(),
+            'connected_seconds': round(time.time() - self.connected_at, 1),
+        }
+
+
+class MJPEGBroadcaster:
+    """Encodes frames from a FrameHub once and fans the bytes out to clients."""
+
+    def __init__(self, hub, label, jpeg_quality=85, max_queue=2):
+        """
+        Initialize broadcaster.
+
+        Args:
+            hub: FrameHub providing processed frames
+            label: Camera label drawn on the frame
+            jpeg_quality: JPEG encoder quality (0-100)
+            max_queue: Per-client queue length
+        """
+        self.hub = hub
+        self.label = label
+        self.jpeg_quality = jpeg_quality
+        self.max_queue = max_queue
+        self.is_running = False
+        self.broadcast_thread = None
+        self.frames_encoded = 0
+
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        self._next_client_id = 1
+
+    @property
+    def viewer_count(self):
+        """Number of connected clients."""
+        return len(self._clients)
+
+    def start(self):
+        """Start the encoding thread."""
+        self.is_running = True
+        self.broadcast_thread = threading.Thread(target=self._broadcast_loop,
+                                                 name=f'mjpeg-{self.hub.camera_index}', daemon=True)
+        self.broadcast_thread.start()
+        logger.info(f"Stream broadcaster for camera {self.hub.camera_index} started")
+
+    def stop(self):
+        """Stop the encoding thread."""
+        self.is_running = False
+        if (self.broadcast_thread and self.broadcast_thread.is_alive()
+                and self.broadcast_thread is not threading.current_thread()):
+            self.broadcast_thread.join(timeout=2)
+        self.broadcast_thread = None
+        logger.info(f"Stream broadcaster for camera {self.hub.camera_index} stopped")
+
+    def add_client(self):
+        """
+        Register a new viewer.
+
+        Returns:
+            StreamClient: The client whose queue receives encoded frames
+        """
+        with self._clients_lock:
+            client = StreamClient(self._next_client_id, max_queue=self.max_queue)
+            self._next_client_id += 1
+            self._clients[client.client_id] = client
+            return client
+
+    def remove_client(self, client):
+        """
+        Unregister a viewer.
+
+        Args:
+            client: Client returned by add_client
+        """
+        with self._clients_lock:
+            self._clients.pop(client.client_id, None)
+
+    def _broadcast_loop(self):
+        """Wait for new frames, encode them once and hand them to every client."""
+        sequence = 0
+
+        while self.is_running and not self.hub.is_closed:
+            try:
+                result = self.hub.wait_for_frame(sequence, timeout=1.0)
+                if result is None:
+                    continue
+                sequence, vehicle_count, frame = result
+
+                if not self._clients:
+                    continue
+
+                chunk = self._encode(frame, vehicle_count)
+                if chunk is None:
+                    continue
+                self.frames_encoded += 1
+
+                with self._clients_lock:
+                    clients = list(self._clients.values())
+                for client in clients:
+                    client.offer(chunk)
+
+            except Exception as e:
+                logger.error(f"Error broadcasting camera {self.hub.camera_index}: {e}")
+                time.sleep(0.1)
+
+        self.is_running = False
+
+    def _encode(self, shared_frame, vehicle_count):
+        """
+        Annotate and encode a frame as one multipart chunk.
+
+        Args:
+            shared_frame: Read-only frame from the hub
+            vehicle_count: Number of vehicles detected in the frame
+
+        Returns:
+            bytes or None: Multipart chunk, or None if encoding failed
+        """
+        # Shared frame is read-only - annotate a private copy
+        frame = shared_frame.copy()
+
+        # Add vehicle count overlay
+        cv2.putText(frame, f'Vehicles: {vehicle_count}',
+                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
+                    1, (0, 255, 0), 2)
+
+        # Add camera label
+        cv2.putText(frame, self.label,
+                    (10, frame.shape[0] - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7, (255, 255, 255), 2)
+
+        # Encode frame as JPEG
+        ret, buffer = cv2.imencode('.jpg', frame,
+                                   [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ret:
+            return None
+
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+    def get_stats(self):
+        """
+        Get broadcaster statistics.
+
+        Returns:
+            dict: Viewer count, encoded frames and per-client counters
+        """
+        with self._clients_lock:
+            clients = [client.get_stats() for client in self._clients.values()]
+        return {
+            'camera_index': self.hub.camera_index,
+            'label': self.label,
+            'viewers': len(clients),
+            'frames_encoded': self.frames_encoded,
+            'clients': clients,
+        }
+
+
+def subscribe(camera_index, label, jpeg_quality=85, **detector_options):
+    """
+    Connect a viewer to the shared broadcaster for a camera.
+
+    Args:
+        camera_index: Camera device index
+        label: Camera label drawn on the frame
+        jpeg_quality: JPEG quality used if the broadcaster is created
+        **detector_options: Passed to the frame hub if it is created
+
+    Returns:
+        tuple: (broadcaster, client)
+    """
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(camera_index)
+        if broadcaster is None or not broadcaster.is_running:
+            hub = acquire_hub(camera_index, **detector_options)
+            broadcaster = MJPEGBroadcaster(hub, label, jpeg_quality=jpeg_quality)
+            broadcaster.start()
+            _broadcasters[camera_index] = broadcaster
+        client = broadcaster.add_client()
+        return broadcaster, client
+
+
+def unsubscribe(broadcaster, client):
+    """
+    Disconnect a viewer, stopping the broadcaster after the last one leaves.
+
+    Args:
+        broadcaster: Broadcaster returned by subscribe
+        client: Client returned by subscribe
+    """
+    with _broadcasters_lock:
+        broadcaster.remove_client(client)
+        if broadcaster.viewer_count > 0:
+            return
+        if _broadcasters.get(broadcaster.hub.camera_index) is broadcaster:
+            del _broadcasters[broadcaster.hub.camera_index]
+    broadcaster.stop()
+    release_hub(broadcaster.hub)
+
+
+def get_stream_stats():
+    """
+    Get statistics for all running broadcasters.
+
+    Returns:
+        list: One stats dict per broadcaster
+    """
+    with _broadcasters_lock:
+        broadcasters = list(_broadcasters.values())
+    return [broadcaster.get_stats() for broadcaster in broadcasters]
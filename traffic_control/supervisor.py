@@ -0,0 +1,194 @@
+"""
+Supervisor Module
+Runs the traffic controllers of several intersections in one process
+"""
+import threading
+import logging
+from .traffic_controller import TrafficController
+from .persistence import PersistenceWriter
+from .rollups import RollupAggregator
+from .retention import RetentionJob
+from .intersection import get_intersection_configs
+
+logger = logging.getLogger('traffic_control')
+
+
+class Supervisor:
+    """
+    Hosts one TrafficController per intersection, keyed by intersection ID.
+
+    The controllers share the process-wide resources instead of each bringing
+    its own: camera hubs (and their detection workers) are shared by camera
+    source, so two intersections watching the same feed decode it once; one
+    PersistenceWriter batches the events and status of every intersection
+    into the same transactions; and a single RetentionJob prunes the table.
+    Intersections are started and stopped independently.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize supervisor.
+
+        Args:
+            config: TRAFFIC_CONFIG dictionary
+        """
+        self.config = config
+        self.intersections = get_intersection_configs(config)
+        self.controllers = {}
+        self._lock = threading.Lock()
+
+        self.writer = PersistenceWriter(
+            batch_size=config.get('PERSIST_BATCH_SIZE', 50),
+            flush_interval=config.get('PERSIST_FLUSH_INTERVAL', 1.0),
+            rollups=RollupAggregator(
+                config['MAX_GREEN_TIME'],
+                {intersection_id: intersection_config['MAX_GREEN_TIME']
+                 for intersection_id, intersection_config in self.intersections.items()}
+            )
+        )
+        self.retention = RetentionJob.from_config(config)
+
+    @property
+    def default_intersection(self):
+        """ID of the intersection served at the root URLs (the first configured)."""
+        return next(iter(self.intersections))
+
+    def get_config(self, intersection_id):
+        """
+        Get the configuration of an intersection.
+
+        Args:
+            intersection_id: Intersection identifier
+
+        Returns:
+            dict or None: Merged TRAFFIC_CONFIG, or None for an unknown intersection
+        """
+        return self.intersections.get(intersection_id)
+
+    def get(self, intersection_id):
+        """
+        Get the running controller of an intersection.
+
+        Args:
+            intersection_id: Intersection identifier
+
+        Returns:
+            TrafficController or None: None if the intersection is not running
+        """
+        return self.controllers.get(intersection_id)
+
+    def is_running(self, intersection_id):
+        """Check whether an intersection's controller is running."""
+        controller = self.controllers.get(intersection_id)
+        return controller is not None and controller.is_running
+
+    def start(self, intersection_id):
+        """
+        Start the controller of an intersection.
+
+        Args:
+            intersection_id: Intersection identifier
+
+        Returns:
+            bool: False if it was already running
+
+        Raises:
+            KeyError: If the intersection is not configured
+        """
+        with self._lock:
+            if self.is_running(intersection_id):
+                return False
+
+            controller = TrafficController(
+                self.intersections[intersection_id], intersection_id, writer=self.writer
+            )
+            if not self.controllers:
+                self._start_shared()
+            # Queued ahead of the controller's own events, so the rollup
+            # aggregator resets the intersection before its first phase
+            self._log_system_event(intersection_id, 'SYSTEM_START', 'Traffic control system started')
+            try:
+                controller.start()
+            except Exception:
+                self._log_system_event(intersection_id, 'SYSTEM_STOP', 'Traffic control system failed to start')
+                if not self.controllers:
+                    self._stop_shared()
+                raise
+            self.controllers[intersection_id] = controller
+            logger.info(f"Intersection {intersection_id} started "
+                        f"({len(self.controllers)} of {len(self.intersections)} running)")
+            return True
+
+    def stop(self, intersection_id):
+        """
+        Stop the controller of an intersection.
+
+        The shared writer and retention job are stopped with the last running
+        intersection, after the SYSTEM_STOP event has been queued.
+
+        Args:
+            intersection_id: Intersection identifier
+
+        Returns:
+            bool: False if it was not running
+        """
+        with self._lock:
+            controller = self.controllers.pop(intersection_id, None)
+            if controller is None:
+                return False
+            controller.stop()
+            self._log_system_event(intersection_id, 'SYSTEM_STOP', 'Traffic control system stopped')
+            if not self.controllers:
+                self._stop_shared()
+            logger.info(f"Intersection {intersection_id} stopped")
+            return True
+
+    def stop_all(self):
+        """Stop every running intersection."""
+        for intersection_id in list(self.controllers):
+            self.stop(intersection_id)
+
+    def _log_system_event(self, intersection_id, event_type, description):
+        """
+        Queue a system event on the shared writer.
+
+        Going through the writer keeps system events in order with the
+        controllers' events and lets the rollup aggregator see them.
+
+        Args:
+            intersection_id: Intersection identifier
+            event_type: 'SYSTEM_START' or 'SYSTEM_STOP'
+            description: Event description
+        """
+        self.writer.enqueue_event(
+            intersection=intersection_id,
+            direction='BOTH',
+            event_type=event_type,
+            description=description
+        )
+
+    def _start_shared(self):
+        """Start the writer and retention job shared by all controllers."""
+        self.writer.start()
+        retention_interval = self.config.get('RETENTION_INTERVAL', 3600)
+        if retention_interval:
+            self.retention.start(retention_interval)
+
+    def _stop_shared(self):
+        """Stop the retention job and flush the shared writer."""
+        self.retention.stop()
+        self.writer.stop()
+
+    def get_stats(self):
+        """
+        Get supervisor statistics.
+
+        Returns:
+            dict: Running intersections and shared writer statistics
+        """
+        return {
+            'intersections': sorted(self.intersections),
+            'running': sorted(self.controllers),
+            'writer': self.writer.get_stats(),
+            'retention': self.retention.get_stats(),
+        }
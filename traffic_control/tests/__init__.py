@@ -0,0 +1,4 @@
+"""
+Traffic Control Tests
+Run with: python manage.py test traffic_control
+"""
@@ -0,0 +1,92 @@
+"""
+Detector Backend Tests
+Motion backend ROI handling and DNN batch hand-off between cameras
+"""
+import threading
+import time
+import numpy as np
+from django.test import SimpleTestCase
+from traffic_control.detector_backends import DNNBackend, MotionBackend
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+class MotionBackendROITests(SimpleTestCase):
+    """Tests for the ROI handling of MotionBackend."""
+
+    def test_rejects_invalid_roi_at_construction(self):
+        with self.assertRaises(ValueError):
+            MotionBackend(roi=[(10, 10), (20, 20)])
+        with self.assertRaises(ValueError):
+            MotionBackend(roi=[(-50, -50), (-10, -50), (-10, -10)])
+
+    def test_roi_partly_outside_the_frame_is_clamped(self):
+        backend = MotionBackend(roi=[(-100, -100), (300, -100), (300, 300), (-100, 300)],
+                                detection_scale=0.5)
+        backend.detect(FRAME)
+        self.assertEqual(backend._crop, (0, 0, 151, 151))
+        self.assertEqual(backend._roi_mask.shape, (151, 151))
+
+    def test_roi_beyond_the_frame_detects_nothing(self):
+        backend = MotionBackend(roi=[(700, 100), (900, 100), (900, 300)])
+        with self.assertLogs('traffic_control', 'ERROR'):
+            self.assertEqual(backend.detect(FRAME), [])
+        # Reported once per frame size, not on every frame
+        with self.assertNoLogs('traffic_control', 'ERROR'):
+            self.assertEqual(backend.detect(FRAME), [])
+
+
+class StubDNNBackend(DNNBackend):
+    """DNNBackend with a slow fake network instead of an ONNX model."""
+
+    def __init__(self, forward_seconds=0.2):
+        self.participants = 0
+        self.supports_batching = True
+        self.batches_run = 0
+        self.frames_inferred = 0
+        self.batch_timeout = 0.05
+        self._condition = threading.Condition()
+        self._inference_lock = threading.Lock()
+        self._pending = []
+        self.forward_seconds = forward_seconds
+
+    def _forward(self, frames):
+        time.sleep(self.forward_seconds)
+        return [frame.shape for frame in frames]
+
+    def _postprocess(self, output, frame_shape):
+        return [(frame_shape[0], 0, 0, 0, 1.0)]
+
+
+class DNNBatchingTests(SimpleTestCase):
+    """Tests for the batched inference of DNNBackend."""
+
+    def test_frames_of_all_cameras_share_one_batch(self):
+        backend = StubDNNBackend()
+        for _ in range(3):
+            backend.attach()
+        results = {}
+
+        def detect(height):
+            results[height] = backend.detect(np.zeros((height, 4, 3), dtype=np.uint8))
+
+        threads = [threading.Thread(target=detect, args=(height,)) for height in (1, 2, 3)]
+        for thread in threads:
+            thread.start()
+
+        # The condition is free while the forward pass runs
+        time.sleep(0.1)
+        self.assertTrue(backend._condition.acquire(timeout=0.01))
+        backend._condition.release()
+
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {height: [(height, 0, 0, 0, 1.0)] for height in (1, 2, 3)})
+        self.assertEqual(backend.batches_run, 1)
+
+    def test_partial_batch_runs_after_timeout(self):
+        backend = StubDNNBackend(forward_seconds=0)
+        backend.attach()
+        backend.attach()
+        self.assertEqual(backend.detect(np.zeros((5, 4, 3), dtype=np.uint8)), [(5, 0, 0, 0, 1.0)])
+        self.assertEqual(backend.frames_inferred, 1)
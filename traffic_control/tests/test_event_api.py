@@ -0,0 +1,66 @@
+"""
+Event API Tests
+Filtering and keyset cursor pagination of /api/events/
+"""
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from traffic_control.models import TrafficEvent
+
+
+class EventPaginationTests(TestCase):
+    """Tests for the cursor pagination of /api/events/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Pairs of events share a timestamp, so pages split ties
+        for index in range(9):
+            TrafficEvent.objects.create(
+                timestamp=now - timedelta(seconds=index // 2),
+                direction='DIRECTION_1' if index % 3 else 'DIRECTION_2',
+                event_type='VEHICLE_DETECTED',
+                description=f'event {index}',
+            )
+        TrafficEvent.objects.create(timestamp=now - timedelta(hours=30), direction='DIRECTION_1',
+                                    event_type='VEHICLE_DETECTED', description='old')
+
+    def fetch_all(self, **params):
+        """Follow next_cursor until the last page and return all events."""
+        events, cursor = [], None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            data = self.client.get('/api/events/', query).json()
+            events += data['events']
+            cursor = data['next_cursor']
+            if cursor is None:
+                return events
+
+    def test_pages_cover_every_event_once_in_order(self):
+        events = self.fetch_all(limit=2)
+        expected = list(
+            TrafficEvent.objects.filter(timestamp__gte=timezone.now() - timedelta(hours=24))
+            .order_by('-timestamp', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual([event['id'] for event in events], expected)
+        self.assertEqual(len(expected), 9)
+
+    def test_filters_apply_to_every_page(self):
+        events = self.fetch_all(limit=1, direction='DIRECTION_2')
+        self.assertEqual(len(events), 3)
+        self.assertTrue(all(event['direction'] == 'DIRECTION_2' for event in events))
+
+    def test_last_page_has_no_cursor(self):
+        data = self.client.get('/api/events/', {'limit': 50}).json()
+        self.assertEqual(len(data['events']), 9)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get('/api/events/', {'cursor': 'nonsense'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/events/', {'direction': 'UP'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/events/', {'format': 'xml'}).status_code, 400)
+
+    def test_ndjson_export_streams_all_events(self):
+        response = self.client.get('/api/events/', {'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 9)
@@ -0,0 +1,56 @@
+"""
+Event Stream Tests
+Message history, Last-Event-ID resume and client counting
+"""
+from django.test import SimpleTestCase
+from traffic_control.event_stream import EventBroadcaster, _next_chunk, encode_message
+
+
+def snapshot(message_id):
+    """Stand-in for the status snapshot message."""
+    return b'snapshot %d' % message_id
+
+
+class EventBroadcasterTests(SimpleTestCase):
+    """Tests for EventBroadcaster and the resume logic of the streams."""
+
+    def setUp(self):
+        self.broadcaster = EventBroadcaster(history_size=3)
+        for index in range(5):
+            self.broadcaster.publish('status', {'index': index})
+
+    def test_messages_are_encoded_with_increasing_ids(self):
+        messages, newest_id, complete = self.broadcaster.messages_after(4)
+        self.assertEqual(messages, [encode_message(5, 'status', {'index': 4})])
+        self.assertEqual(newest_id, 5)
+        self.assertTrue(complete)
+
+    def test_resume_within_history_sends_only_missed_messages(self):
+        chunk, last_id = _next_chunk(self.broadcaster, 3, snapshot)
+        self.assertEqual(last_id, 5)
+        self.assertIn(b'id: 4\n', chunk)
+        self.assertIn(b'id: 5\n', chunk)
+        self.assertNotIn(b'id: 3\n', chunk)
+
+    def test_up_to_date_client_gets_nothing(self):
+        self.assertEqual(_next_chunk(self.broadcaster, 5, snapshot), (b'', 5))
+
+    def test_new_client_gets_snapshot(self):
+        self.assertEqual(_next_chunk(self.broadcaster, None, snapshot), (b'snapshot 5', 5))
+
+    def test_client_behind_history_gets_snapshot(self):
+        self.assertEqual(_next_chunk(self.broadcaster, 1, snapshot), (b'snapshot 5', 5))
+
+    def test_id_from_before_restart_gets_snapshot(self):
+        # IDs start again at 1 after a restart, so the client's id is in the future
+        self.assertEqual(_next_chunk(self.broadcaster, 900, snapshot), (b'snapshot 5', 5))
+        self.assertTrue(self.broadcaster.wait(4, timeout=0))
+
+    def test_wait_times_out_without_new_messages(self):
+        self.assertFalse(self.broadcaster.wait(5, timeout=0.01))
+
+    def test_client_count(self):
+        self.broadcaster.add_client()
+        self.broadcaster.add_client()
+        self.broadcaster.remove_client()
+        self.assertEqual(self.broadcaster.get_stats()['clients'], 1)
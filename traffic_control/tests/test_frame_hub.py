@@ -0,0 +1,137 @@
+"""
+Frame Hub Tests
+Sharing one camera between subscribers
+"""
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+from traffic_control import frame_hub
+from traffic_control.detection_workers import ProcessFrameHub
+from traffic_control.frame_hub import acquire_hub, release_hub
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in for a camera that is plugged in or not."""
+
+    available = True
+
+    def __init__(self, *args):
+        self.opened = FakeCapture.available
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        return False, None
+
+    def release(self):
+        pass
+
+
+def wait_until(condition, timeout=2.0):
+    """Poll condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class AcquireHubTests(SimpleTestCase):
+    """Tests for acquire_hub and release_hub."""
+
+    def setUp(self):
+        patcher = mock.patch.object(cv2, 'VideoCapture', FakeCapture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, FakeCapture, 'available', True)
+        # Camera start and stop messages
+        logging.disable(logging.INFO)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.hubs = []
+
+    def tearDown(self):
+        for hub in self.hubs:
+            release_hub(hub)
+        self.assertEqual(frame_hub._hubs, {})
+
+    def acquire(self, **options):
+        hub = acquire_hub(7, **options)
+        self.hubs.append(hub)
+        return hub
+
+    def test_subscribers_share_one_hub(self):
+        first = self.acquire(detection_threshold=500)
+        second = self.acquire(detection_threshold=500)
+        self.assertIs(first, second)
+        self.assertTrue(first.is_active)
+        self.assertEqual(first.subscribers, 2)
+
+    def test_failed_camera_is_retried(self):
+        FakeCapture.available = False
+        failed = self.acquire()
+        self.assertFalse(failed.is_active)
+        self.assertNotIn(7, frame_hub._hubs)
+
+        FakeCapture.available = True
+        hub = self.acquire()
+        self.assertIsNot(hub, failed)
+        self.assertTrue(hub.is_active)
+        self.assertIs(frame_hub._hubs[7], hub)
+
+    def test_different_options_are_reported(self):
+        first = self.acquire(detection_threshold=500)
+        with self.assertLogs('traffic_control', 'WARNING') as logs:
+            second = self.acquire(detection_threshold=900)
+        self.assertIs(first, second)
+        self.assertEqual(first.detector_options, {'detection_threshold': 500})
+        self.assertIn('already running with other detector options', logs.output[0])
+
+
+class ProcessFrameHubTests(SimpleTestCase):
+    """Tests for ProcessFrameHub."""
+
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.recording = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.recording)
+
+    def write_frames(self, *sizes):
+        """Write one image per (width, height) as the recording."""
+        for number, (width, height) in enumerate(sizes):
+            frame = np.full((height, width, 3), 20 * number, dtype=np.uint8)
+            cv2.imwrite(str(self.recording / f'{number:03d}.png'), frame)
+
+    def start_hub(self):
+        hub = ProcessFrameHub(str(self.recording), tracking=False,
+                              replay_options={'playback': 'fixed', 'fps': 20, 'frame_size': None})
+        self.addCleanup(hub.stop)
+        self.assertTrue(hub.start())
+        return hub
+
+    def test_ring_is_sized_from_the_first_frame(self):
+        self.write_frames(*[(1280, 720)] * 10)
+        hub = self.start_hub()
+        self.assertEqual(hub.slot_bytes, 1280 * 720 * 3)
+        result = hub.wait_for_frame(timeout=5)
+        self.assertIsNotNone(result)
+        self.assertEqual(result[2].shape, (720, 1280, 3))
+
+    def test_larger_frame_stops_the_worker(self):
+        self.write_frames((320, 240), (320, 240), (640, 480), (320, 240))
+        hub = self.start_hub()
+        with self.assertLogs('traffic_control', 'ERROR') as logs:
+            self.assertTrue(wait_until(lambda: not hub.is_running, timeout=5))
+        self.assertFalse(hub.is_active)
+        self.assertIn('larger than the first frame', logs.output[0])
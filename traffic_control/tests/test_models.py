@@ -0,0 +1,25 @@
+"""
+Model Tests
+Validation of stored events and rollups
+"""
+from django.test import TestCase
+from django.utils import timezone
+from traffic_control.intersection import get_approaches
+from traffic_control.models import TrafficEvent, TrafficRollup
+
+
+class DirectionValidationTests(TestCase):
+    """Tests for the direction field of TrafficEvent and TrafficRollup."""
+
+    def test_configured_approach_labels_are_valid(self):
+        config = {'APPROACHES': [
+            {'name': name, 'camera': None, 'leds': [0, 1, 2]} for name in ('north', 'east', 'south_turn')
+        ]}
+        for approach in get_approaches(config):
+            TrafficEvent(direction=approach.label, event_type='LIGHT_CHANGE',
+                         description='Light changed to GREEN', light_state='GREEN').full_clean()
+            TrafficRollup(period='MINUTE', period_start=timezone.now(),
+                          direction=approach.label).full_clean()
+
+    def test_system_events_use_both(self):
+        TrafficEvent(direction='BOTH', event_type='SYSTEM_START', description='Started').full_clean()
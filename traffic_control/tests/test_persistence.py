@@ -0,0 +1,112 @@
+"""
+Persistence Writer Tests
+Retries, requeued events and drop counts of failed database flushes
+"""
+import time
+from unittest import mock
+from django.db import OperationalError
+from django.test import TransactionTestCase
+from traffic_control.models import TrafficEvent
+from traffic_control.persistence import MAX_EVENT_FLUSHES, PersistenceWriter
+
+
+def failing_writes(failures):
+    """Patch PersistenceWriter._write to raise for the first `failures` calls (None = always)."""
+    write = PersistenceWriter._write
+    calls = []
+
+    def flaky_write(writer, batch):
+        calls.append(batch)
+        if failures is None or len(calls) <= failures:
+            raise OperationalError('database is locked')
+        return write(writer, batch)
+
+    patcher = mock.patch.object(PersistenceWriter, '_write', autospec=True, side_effect=flaky_write)
+    return patcher, calls
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class PersistenceWriterFailureTests(TransactionTestCase):
+    """Tests for PersistenceWriter when the database fails."""
+
+    def setUp(self):
+        patcher = mock.patch('traffic_control.persistence.FLUSH_RETRY_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.writer = PersistenceWriter(batch_size=10, flush_interval=0.05)
+
+    def enqueue(self, *descriptions):
+        for description in descriptions:
+            self.writer.enqueue_event(direction='DIRECTION_1', event_type='LIGHT_CHANGE',
+                                      description=description, light_state='GREEN')
+
+    def run_writer(self, condition):
+        """Run the writer thread until condition holds, then stop it."""
+        with self.assertLogs('traffic_control', 'INFO') as logs:
+            self.writer.start()
+            self.assertTrue(wait_until(condition))
+            self.writer.stop()
+        return logs.output
+
+    def written(self):
+        return list(TrafficEvent.objects.order_by('id').values_list('description', flat=True))
+
+    def test_failed_transaction_is_retried_once(self):
+        patcher, calls = failing_writes(1)
+        with patcher, self.assertLogs('traffic_control', 'WARNING'):
+            self.assertTrue(self.writer._flush([('event', {'direction': 'BOTH', 'event_type': 'ERROR',
+                                                           'description': 'first'})]))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.written(), ['first'])
+        self.assertEqual(self.writer.failed_flushes, 0)
+
+    def test_events_of_a_failed_flush_are_written_first_next_time(self):
+        patcher, calls = failing_writes(2)
+        with patcher:
+            self.enqueue('first', 'second')
+            self.run_writer(lambda: self.writer.events_written == 2)
+        self.assertEqual(self.written()[:2], ['first', 'second'])
+
+        stats = self.writer.get_stats()
+        self.assertEqual(stats['failed_flushes'], 1)
+        self.assertEqual(stats['events_dropped'], 0)
+        self.assertEqual(stats['events_written'], 2)
+
+    def test_requeued_events_keep_their_order(self):
+        patcher, _ = failing_writes(2)
+        with patcher, self.assertLogs('traffic_control', 'WARNING'):
+            batch = [('event', {'direction': 'BOTH', 'event_type': 'ERROR', 'description': name})
+                     for name in ('first', 'second')]
+            self.assertFalse(self.writer._flush(batch))
+            retry = self.writer._requeue(batch, [], stopping=False)
+            later = [('event', fields) for fields, _ in retry]
+            later.append(('event', {'direction': 'BOTH', 'event_type': 'ERROR', 'description': 'third'}))
+            self.assertTrue(self.writer._flush(later))
+        self.assertEqual(self.written(), ['first', 'second', 'third'])
+
+    def test_events_are_dropped_after_repeated_failures(self):
+        patcher, calls = failing_writes(None)
+        with patcher:
+            self.enqueue('first', 'second')
+            output = self.run_writer(lambda: self.writer.events_dropped == 2)
+        self.assertEqual(self.written(), [])
+        self.assertEqual(self.writer.failed_flushes, MAX_EVENT_FLUSHES)
+        self.assertEqual(len(calls), 2 * MAX_EVENT_FLUSHES)
+        self.assertTrue(any('Dropped 2 events' in line for line in output))
+
+    def test_unwritten_events_are_counted_when_stopping(self):
+        patcher, _ = failing_writes(None)
+        with patcher, self.assertLogs('traffic_control', 'INFO'):
+            self.writer.start()
+            self.enqueue('first')
+            self.writer.stop()
+        self.assertEqual(self.writer.get_stats()['events_dropped'], 1)
@@ -0,0 +1,78 @@
+"""
+Retention Tests
+Batched pruning and per-day archives of expired events
+"""
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from django.test import TestCase
+from traffic_control.models import TrafficEvent
+from traffic_control.retention import ARCHIVE_COLUMNS, RetentionJob
+
+NOW = datetime(2026, 3, 31, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class RetentionJobTests(TestCase):
+    """Tests for RetentionJob."""
+
+    def setUp(self):
+        self.archive_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        for days_ago in (40, 40, 35, 1):
+            for intersection_id in ('default', 'north'):
+                TrafficEvent.objects.create(
+                    timestamp=NOW - timedelta(days=days_ago),
+                    intersection=intersection_id,
+                    direction='DIRECTION_1',
+                    event_type='LIGHT_CHANGE',
+                    description='Light changed to GREEN',
+                    vehicles_detected=2,
+                    light_state='GREEN',
+                )
+        self.job = RetentionJob(retention_days=30, archive_dir=self.archive_dir, batch_size=4, pause=0)
+
+    def read_archive(self):
+        """All archived records, by file name."""
+        records = {}
+        for path in sorted(self.archive_dir.glob('*.ndjson.gz')):
+            with gzip.open(path, 'rt', encoding='utf-8') as archive:
+                records[path.name] = [json.loads(line) for line in archive]
+        return records
+
+    def test_prunes_expired_events_in_batches(self):
+        pruned = self.job.run_once(now=NOW)
+        self.assertEqual(pruned, 6)
+        self.assertEqual(self.job.batches, 2)
+        self.assertEqual(TrafficEvent.objects.count(), 2)
+        self.assertFalse(TrafficEvent.objects.filter(timestamp__lt=NOW - timedelta(days=30)).exists())
+
+    def test_archive_keeps_every_field_per_day(self):
+        expected = {
+            event.id: event for event in TrafficEvent.objects.filter(timestamp__lt=NOW - timedelta(days=30))
+        }
+        self.job.run_once(now=NOW)
+
+        archive = self.read_archive()
+        self.assertEqual(sorted(archive), ['events-2026-02-19.ndjson.gz', 'events-2026-02-24.ndjson.gz'])
+        records = [record for day in archive.values() for record in day]
+        self.assertEqual(len(records), len(expected))
+        for record in records:
+            self.assertEqual(set(record), set(ARCHIVE_COLUMNS))
+            original = expected[record['id']]
+            self.assertEqual(record['intersection'], original.intersection)
+            self.assertEqual(record['timestamp'], original.timestamp.isoformat())
+
+    def test_archived_events_can_be_restored(self):
+        self.job.run_once(now=NOW)
+        for day in self.read_archive().values():
+            TrafficEvent.objects.bulk_create(TrafficEvent(**record) for record in day)
+        self.assertEqual(TrafficEvent.objects.filter(intersection='north').count(), 4)
+        self.assertEqual(TrafficEvent.objects.count(), 8)
+
+    def test_delete_only_without_archive_dir(self):
+        job = RetentionJob(retention_days=30, archive_dir=None, pause=0)
+        self.assertEqual(job.run_once(now=NOW), 6)
+        self.assertEqual(job.rows_archived, 0)
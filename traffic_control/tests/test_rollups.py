@@ -0,0 +1,131 @@
+"""
+Rollup Tests
+Live aggregation, rebuilds after pruning and writer transaction failures
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.test import TestCase
+from traffic_control.models import TrafficEvent, TrafficRollup
+from traffic_control.persistence import PersistenceWriter
+from traffic_control.rollups import RollupAggregator, rebuild_rollups
+
+START = datetime(2026, 1, 5, 8, 0, tzinfo=dt_timezone.utc)
+
+
+def event(seconds, event_type, direction='DIRECTION_1', light_state='', vehicles=0):
+    """TrafficEvent fields at START plus seconds."""
+    return {
+        'timestamp': START + timedelta(seconds=seconds),
+        'intersection': 'default',
+        'direction': direction,
+        'event_type': event_type,
+        'description': event_type,
+        'vehicles_detected': vehicles,
+        'light_state': light_state,
+    }
+
+
+# A vehicle waits 10 s, gets 20 s of green and is counted at the switch
+CYCLE = [
+    event(0, 'VEHICLE_DETECTED', vehicles=1),
+    event(10, 'LIGHT_CHANGE', light_state='GREEN', vehicles=3),
+    event(30, 'LIGHT_CHANGE', light_state='RED'),
+]
+
+
+def hour_rollups():
+    """Counters of the hourly rollups by (hour, direction)."""
+    return {
+        (rollup.period_start.hour, rollup.direction): (
+            rollup.vehicles_detected, rollup.light_changes, rollup.green_seconds,
+            rollup.waits, rollup.wait_seconds, rollup.max_green_hits)
+        for rollup in TrafficRollup.objects.filter(period='HOUR')
+    }
+
+
+class RollupAggregatorTests(TestCase):
+    """Tests for RollupAggregator."""
+
+    def test_cycle_counters(self):
+        deltas = RollupAggregator(max_green_time=20).add_events(CYCLE)
+        hour = deltas[('HOUR', START, 'default', 'DIRECTION_1')]
+        self.assertEqual(hour['vehicles_detected'], 3)
+        self.assertEqual(hour['light_changes'], 2)
+        self.assertEqual(hour['green_seconds'], 20.0)
+        self.assertEqual(hour['max_green_hits'], 1)
+        self.assertEqual(hour['waits'], 1)
+        self.assertEqual(hour['wait_seconds'], 10.0)
+        self.assertIn(('MINUTE', START, 'default', 'DIRECTION_1'), deltas)
+
+    def test_system_events_close_open_phases(self):
+        events = [
+            event(0, 'LIGHT_CHANGE', light_state='GREEN'),
+            event(5, 'SYSTEM_STOP', direction='BOTH'),
+            event(100, 'SYSTEM_START', direction='BOTH'),
+            event(110, 'LIGHT_CHANGE', light_state='RED'),
+        ]
+        deltas = RollupAggregator(max_green_time=60).add_events(events)
+        self.assertNotIn('green_seconds', deltas[('HOUR', START, 'default', 'DIRECTION_1')])
+
+    def test_restore_returns_to_checkpoint(self):
+        aggregator = RollupAggregator(max_green_time=60)
+        checkpoint = aggregator.checkpoint()
+        aggregator.add_events(CYCLE[:2])
+        aggregator.restore(checkpoint)
+        deltas = aggregator.add_events([CYCLE[2]])
+        self.assertNotIn('green_seconds', deltas[('HOUR', START, 'default', 'DIRECTION_1')])
+
+
+class RebuildRollupsTests(TestCase):
+    """Tests for rebuild_rollups."""
+
+    def setUp(self):
+        for hour in range(3):
+            for fields in CYCLE:
+                fields = dict(fields, timestamp=fields['timestamp'] + timedelta(hours=hour, minutes=10))
+                TrafficEvent.objects.create(**fields)
+
+    def test_rebuild_matches_live_aggregation(self):
+        rebuild_rollups(max_green_time=60)
+        self.assertEqual(hour_rollups(), {
+            (hour, 'DIRECTION_1'): (3, 2, 20.0, 1, 10.0, 0) for hour in (8, 9, 10)
+        })
+
+    def test_rebuild_keeps_rollups_of_pruned_events(self):
+        rebuild_rollups(max_green_time=60)
+        expected = hour_rollups()
+
+        # Retention deleted hour 8 and part of hour 9
+        TrafficEvent.objects.filter(timestamp__lt=START + timedelta(hours=1, minutes=10, seconds=15)).delete()
+        events, _ = rebuild_rollups(max_green_time=60)
+
+        self.assertEqual(events, 3)
+        self.assertEqual(hour_rollups(), expected)
+
+    def test_rebuild_without_events_keeps_everything(self):
+        rebuild_rollups(max_green_time=60)
+        expected = hour_rollups()
+        TrafficEvent.objects.all().delete()
+        self.assertEqual(rebuild_rollups(max_green_time=60), (0, 0))
+        self.assertEqual(hour_rollups(), expected)
+
+
+class PersistenceWriterRollupTests(TestCase):
+    """Tests for the rollups maintained by PersistenceWriter."""
+
+    def test_flush_updates_rollups(self):
+        writer = PersistenceWriter(rollups=RollupAggregator(max_green_time=60))
+        writer._flush([('event', fields) for fields in CYCLE])
+        self.assertEqual(TrafficEvent.objects.count(), 3)
+        self.assertEqual(hour_rollups(), {(8, 'DIRECTION_1'): (3, 2, 20.0, 1, 10.0, 0)})
+
+    def test_failed_flush_does_not_advance_the_aggregator(self):
+        writer = PersistenceWriter(rollups=RollupAggregator(max_green_time=60))
+        with mock.patch('traffic_control.persistence.apply_deltas', side_effect=RuntimeError('disk full')), \
+                self.assertLogs('traffic_control', 'ERROR'):
+            writer._flush([('event', fields) for fields in CYCLE[:2]])
+        self.assertEqual(TrafficEvent.objects.count(), 0)
+
+        # The GREEN of the lost batch must not produce green seconds later
+        writer._flush([('event', CYCLE[2])])
+        self.assertEqual(hour_rollups(), {(8, 'DIRECTION_1'): (0, 1, 0.0, 0, 0.0, 0)})
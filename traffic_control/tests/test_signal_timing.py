@@ -0,0 +1,114 @@
+"""
+Signal Timing Tests
+Fixed and adaptive phase selection and green-time decisions
+"""
+from django.test import SimpleTestCase
+from traffic_control.signal_timing import (
+    AdaptiveTiming, ApproachDemand, FixedTiming, get_timing_policy
+)
+
+CONFIG = {
+    'MIN_GREEN_TIME': 5,
+    'MAX_GREEN_TIME': 30,
+    'GAP_OUT_TIME': 2,
+    'ARRIVAL_RATE_WINDOW': 60,
+}
+PHASES = [(0,), (1,), (2,)]
+
+
+def make_demands(counts, now=0.0):
+    """Create approach demands that read counts at time now (all at red)."""
+    demands = [ApproachDemand() for _ in counts]
+    for demand, count in zip(demands, counts):
+        demand.update(count, now, False, CONFIG['ARRIVAL_RATE_WINDOW'])
+    return demands
+
+
+class ApproachDemandTests(SimpleTestCase):
+    """Tests for ApproachDemand."""
+
+    def test_wait_starts_at_first_vehicle_and_survives_one_missed_detection(self):
+        demand = ApproachDemand()
+        demand.update(0, 0.0, False, 60)
+        demand.update(2, 1.0, False, 60)
+        self.assertEqual(demand.waiting_since, 1.0)
+        # The first empty reading only starts empty_since
+        demand.update(0, 2.0, False, 60)
+        demand.update(1, 2.5, False, 60)
+        self.assertEqual(demand.waiting_since, 1.0)
+
+    def test_green_ends_the_wait(self):
+        demand = ApproachDemand()
+        demand.update(3, 0.0, False, 60)
+        demand.update(3, 1.0, True, 60)
+        self.assertIsNone(demand.waiting_since)
+
+    def test_arrival_rate_counts_increases(self):
+        demand = ApproachDemand()
+        demand.update(0, 0.0, False, 60)
+        demand.update(6, 0.0, False, 60)
+        self.assertAlmostEqual(demand.arrival_rate, 0.1)
+
+
+class FixedTimingTests(SimpleTestCase):
+    """Tests for FixedTiming."""
+
+    def setUp(self):
+        self.timing = FixedTiming(CONFIG, PHASES)
+
+    def test_round_robin_skips_empty_and_excluded_phases(self):
+        demands = make_demands([1, 0, 1])
+        self.assertEqual(self.timing.choose_phase(demands, None, None, 0.0), 0)
+        self.assertEqual(self.timing.choose_phase(demands, 0, 0, 0.0), 2)
+        self.assertEqual(self.timing.choose_phase(demands, 2, 2, 0.0), 0)
+        self.assertIsNone(self.timing.choose_phase(make_demands([0, 0, 0]), None, None, 0.0))
+
+    def test_green_lasts_min_green_and_ends_when_empty_or_at_max_green(self):
+        empty = make_demands([0, 0, 0])
+        busy = make_demands([3, 0, 0])
+        self.assertFalse(self.timing.should_end(0, empty, 0.0, 4.9))
+        self.assertTrue(self.timing.should_end(0, empty, 0.0, 5.0))
+        self.assertFalse(self.timing.should_end(0, busy, 0.0, 29.0))
+        self.assertTrue(self.timing.should_end(0, busy, 0.0, 30.0))
+
+    def test_next_deadline(self):
+        demands = make_demands([3, 0, 0])
+        self.assertEqual(self.timing.next_deadline(0, demands, 0.0, 1.0), 5.0)
+        self.assertEqual(self.timing.next_deadline(0, demands, 0.0, 6.0), 30.0)
+
+
+class AdaptiveTimingTests(SimpleTestCase):
+    """Tests for AdaptiveTiming."""
+
+    def setUp(self):
+        self.timing = AdaptiveTiming(CONFIG, PHASES)
+
+    def test_highest_pressure_phase_goes_first(self):
+        demands = make_demands([1, 5, 2])
+        self.assertEqual(self.timing.choose_phase(demands, None, None, 1.0), 1)
+
+    def test_starving_phase_is_served_first(self):
+        # Two other phases at MAX_GREEN_TIME 30: starving after 60 seconds at red
+        demands = make_demands([1, 0, 0], now=0.0)
+        for demand, count in zip(demands[1:], (8, 8)):
+            demand.update(count, 55.0, False, 60)
+        self.assertEqual(self.timing.choose_phase(demands, None, None, 59.0), 1)
+        self.assertEqual(self.timing.choose_phase(demands, None, None, 60.0), 0)
+
+    def test_gap_out_waits_for_gap_out_time(self):
+        demands = make_demands([0, 0, 0], now=10.0)
+        self.assertFalse(self.timing.should_end(0, demands, 0.0, 11.0))
+        self.assertTrue(self.timing.should_end(0, demands, 0.0, 12.0))
+        self.assertEqual(self.timing.next_deadline(0, demands, 0.0, 11.0), 12.0)
+
+    def test_zero_min_green_is_valid(self):
+        timing = AdaptiveTiming(dict(CONFIG, MIN_GREEN_TIME=0), PHASES)
+        demands = make_demands([2, 1, 0], now=0.0)
+        self.assertGreater(timing.pressure(0, demands, 10.0), timing.pressure(1, demands, 10.0))
+        self.assertEqual(timing.choose_phase(demands, None, None, 10.0), 0)
+
+    def test_policy_selection(self):
+        self.assertIsInstance(get_timing_policy(dict(CONFIG, TIMING_MODE='adaptive'), PHASES), AdaptiveTiming)
+        self.assertIs(type(get_timing_policy(CONFIG, PHASES)), FixedTiming)
+        with self.assertRaises(ValueError):
+            get_timing_policy(dict(CONFIG, TIMING_MODE='greedy'), PHASES)
@@ -0,0 +1,65 @@
+"""
+Simulation Tests
+Seeded traffic models and the faster-than-real-time controller driver
+"""
+from django.conf import settings
+from django.test import SimpleTestCase
+from traffic_control.management.commands.simulate_timing import simulate
+from traffic_control.signal_timing import TIMING_MODES
+from traffic_control.simulation import IntersectionModel, PoissonArrivals, get_arrival_model
+
+
+def make_model(name='poisson', rates=(12, 4), miss_rate=0.2, seed=7):
+    """Create a seeded intersection model."""
+    return IntersectionModel([get_arrival_model(name, rate) for rate in rates],
+                             miss_rate=miss_rate, seed=seed)
+
+
+class IntersectionModelTests(SimpleTestCase):
+    """Tests for IntersectionModel."""
+
+    def test_arrivals_do_not_depend_on_detector_reads(self):
+        quiet, busy = make_model(), make_model()
+        for tick in range(1, 1201):
+            quiet.advance(tick * 0.5, ())
+            busy.advance(tick * 0.5, ())
+            # Draws for missed detections must not shift the arrivals
+            for _ in range(tick % 4):
+                busy.counts()
+        self.assertEqual(quiet.queues, busy.queues)
+
+    def test_approaches_have_independent_arrivals(self):
+        # Adding an approach leaves the arrivals of the others unchanged
+        two = make_model(rates=(12, 4))
+        three = make_model(rates=(12, 4, 8))
+        two.advance(600.0, ())
+        three.advance(600.0, ())
+        self.assertEqual(two.queues, three.queues[:2])
+
+    def test_same_seed_reproduces_a_run(self):
+        runs = []
+        for _ in range(2):
+            model = IntersectionModel([PoissonArrivals(12)], miss_rate=0.3, seed=3)
+            counts = []
+            for tick in range(1, 121):
+                model.advance(tick * 0.5, (0,) if tick % 40 < 20 else ())
+                counts.append(model.counts())
+            runs.append((counts, model.waits))
+        self.assertEqual(runs[0], runs[1])
+
+
+class PolicyComparisonTests(SimpleTestCase):
+    """Tests for comparing timing policies on the same traffic."""
+
+    def test_every_policy_sees_the_same_arrivals(self):
+        config = settings.TRAFFIC_CONFIG
+        for name in ('poisson', 'platoon'):
+            results = {}
+            for mode in TIMING_MODES:
+                model = make_model(name)
+                with self.assertLogs('traffic_control', 'INFO'):
+                    results[mode] = simulate(dict(config, TIMING_MODE=mode), model, 1800)
+            arrived = {mode: result['arrived'] for mode, result in results.items()}
+            self.assertEqual(len(set(arrived.values())), 1, f"{name}: {arrived}")
+            for result in results.values():
+                self.assertEqual(result['served'] + result['queued'], result['arrived'])
@@ -0,0 +1,62 @@
+"""
+Traffic Controller Tests
+Control decisions on a simulated clock and the camera-to-simulation fallback
+"""
+from django.conf import settings
+from django.test import SimpleTestCase
+from traffic_control.simulation import SimulatedClock, SimulationRecorder
+from traffic_control.traffic_controller import TrafficController
+
+
+class FakeHub:
+    """FrameHub stand-in reporting a fixed vehicle count."""
+
+    def __init__(self, vehicle_count):
+        self.is_active = True
+        self.vehicle_count = vehicle_count
+
+    def get_latest(self):
+        return self.vehicle_count, None
+
+
+class CameraFallbackTests(SimpleTestCase):
+    """Tests for TrafficController when cameras stop working."""
+
+    def setUp(self):
+        self.config = dict(settings.TRAFFIC_CONFIG, TIMING_MODE='fixed', SIMULATION_RATES=[120, 120],
+                           SIMULATION_SEED=1, MIN_GREEN_TIME=5, MAX_GREEN_TIME=20)
+        self.clock = SimulatedClock()
+        with self.assertLogs('traffic_control', 'INFO'):
+            self.controller = TrafficController(self.config, 'test', writer=SimulationRecorder(),
+                                                clock=self.clock)
+        self.controller.hubs = [FakeHub(3), FakeHub(0)]
+
+    def test_counts_come_from_active_cameras(self):
+        self.assertEqual(self.controller._read_counts(), ([3, 0], False))
+        self.assertIsNone(self.controller.simulation)
+
+    def test_cameras_dropping_out_fall_back_to_simulation(self):
+        controller = self.controller
+        with self.assertLogs('traffic_control', 'INFO'):
+            controller.step(controller._read_counts()[0])
+        self.assertEqual(controller.current_phase, 0)
+
+        for hub in controller.hubs:
+            hub.is_active = False
+        with self.assertLogs('traffic_control', 'WARNING') as logs:
+            counts, simulation = controller._read_counts()
+        self.assertTrue(simulation)
+        self.assertIn('Falling back to SIMULATION', logs.output[0])
+        self.assertIsNotNone(controller.simulation)
+
+        # Busy simulated traffic keeps both approaches queued, so only
+        # MAX_GREEN_TIME can end the green phases
+        switches = []
+        with self.assertLogs('traffic_control', 'INFO'):
+            for tick in range(1, 121):
+                self.clock.advance_to(tick * 0.5)
+                phase = controller.current_phase
+                controller.step(controller._read_counts()[0])
+                if controller.current_phase != phase:
+                    switches.append(self.clock.time())
+        self.assertEqual(switches[:2], [20.0, 40.0])
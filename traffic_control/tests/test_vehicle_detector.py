@@ -0,0 +1,112 @@
+"""
+Vehicle Detector Tests
+Background capture thread with a single-slot frame buffer
+"""
+import queue
+import time
+from unittest import mock
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+from traffic_control.vehicle_detector import VehicleDetector
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in that returns the frames a test feeds it."""
+
+    def __init__(self, *args):
+        self.frames = queue.Queue()
+        self.reads = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        try:
+            frame = self.frames.get(timeout=0.02)
+        except queue.Empty:
+            return False, None
+        self.reads += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def wait_until(condition, timeout=2.0):
+    """Poll condition until it holds or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class CaptureThreadTests(SimpleTestCase):
+    """Tests for the threaded capture of VehicleDetector."""
+
+    def setUp(self):
+        patcher = mock.patch.object(cv2, 'VideoCapture', FakeCapture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.detector = VehicleDetector(camera_index=0, threaded_capture=True)
+        with self.assertLogs('traffic_control', 'INFO'):
+            self.assertTrue(self.detector.start())
+        self.addCleanup(self.stop_detector)
+        self.camera = self.detector.cap
+
+    def stop_detector(self):
+        with self.assertLogs('traffic_control', 'INFO'):
+            self.detector.stop()
+
+    def feed(self, count):
+        """Push frames numbered by their pixel value and wait until they are captured."""
+        captured = self.detector.frames_captured
+        frames = [np.full((48, 64, 3), captured + index + 1, dtype=np.uint8) for index in range(count)]
+        for frame in frames:
+            self.camera.frames.put(frame)
+        self.assertTrue(wait_until(lambda: self.detector.frames_captured == captured + count))
+        return frames
+
+    def test_only_the_newest_frame_is_kept(self):
+        frames = self.feed(3)
+        self.assertIs(self.detector._read_frame(), frames[-1])
+        self.assertEqual(self.detector.frames_dropped, 2)
+        self.assertGreaterEqual(self.detector.last_frame_age, 0.0)
+        self.assertLess(self.detector.last_frame_age, 2.0)
+
+    def test_slot_is_emptied_by_the_reader(self):
+        self.feed(1)
+        self.assertIsNotNone(self.detector._read_frame())
+        self.assertIsNone(self.detector._read_frame())
+        self.assertEqual(self.detector.frames_dropped, 0)
+
+    def test_last_frame_age_grows_while_frames_wait(self):
+        self.feed(1)
+        time.sleep(0.05)
+        self.detector._read_frame()
+        self.assertGreaterEqual(self.detector.last_frame_age, 0.05)
+
+    def test_detection_never_waits_for_the_camera(self):
+        # The camera delivers nothing: detection returns the last result at once
+        started = time.monotonic()
+        self.assertEqual(self.detector.detect_vehicles(), (0, None))
+        self.assertLess(time.monotonic() - started, 0.02)
+
+        self.feed(1)
+        count, frame = self.detector.detect_vehicles()
+        self.assertIsNotNone(frame)
+        self.assertEqual(self.detector.detect_vehicles(), (count, frame))
+
+    def test_capture_stats(self):
+        self.feed(2)
+        self.detector._read_frame()
+        stats = self.detector.get_capture_stats()
+        self.assertTrue(stats['threaded_capture'])
+        self.assertEqual(stats['frames_captured'], 2)
+        self.assertEqual(stats['frames_dropped'], 1)
+        self.assertIsNotNone(stats['last_frame_age'])
@@ -0,0 +1,76 @@
+"""
+Vehicle Tracker Tests
+Track confirmation, matching, expiry and the published snapshot
+"""
+from django.test import SimpleTestCase
+from traffic_control.vehicle_tracker import VehicleTracker
+
+
+class VehicleTrackerTests(SimpleTestCase):
+    """Tests for VehicleTracker."""
+
+    def setUp(self):
+        self.tracker = VehicleTracker(iou_threshold=0.3, max_distance=80, max_age=1.0, min_hits=2)
+
+    def test_track_is_confirmed_after_min_hits(self):
+        self.tracker.update([(10, 10, 50, 50)], 0.0)
+        self.assertEqual(self.tracker.queue_length, 0)
+        self.assertFalse(self.tracker.presence)
+
+        self.tracker.update([(12, 10, 50, 50, 0.9)], 0.1)
+        self.assertEqual(self.tracker.queue_length, 1)
+        self.assertTrue(self.tracker.presence)
+
+    def test_moving_vehicle_keeps_its_id(self):
+        for step in range(5):
+            self.tracker.update([(10 + step * 10, 10, 50, 50)], step * 0.1)
+        tracks = self.tracker.get_tracks()
+        self.assertEqual(len(tracks), 1)
+        track_id, box, dwell = tracks[0]
+        self.assertEqual(track_id, 1)
+        self.assertEqual(box, (50, 10, 50, 50))
+        self.assertAlmostEqual(dwell, 0.4)
+
+    def test_fast_mover_is_matched_by_centroid_distance(self):
+        self.tracker.update([(0, 0, 20, 20)], 0.0)
+        # No overlap with the previous box, but the centroid moved only 40 px
+        self.tracker.update([(40, 0, 20, 20)], 0.1)
+        self.assertEqual([track[0] for track in self.tracker.get_tracks()], [1])
+
+    def test_distant_detection_starts_a_new_track(self):
+        self.tracker.update([(0, 0, 20, 20)], 0.0)
+        self.tracker.update([(400, 400, 20, 20)], 0.1)
+        self.tracker.update([(400, 400, 20, 20)], 0.2)
+        self.assertEqual([track[0] for track in self.tracker.get_tracks()], [2])
+
+    def test_track_survives_dropouts_until_max_age(self):
+        self.tracker.update([(10, 10, 50, 50)], 0.0)
+        self.tracker.update([(10, 10, 50, 50)], 0.1)
+        self.tracker.update([], 0.9)
+        self.assertEqual(self.tracker.queue_length, 1)
+        self.tracker.update([], 1.2)
+        self.assertEqual(self.tracker.queue_length, 0)
+
+    def test_state_summarizes_confirmed_tracks(self):
+        self.tracker.update([(10, 10, 50, 50), (300, 300, 40, 40)], 0.0)
+        self.tracker.update([(10, 10, 50, 50), (300, 300, 40, 40)], 0.5)
+        state = self.tracker.get_state()
+        self.assertEqual(state['queue_length'], 2)
+        self.assertTrue(state['presence'])
+        self.assertAlmostEqual(state['max_dwell'], 0.5)
+        self.assertEqual(state['tracks'], {1: 0.5, 2: 0.5})
+
+    def test_snapshot_is_not_modified_by_later_updates(self):
+        self.tracker.update([(10, 10, 50, 50)], 0.0)
+        self.tracker.update([(10, 10, 50, 50)], 0.1)
+        snapshot = self.tracker._snapshot
+        self.tracker.update([(20, 10, 50, 50), (300, 300, 40, 40)], 0.2)
+        self.assertEqual(len(snapshot[0]), len(snapshot[1]))
+        self.assertEqual(snapshot[1][0].tolist(), [10, 10, 50, 50])
+
+    def test_reset_forgets_tracks(self):
+        self.tracker.update([(10, 10, 50, 50)], 0.0)
+        self.tracker.update([(10, 10, 50, 50)], 0.1)
+        self.tracker.reset()
+        self.assertEqual(self.tracker.get_tracks(), [])
+        self.assertEqual(self.tracker.get_state()['queue_length'], 0)
@@ -6,42 +6,114 @@ import threading
 import time
 import logging
 from django.conf import settings
-from .vehicle_detector import VehicleDetector
+from .vehicle_detector import get_detector_options
+from .frame_hub import acquire_hub, release_hub
 from .led_controller import LEDController
-from .models import TrafficEvent, SystemStatus
+from .persistence import PersistenceWriter
+from .rollups import RollupAggregator
+from .retention import RetentionJob
+from .intersection import DEFAULT_INTERSECTION, get_approaches, get_phases
+from .signal_timing import ApproachDemand, get_timing_policy
+from .simulation import model_from_config
+from .metrics import CONTROL_STAGE_SECONDS, REACTION_SECONDS
+from .profiling import watchdog
+from . import live_status
 
 logger = logging.getLogger('traffic_control')
 
 
 class TrafficController:
-    """Main controller for the smart traffic light system."""
+    """
+    Main controller for the smart traffic light system.
     
-    def __init__(self):
-        """Initialize the traffic controller."""
-        self.config = settings.TRAFFIC_CONFIG
+    The intersection is a list of approaches (camera + LED segment) grouped
+    into phases of approaches that may be green together. Which phase is
+    served next and how long it stays green is decided by the timing policy
+    (TIMING_MODE) from the demand measured per approach; all per-tick work
+    is a pass over these arrays, so the cost grows linearly with the number
+    of approaches.
+    
+    A standalone controller owns its persistence writer and retention job.
+    Under the Supervisor several controllers share one writer (and the
+    process-wide camera hubs), and the supervisor runs retention.
+    
+    All timing reads self.clock, and one control decision is step(), so the
+    simulation engine can drive a controller on a simulated clock faster
+    than real time.
+    """
+    
+    def __init__(self, config=None, intersection_id=DEFAULT_INTERSECTION, writer=None, clock=None):
+        """
+        Initialize the traffic controller.
+        
+        Args:
+            config: TRAFFIC_CONFIG of the intersection (defaults to settings.TRAFFIC_CONFIG)
+            intersection_id: Identifier stored with events and status
+            writer: Shared PersistenceWriter, or None to create and own one
+            clock: Object with time() and monotonic() (defaults to the time module)
+        """
+        self.config = config if config is not None else settings.TRAFFIC_CONFIG
+        self.intersection_id = intersection_id
+        self.clock = clock or time
         self.is_running = False
         self.control_thread = None
         
-        # Initialize components
-        self.detector_1 = VehicleDetector(
-            camera_index=self.config['CAMERA_DIRECTION_1'],
-            detection_threshold=self.config['DETECTION_THRESHOLD']
-        )
-        self.detector_2 = VehicleDetector(
-            camera_index=self.config['CAMERA_DIRECTION_2'],
-            detection_threshold=self.config['DETECTION_THRESHOLD']
-        )
+        # Intersection layout
+        self.approaches = get_approaches(self.config)
+        self.phases = get_phases(self.config, self.approaches)
+        self.timing = get_timing_policy(self.config, self.phases)
+        
+        # Camera hubs are shared with the video feeds and acquired on start()
+        self.hubs = [None] * len(self.approaches)
         self.led_controller = LEDController(
             led_pin=self.config['LED_PIN'],
             led_count=self.config['LED_COUNT'],
-            brightness=self.config['LED_BRIGHTNESS']
+            brightness=self.config['LED_BRIGHTNESS'],
+            segments={approach.name: approach.leds for approach in self.approaches}
         )
         
+        # Write-behind storage so database latency never blocks switching
+        self._owns_writer = writer is None
+        if self._owns_writer:
+            writer = PersistenceWriter(
+                batch_size=self.config.get('PERSIST_BATCH_SIZE', 50),
+                flush_interval=self.config.get('PERSIST_FLUSH_INTERVAL', 1.0),
+                rollups=RollupAggregator(self.config['MAX_GREEN_TIME'])
+            )
+        self.writer = writer
+        
+        # Batched pruning of old events, off the control thread
+        self.retention = RetentionJob.from_config(self.config) if self._owns_writer else None
+        
         # Traffic state
-        self.current_green_direction = None
+        self.current_phase = None  # Index into self.phases while a phase is green
+        self.last_phase = None  # Most recently served phase (round-robin position)
         self.green_start_time = None
+        self.vehicle_counts = [0] * len(self.approaches)
+        self._waiting = [False] * len(self.approaches)  # Vehicles waiting at red
+        self.demands = [ApproachDemand() for _ in self.approaches]
+        
+        # Seeded traffic model that replaces the cameras in SIMULATION mode
+        self.simulation = None
+        self._simulation_start = None
+        
+        # Wake-up signalling for the event-driven control loop
+        self._wakeup = threading.Condition()
+        self._event_pending = False
+        self._event_time = None
+        self._last_checkpoint_time = 0
+        self.wakeups = 0
+        self.last_reaction_latency = None
         
-        logger.info("Traffic controller initialized")
+        logger.info(f"Traffic controller {intersection_id} initialized ({len(self.approaches)} approaches, "
+                    f"{len(self.phases)} phases)")
+    
+    @property
+    def current_green_directions(self):
+        """Names of the approaches that currently have GREEN."""
+        if self.current_phase is None:
+            return []
+        return [self.approaches[index].name for index in self.phases[self.current_phase]]
     
     def start(self):
         """Start the traffic control system."""
@@ -50,21 +122,36 @@ class TrafficController:
             return
         
         try:
+            watchdog.configure(self.config.get('SLOW_TICK_THRESHOLD', 1.0))
+            
             # Start cameras
             logger.info("Initializing vehicle detection...")
-            cam1_ok = self.detector_1.start()
-            cam2_ok = self.detector_2.start()
+            for approach in self.approaches:
+                hub = self._acquire_hub(approach)
+                hub.add_listener(self._on_detection)
+                self.hubs[approach.index] = hub
             
-            if not cam1_ok and not cam2_ok:
-                logger.info("No cameras detected. Running in SIMULATION mode with test data.")
+            self.simulation = None
+            if not any(hub.is_active for hub in self.hubs):
+                self._start_simulation()
+                logger.info(f"No cameras detected. Running in SIMULATION mode with "
+                            f"{self.config.get('SIMULATION_MODEL', 'poisson')} traffic.")
             
             # Start LED controller
             logger.info("Starting LED controller...")
             self.led_controller.start()
             
+            if self._owns_writer:
+                self.writer.start()
+                
+                retention_interval = self.config.get('RETENTION_INTERVAL', 3600)
+                if retention_interval:
+                    self.retention.start(retention_interval)
+            
             # Start control loop in separate thread
             self.is_running = True
-            self.control_thread = threading.Thread(target=self._control_loop, daemon=True)
+            self.control_thread = threading.Thread(target=self._control_loop,
+                                                   name=f'control-{self.intersection_id}', daemon=True)
             self.control_thread.start()
             
             logger.info("Traffic control system started successfully")
@@ -79,153 +166,347 @@ class TrafficController:
         logger.info("Stopping traffic control system...")
         self.is_running = False
         
+        # Wake the control loop so it exits immediately
+        with self._wakeup:
+            self._wakeup.notify_all()
+        
         # Wait for control thread to finish
         if self.control_thread and self.control_thread.is_alive():
             self.control_thread.join(timeout=5)
         
         # Stop components
-        self.detector_1.stop()
-        self.detector_2.stop()
+        for index, hub in enumerate(self.hubs):
+            if hub:
+                hub.remove_listener(self._on_detection)
+                release_hub(hub)
+                self.hubs[index] = None
         self.led_controller.stop()
         
+        # Flush queued events and status after the control loop has ended
+        if self._owns_writer:
+            self.retention.stop()
+            self.writer.stop()
+        
         logger.info("Traffic control system stopped")
     
+    def _acquire_hub(self, approach):
+        """
+        Subscribe to the shared frame hub for an approach's camera.
+        
+        Args:
+            approach: Approach from the intersection layout
+            
+        Returns:
+            FrameHub: Hub shared with the video feeds
+        """
+        return acquire_hub(
+            approach.camera,
+            process_worker=self.config.get('DETECTION_PROCESSES', False),
+            **get_detector_options(self.config, approach)
+        )
+
+    def _enqueue_event(self, **fields):
+        """
+        Queue a TrafficEvent of this intersection.
+        
+        Args:
+            **fields: TrafficEvent field values
+        """
+        self.writer.enqueue_event(intersection=self.intersection_id, **fields)
+
+    def _on_detection(self, hub, vehicle_count):
+        """
+        Wake the control loop when a camera's vehicle count changes.
+        
+        Args:
+            hub: FrameHub that published the change
+            vehicle_count: New vehicle count
+        """
+        with self._wakeup:
+            if self._event_time is None:
+                self._event_time = self.clock.monotonic()
+            self._event_pending = True
+            self._wakeup.notify()
+    
+    def _next_deadline(self):
+        """
+        Get the next timing deadline (MIN/MAX_GREEN_TIME, gap-out) of the active green phase.
+        
+        Returns:
+            float or None: Deadline as self.clock.time(), or None if no light is green
+        """
+        if self.current_phase is None:
+            return None
+        return self.timing.next_deadline(self.current_phase, self.demands,
+                                         self.green_start_time, self.clock.time())
+    
+    def _wait_for_next_event(self, simulation):
+        """
+        Sleep until a detection event, the next green deadline or the heartbeat.
+        
+        Args:
+            simulation: True when no camera pushes events (the traffic model is polled)
+        """
+        if simulation:
+            timeout = self.config['CHECK_INTERVAL']
+        else:
+            timeout = self.config.get('STATUS_CHECKPOINT_INTERVAL', 30)
+        
+        deadline = self._next_deadline()
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - self.clock.time()))
+        
+        with self._wakeup:
+            if not self._event_pending and self.is_running:
+                self._wakeup.wait(timeout)
+            self._event_pending = False
+    
     def _control_loop(self):
-        """Main control loop that runs in a separate thread."""
+        """
+        Main control loop that runs in a separate thread.
+        
+        The loop is event driven: it sleeps until a camera reports a changed
+        vehicle count, a green-time deadline expires or the status checkpoint
+        is due, so the lights react within one detection of an arrival.
+        """
         logger.info("Control loop started")
         
-        # Initial state: both lights RED
-        self.led_controller.set_red('direction_1')
-        self.led_controller.set_red('direction_2')
+        # Initial state: all lights RED
+        for approach in self.approaches:
+            self.led_controller.set_red(approach.name)
         
+        tick_key = f'control-{self.intersection_id}'
         while self.is_running:
             try:
-                # Check for vehicles in both directions
-                if self.detector_1.is_active or self.detector_2.is_active:
-                    # At least one camera is working
-                    vehicles_1, _ = self.detector_1.detect_vehicles()
-                    vehicles_2, _ = self.detector_2.detect_vehicles()
-                else:
-                    # No cameras - use simulation mode
-                    vehicles_1 = self.detector_1.get_test_detection()
-                    vehicles_2 = self.detector_2.get_test_detection()
+                watchdog.tick_started(tick_key)
+                self.wakeups += 1
+                with self._wakeup:
+                    event_time = self._event_time
+                    self._event_time = None
+                phase_before = self.current_phase
+                started = time.perf_counter()
+                
+                # Check for vehicles on every approach
+                counts, simulation = self._read_counts()
+                counted = time.perf_counter()
+                
+                self.step(counts)
+                decided = time.perf_counter()
                 
                 # Update system status
-                self._update_status(vehicles_1, vehicles_2)
+                self._update_status(counts)
+                finished = time.perf_counter()
                 
-                # Traffic logic
-                if self.current_green_direction is None:
-                    # No green light active, check for vehicles
-                    if vehicles_1 > 0:
-                        self._switch_to_green('direction_1', vehicles_1)
-                    elif vehicles_2 > 0:
-                        self._switch_to_green('direction_2', vehicles_2)
+                CONTROL_STAGE_SECONDS.observe(counted - started, self.intersection_id, 'read_counts')
+                CONTROL_STAGE_SECONDS.observe(decided - counted, self.intersection_id, 'decide')
+                CONTROL_STAGE_SECONDS.observe(finished - decided, self.intersection_id, 'status')
+                CONTROL_STAGE_SECONDS.observe(finished - started, self.intersection_id, 'tick')
                 
-                else:
-                    # Green light is active
-                    current_time = time.time()
-                    green_duration = current_time - self.green_start_time
-                    
-                    # Check if minimum green time has passed
-                    if green_duration >= self.config['MIN_GREEN_TIME']:
-                        # Check if we should switch
-                        if self.current_green_direction == 'direction_1':
-                            if vehicles_1 == 0:
-                                # No more vehicles in direction 1
-                                self._switch_to_red('direction_1')
-                                if vehicles_2 > 0:
-                                    self._switch_to_green('direction_2', vehicles_2)
-                            elif green_duration >= self.config['MAX_GREEN_TIME']:
-                                # Max time reached, switch anyway
-                                self._switch_to_red('direction_1')
-                                if vehicles_2 > 0:
-                                    self._switch_to_green('direction_2', vehicles_2)
-                        
-                        elif self.current_green_direction == 'direction_2':
-                            if vehicles_2 == 0:
-                                # No more vehicles in direction 2
-                                self._switch_to_red('direction_2')
-                                if vehicles_1 > 0:
-                                    self._switch_to_green('direction_1', vehicles_1)
-                            elif green_duration >= self.config['MAX_GREEN_TIME']:
-                                # Max time reached, switch anyway
-                                self._switch_to_red('direction_2')
-                                if vehicles_1 > 0:
-                                    self._switch_to_green('direction_1', vehicles_1)
+                if self.current_phase != phase_before and event_time is not None:
+                    self.last_reaction_latency = self.clock.monotonic() - event_time
+                    REACTION_SECONDS.observe(self.last_reaction_latency, self.intersection_id)
+                watchdog.tick_finished(tick_key)
                 
-                # Sleep before next check
-                time.sleep(self.config['CHECK_INTERVAL'])
+                # Sleep until something happens
+                self._wait_for_next_event(simulation)
                 
             except Exception as e:
+                watchdog.tick_finished(tick_key)
                 logger.error(f"Error in control loop: {e}")
                 time.sleep(1)
         
         # Ensure all lights are red when stopping
-        self.led_controller.set_red('direction_1')
-        self.led_controller.set_red('direction_2')
+        for approach in self.approaches:
+            self.led_controller.set_red(approach.name)
+        self._update_status([0] * len(self.approaches), force_checkpoint=True)
         logger.info("Control loop ended")
     
-    def _switch_to_green(self, direction, vehicle_count):
+    def step(self, counts):
+        """
+        Make one control decision for new vehicle counts.
+        
+        Updates the measured demand per approach, then ends the green phase
+        and/or starts the next one as the timing policy decides.
+        
+        Args:
+            counts: Vehicles per approach
+        """
+        self.vehicle_counts = counts
+        
+        # Measured demand per approach
+        now = self.clock.time()
+        green = self.phases[self.current_phase] if self.current_phase is not None else ()
+        window = self.config.get('ARRIVAL_RATE_WINDOW', 60)
+        for approach in self.approaches:
+            self._track_waiting(approach, counts[approach.index])
+            self.demands[approach.index].update(counts[approach.index], now,
+                                                approach.index in green, window)
+        
+        # Traffic logic
+        if self.current_phase is None:
+            # No green light active, serve the next phase with vehicles
+            self._start_next_phase(counts, now)
+        
+        elif self.timing.should_end(self.current_phase, self.demands, self.green_start_time, now):
+            # Green phase is done (queue served, gap-out or maximum green time)
+            ended_phase = self.current_phase
+            self._end_phase()
+            self._start_next_phase(counts, now, exclude=ended_phase)
+    
+    def _read_counts(self):
+        """
+        Read the vehicle counts from the cameras, or from the traffic model
+        while no camera is active.
+        
+        Returns:
+            tuple: (vehicles per approach, True when the counts are simulated)
+        """
+        if any(hub is not None and hub.is_active for hub in self.hubs):
+            # At least one camera is working - read the shared results
+            return [hub.get_latest()[0] if hub is not None else 0 for hub in self.hubs], False
+        # No cameras - use simulation mode
+        return self._simulated_counts(), True
+    
+    def _start_simulation(self):
+        """Create the seeded traffic model that stands in for the cameras."""
+        self.simulation = model_from_config(self.config)
+        self._simulation_start = self.clock.time()
+    
+    def _simulated_counts(self):
+        """
+        Read the vehicle counts of the simulated traffic model.
+        
+        The model is created on first use, so cameras that stop working
+        after start() fall back to simulation instead of stalling the loop.
+        
+        Returns:
+            list: Detected vehicles per approach
+        """
+        if self.simulation is None:
+            logger.warning("All cameras are inactive. Falling back to SIMULATION mode.")
+            self._start_simulation()
+        green = self.phases[self.current_phase] if self.current_phase is not None else ()
+        self.simulation.advance(self.clock.time() - self._simulation_start, green)
+        return self.simulation.counts()
+    
+    def _start_next_phase(self, counts, now, exclude=None):
+        """
+        Give GREEN to the phase the timing policy picks, if any has vehicles.
+        
+        Args:
+            counts: Vehicles per approach
+            now: Current self.clock.time()
+            exclude: Phase that must not be chosen (the one that just ended)
+        """
+        phase = self.timing.choose_phase(self.demands, self.last_phase, exclude, now)
+        if phase is not None:
+            self._switch_to_green(phase, counts)
+    
+    def _track_waiting(self, approach, vehicle_count):
         """
-        Switch specified direction to GREEN.
+        Log when vehicles start or stop waiting at a red light.
         
         Args:
-            direction: 'direction_1' or 'direction_2'
+            approach: Approach from the intersection layout
             vehicle_count: Number of vehicles detected
         """
-        self.current_green_direction = direction
-        self.green_start_time = time.time()
-        self.led_controller.set_green(direction)
-        
-        # Log event
-        direction_name = 'DIRECTION_1' if direction == 'direction_1' else 'DIRECTION_2'
-        TrafficEvent.objects.create(
-            direction=direction_name,
-            event_type='LIGHT_CHANGE',
-            description=f'Light changed to GREEN for {direction_name}',
-            vehicles_detected=vehicle_count,
-            light_state='GREEN'
-        )
+        if self.current_phase is not None and approach.index in self.phases[self.current_phase]:
+            return
         
-        logger.info(f"{direction} switched to GREEN ({vehicle_count} vehicles detected)")
+        if vehicle_count > 0 and not self._waiting[approach.index]:
+            self._waiting[approach.index] = True
+            self._enqueue_event(
+                direction=approach.label,
+                event_type='VEHICLE_DETECTED',
+                description=f'Vehicles waiting at RED for {approach.label}',
+                vehicles_detected=vehicle_count,
+                light_state='RED'
+            )
+        elif vehicle_count == 0 and self._waiting[approach.index]:
+            self._waiting[approach.index] = False
+            self._enqueue_event(
+                direction=approach.label,
+                event_type='NO_VEHICLE',
+                description=f'Vehicles left {approach.label} before GREEN',
+                light_state='RED'
+            )
     
-    def _switch_to_red(self, direction):
+    def _switch_to_green(self, phase, counts):
         """
-        Switch specified direction to RED.
+        Switch the approaches of a phase to GREEN.
         
         Args:
-            direction: 'direction_1' or 'direction_2'
+            phase: Index into self.phases
+            counts: Vehicles per approach
         """
-        self.led_controller.set_red(direction)
-        self.current_green_direction = None
-        self.green_start_time = None
+        self.current_phase = phase
+        self.last_phase = phase
+        self.green_start_time = self.clock.time()
         
-        # Log event
-        direction_name = 'DIRECTION_1' if direction == 'direction_1' else 'DIRECTION_2'
-        TrafficEvent.objects.create(
-            direction=direction_name,
-            event_type='LIGHT_CHANGE',
-            description=f'Light changed to RED for {direction_name}',
-            light_state='RED'
-        )
+        for index in self.phases[phase]:
+            approach = self.approaches[index]
+            self._waiting[index] = False
+            self.led_controller.set_green(approach.name)
+            
+            # Log event
+            self._enqueue_event(
+                direction=approach.label,
+                event_type='LIGHT_CHANGE',
+                description=f'Light changed to GREEN for {approach.label}',
+                vehicles_detected=counts[index],
+                light_state='GREEN'
+            )
+            logger.info(f"{approach.name} switched to GREEN ({counts[index]} vehicles detected)")
+    
+    def _end_phase(self):
+        """Switch the approaches of the current phase to RED."""
+        for index in self.phases[self.current_phase]:
+            approach = self.approaches[index]
+            self.led_controller.set_red(approach.name)
+            
+            # Log event
+            self._enqueue_event(
+                direction=approach.label,
+                event_type='LIGHT_CHANGE',
+                description=f'Light changed to RED for {approach.label}',
+                light_state='RED'
+            )
+            logger.info(f"{approach.name} switched to RED")
         
-        logger.info(f"{direction} switched to RED")
+        self.current_phase = None
+        self.green_start_time = None
     
-    def _update_status(self, vehicles_1, vehicles_2):
+    def _update_status(self, counts, force_checkpoint=False):
         """
-        Update system status in database.
+        Publish the live status and periodically checkpoint it to the database.
         
         Args:
-            vehicles_1: Number of vehicles in direction 1
-            vehicles_2: Number of vehicles in direction 2
+            counts: Vehicles per approach
+            force_checkpoint: Queue a database write regardless of the interval
         """
         try:
-            status, created = SystemStatus.objects.get_or_create(pk=1)
-            status.is_running = self.is_running
-            status.direction_1_light = self.led_controller.get_state('direction_1')
-            status.direction_2_light = self.led_controller.get_state('direction_2')
-            status.direction_1_vehicles = vehicles_1
-            status.direction_2_vehicles = vehicles_2
-            status.save()
+            approaches = [
+                {
+                    'name': approach.name,
+                    'light': self.led_controller.get_state(approach.name),
+                    'vehicles': counts[approach.index],
+                }
+                for approach in self.approaches
+            ]
+            fields = {'is_running': self.is_running, 'approaches': approaches}
+            
+            # The first two approaches also fill the classic two-way fields
+            for number, state in enumerate(approaches[:2], start=1):
+                fields[f'direction_{number}_light'] = state['light']
+                fields[f'direction_{number}_vehicles'] = state['vehicles']
+            
+            live_status.publish(intersection_id=self.intersection_id, **fields)
+            
+            # The database row is only a periodic checkpoint of the live status
+            now = self.clock.time()
+            interval = self.config.get('STATUS_CHECKPOINT_INTERVAL', 30)
+            if force_checkpoint or now - self._last_checkpoint_time >= interval:
+                self.writer.enqueue_status(intersection=self.intersection_id, **fields)
+                self._last_checkpoint_time = now
         except Exception as e:
             logger.error(f"Error updating status: {e}")
@@ -1,12 +1,23 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 
-urlpatterns = [
+# Routes of one intersection; served at the root for the default intersection
+# and under /i/<intersection_id>/ for every configured intersection
+intersection_patterns = [
     path('', views.dashboard, name='dashboard'),
     path('api/status/', views.get_status, name='get_status'),
     path('api/events/', views.get_events, name='get_events'),
+    path('api/stats/', views.get_traffic_stats, name='get_traffic_stats'),
     path('api/start/', views.start_system, name='start_system'),
     path('api/stop/', views.stop_system, name='stop_system'),
-    path('video/feed/1/', views.video_feed_1, name='video_feed_1'),
-    path('video/feed/2/', views.video_feed_2, name='video_feed_2'),
+    path('api/events/stream/', views.status_stream, name='status_stream'),
+    path('video/feed/<int:number>/', views.video_feed, name='video_feed'),
+]
+
+urlpatterns = intersection_patterns + [
+    path('api/streams/', views.get_stream_stats, name='get_stream_stats'),
+    path('metrics', views.metrics, name='metrics'),
+    path('api/profile/', views.profile, name='profile'),
+    path('api/profile/slow-ticks/', views.get_slow_ticks, name='get_slow_ticks'),
+    path('i/<slug:intersection_id>/', include((intersection_patterns, 'intersection'))),
 ]
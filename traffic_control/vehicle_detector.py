@@ -5,41 +5,144 @@ Detects vehicles in video stream from cameras
 import cv2
 import numpy as np
 import logging
+import threading
+import time
 from datetime import datetime
+from .detector_backends import create_backend
+from .vehicle_tracker import VehicleTracker
+from .video_sources import ReplaySource, is_replay_source
+from .metrics import DETECTOR_STAGE_SECONDS
 
 logger = logging.getLogger('traffic_control')
 
+# Size of the grayscale thumbnail used by the motion gate
+GATE_THUMBNAIL_SIZE = (64, 48)
+
+# Grey-level change for a thumbnail pixel to count as active
+GATE_PIXEL_DELTA = 10
+
+
+def get_detector_options(config, approach):
+    """
+    Build VehicleDetector keyword arguments for an approach from TRAFFIC_CONFIG.
+    
+    Args:
+        config: TRAFFIC_CONFIG dictionary
+        approach: Approach from intersection.get_approaches()
+        
+    Returns:
+        dict: Keyword arguments (everything except camera_index)
+    """
+    return {
+        'detection_threshold': config['DETECTION_THRESHOLD'],
+        'threaded_capture': config.get('THREADED_CAPTURE', True),
+        'roi': approach.roi,
+        'detection_scale': config.get('DETECTION_SCALE', 1.0),
+        'motion_gate_threshold': config.get('MOTION_GATE_THRESHOLD'),
+        'motion_gate_max_skip': config.get('MOTION_GATE_MAX_SKIP', 30),
+        'tracking': config.get('TRACKING_ENABLED', True),
+        'tracker_options': {
+            'iou_threshold': config.get('TRACK_IOU_THRESHOLD', 0.3),
+            'max_age': config.get('TRACK_MAX_AGE', 1.5),
+            'min_hits': config.get('TRACK_MIN_HITS', 2),
+        },
+        'backend': config.get('DETECTOR_BACKEND', 'motion'),
+        'dnn_options': {
+            'model_path': config.get('DNN_MODEL_PATH'),
+            'model_format': config.get('DNN_MODEL_FORMAT', 'yolov8'),
+            'input_size': config.get('DNN_INPUT_SIZE', 320),
+            'nms_threshold': config.get('DNN_NMS_THRESHOLD', 0.45),
+        },
+        'replay_options': {
+            'playback': config.get('REPLAY_PLAYBACK', 'realtime'),
+            'fps': config.get('REPLAY_FPS'),
+            'loop': config.get('REPLAY_LOOP', True),
+        },
+    }
+
 
 class VehicleDetector:
     """Detects vehicles using OpenCV's pre-trained models."""
     
-    def __init__(self, camera_index=0, detection_threshold=0.3):
+    def __init__(self, camera_index=0, detection_threshold=0.3, threaded_capture=True,
+                 roi=None, detection_scale=1.0, motion_gate_threshold=None,
+                 motion_gate_max_skip=30, tracking=False, tracker_options=None,
+                 backend='motion', dnn_options=None, replay_options=None):
         """
         Initialize vehicle detector.
         
         Args:
-            camera_index: Camera device index
+            camera_index: Camera device index, or path of a video file or
+                 image directory to replay
             detection_threshold: Confidence threshold for detection (0-1)
+            threaded_capture: Read frames in a background grabber thread
+            roi: Region of interest polygon as [(x, y), ...] in frame pixels,
+                 or None to use the whole frame
+            detection_scale: Resize factor applied before detection (0-1]
+            motion_gate_threshold: Minimum thumbnail activity (percent of
+                 changed pixels) for a frame to reach the full detector,
+                 or None to run it on every frame
+            motion_gate_max_skip: Run full detection at least every N frames
+            tracking: Count tracked vehicles instead of raw per-frame detections
+            tracker_options: VehicleTracker arguments
+            backend: Detection backend name ('motion' or 'dnn')
+            dnn_options: DNNBackend arguments including model_path
+            replay_options: ReplaySource arguments for a recorded source
         """
         self.camera_index = camera_index
+        self.metrics_label = str(camera_index)
         self.detection_threshold = detection_threshold
+        self.is_replay = is_replay_source(camera_index)
+        self.replay_options = replay_options or {}
+        # A replay source decodes ahead and paces frames itself
+        self.threaded_capture = threaded_capture and not self.is_replay
+        self.roi = roi
+        self.detection_scale = detection_scale
         self.cap = None
         self.is_active = False
         
-        # Load YOLO or use Haar Cascades (simplified for this example)
-        # In production, use YOLOv5/v8 or MobileNet SSD for better accuracy
-        # Note: haarcascade_car.xml is not included in OpenCV by default
-        self.car_cascade = None  # Disabled - use motion detection instead
+        # Background capture state (single-slot buffer holding the newest frame)
+        self.capture_thread = None
+        self._frame_lock = threading.Lock()
+        self._latest_frame = None
+        self._latest_frame_time = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.last_frame_age = None
+        self._frame_timestamp = None  # Capture (or media) time of the frame being processed
+        self._last_result = (0, None)
         
-        # Background subtractor for motion detection as fallback
-        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
-            history=500,
-            varThreshold=16,
-            detectShadows=True
+        # Detection algorithm (MOG2 motion by default, or a shared ONNX model)
+        self.backend = create_backend(
+            backend,
+            detection_threshold=detection_threshold,
+            roi=roi,
+            detection_scale=detection_scale,
+            dnn_options=dnn_options
         )
+        self._roi_polygon = np.array(roi, dtype=np.float32) if roi else None
+        
+        # Cheap motion gate in front of the full detector
+        self.motion_gate_threshold = motion_gate_threshold
+        self.motion_gate_max_skip = motion_gate_max_skip
+        self.frames_gated = 0
+        self.frames_processed = 0
+        self.last_activity = None
+        self._frames_since_detect = 0
+        self._last_count = 0
+        self._thumb_bgr = None
+        self._thumb_gray = None
+        self._prev_thumb = None
+        self._thumb_diff = None
+        
+        # Tracker turning per-frame boxes into persistent vehicles
+        self.tracker = VehicleTracker(**(tracker_options or {})) if tracking else None
     
     def start(self):
         """Start the camera capture."""
+        if self.is_replay:
+            return self._start_replay()
+        
         try:
             # Suppress OpenCV warnings during camera initialization
             import os
@@ -74,24 +177,140 @@ class VehicleDetector:
             self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce latency
             
             self.is_active = True
+            
+            self.backend.attach()
+            
+            if self.threaded_capture:
+                self.capture_thread = threading.Thread(target=self._capture_loop,
+                                                       name=f'capture-{self.camera_index}', daemon=True)
+                self.capture_thread.start()
+            
             logger.info(f"Camera Module {self.camera_index} started successfully (640x480@30fps)")
             return True
         except Exception as e:
             logger.info(f"Camera {self.camera_index} not available: {e}")
             return False
     
+    def _start_replay(self):
+        """Open recorded footage as the camera."""
+        try:
+            self.cap = ReplaySource(self.camera_index, **self.replay_options)
+            if not self.cap.isOpened():
+                logger.warning(f"Recording {self.camera_index} could not be opened")
+                self.cap.release()
+                self.cap = None
+                return False
+            
+            self.is_active = True
+            self.backend.attach()
+            logger.info(f"Replaying {self.camera_index} ({self.cap.playback} playback, {self.cap.fps:g} fps)")
+            return True
+        except Exception as e:
+            logger.error(f"Error opening recording {self.camera_index}: {e}")
+            return False
+    
     def stop(self):
         """Stop the camera capture and release resources."""
+        if self.is_active:
+            self.backend.detach()
         self.is_active = False
+        
+        # Wait for the grabber thread before releasing the device it reads from
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=2)
+        self.capture_thread = None
+        
         if self.cap:
             self.cap.release()
             self.cap = None
+        
+        with self._frame_lock:
+            self._latest_frame = None
+            self._latest_frame_time = None
+        self._last_result = (0, None)
+        if self.tracker:
+            self.tracker.reset()
         logger.info(f"Camera {self.camera_index} stopped")
     
+    def _capture_loop(self):
+        """Continuously grab frames, keeping only the newest one."""
+        logger.info(f"Capture thread for camera {self.camera_index} started")
+        
+        while self.is_active:
+            try:
+                ret, frame = self.cap.read()
+                if not ret or frame is None:
+                    time.sleep(0.01)
+                    continue
+                
+                with self._frame_lock:
+                    if self._latest_frame is not None:
+                        # Previous frame was never consumed - drop it
+                        self.frames_dropped += 1
+                    self._latest_frame = frame
+                    self._latest_frame_time = time.monotonic()
+                    self.frames_captured += 1
+                    
+            except Exception as e:
+                logger.error(f"Error capturing frame from camera {self.camera_index}: {e}")
+                time.sleep(0.1)
+        
+        logger.info(f"Capture thread for camera {self.camera_index} ended")
+    
+    def _read_frame(self):
+        """
+        Get the next frame to process.
+        
+        Returns:
+            ndarray or None: The frame, or None if no new frame is available
+        """
+        if not self.threaded_capture:
+            ret, frame = self.cap.read()
+            if not ret:
+                return None
+            self.last_frame_age = 0.0
+            self._frame_timestamp = self.cap.position if self.is_replay else time.monotonic()
+            return frame
+        
+        with self._frame_lock:
+            frame = self._latest_frame
+            captured_at = self._latest_frame_time
+            self._latest_frame = None
+        
+        if frame is not None:
+            self.last_frame_age = time.monotonic() - captured_at
+            self._frame_timestamp = captured_at
+        return frame
+    
+    def get_capture_stats(self):
+        """
+        Get capture statistics for this camera.
+        
+        Returns:
+            dict: Frames captured/dropped/gated/processed and age of the last
+                  processed frame
+        """
+        replay = self.cap.get_stats() if self.is_replay and self.cap else None
+        return {
+            'camera_index': self.camera_index,
+            'threaded_capture': self.threaded_capture,
+            'frames_captured': replay['frames_read'] if replay else self.frames_captured,
+            'frames_dropped': replay['frames_dropped'] if replay else self.frames_dropped,
+            'last_frame_age': self.last_frame_age,
+            'frames_processed': self.frames_processed,
+            'frames_gated': self.frames_gated,
+            'last_activity': self.last_activity,
+            'tracking': self.get_tracking_state(),
+            'replay': replay,
+        }
+    
     def detect_vehicles(self):
         """
         Detect vehicles in the current frame.
         
+        With threaded capture this never waits for the camera: if no new
+        frame arrived since the last call, the previous result is returned.
+        
         Returns:
             tuple: (vehicle_count, frame) - Number of vehicles detected and the frame
         """
@@ -99,74 +318,141 @@ class VehicleDetector:
             return 0, None
         
         try:
-            ret, frame = self.cap.read()
-            if not ret or frame is None:
+            started = time.perf_counter()
+            frame = self._read_frame()
+            if frame is None:
+                if self.threaded_capture:
+                    # No new frame yet - reuse the last result
+                    return self._last_result
                 # Camera not working - return 0 silently
                 return 0, None
+            captured = time.perf_counter()
+            DETECTOR_STAGE_SECONDS.observe(captured - started, self.metrics_label, 'capture')
+            
+            passes_gate = self._passes_motion_gate(frame)
+            if self.motion_gate_threshold is not None:
+                DETECTOR_STAGE_SECONDS.observe(time.perf_counter() - captured, self.metrics_label, 'motion_gate')
             
-            # Use motion-based detection
-            # For production on Raspberry Pi, replace with YOLO or MobileNet SSD
-            vehicle_count = self._detect_by_motion(frame)
+            if passes_gate:
+                vehicle_count = self._detect(frame)
+                self._last_count = vehicle_count
+                self._frames_since_detect = 0
+                self.frames_processed += 1
+            else:
+                # Scene is static - reuse the last count
+                vehicle_count = self._last_count
+                self._frames_since_detect += 1
+                self.frames_gated += 1
             
+            self._last_result = (vehicle_count, frame)
             return vehicle_count, frame
             
         except Exception as e:
             logger.error(f"Error detecting vehicles: {e}")
             return 0, None
     
-    def _detect_by_motion(self, frame):
+    def _passes_motion_gate(self, frame):
         """
-        Detect vehicles based on motion.
+        Decide whether a frame is worth running the full detector on.
+        
+        Compares a tiny grayscale thumbnail with the previous one; costs a
+        fraction of a millisecond even on the Pi.
         
         Args:
             frame: Current video frame
             
         Returns:
-            int: Estimated number of vehicles (0 or 1 for simplified detection)
+            bool: True if the full detector should run
+        """
+        if self.motion_gate_threshold is None:
+            return True
+        
+        if self._thumb_gray is None:
+            width, height = GATE_THUMBNAIL_SIZE
+            self._thumb_bgr = np.empty((height, width, 3), dtype=np.uint8)
+            self._thumb_gray = np.empty((height, width), dtype=np.uint8)
+            self._prev_thumb = np.empty((height, width), dtype=np.uint8)
+            self._thumb_diff = np.empty((height, width), dtype=np.uint8)
+            cv2.resize(frame, GATE_THUMBNAIL_SIZE, dst=self._thumb_bgr, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._thumb_bgr, cv2.COLOR_BGR2GRAY, dst=self._prev_thumb)
+            return True
+        
+        cv2.resize(frame, GATE_THUMBNAIL_SIZE, dst=self._thumb_bgr, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._thumb_bgr, cv2.COLOR_BGR2GRAY, dst=self._thumb_gray)
+        cv2.absdiff(self._thumb_gray, self._prev_thumb, dst=self._thumb_diff)
+        cv2.threshold(self._thumb_diff, GATE_PIXEL_DELTA, 255, cv2.THRESH_BINARY, dst=self._thumb_diff)
+        self.last_activity = 100.0 * cv2.countNonZero(self._thumb_diff) / self._thumb_diff.size
+        
+        # Current thumbnail becomes the reference for the next frame
+        self._thumb_gray, self._prev_thumb = self._prev_thumb, self._thumb_gray
+        
+        if self.last_activity >= self.motion_gate_threshold:
+            return True
+        # Keep the background model fed even when nothing moves
+        return self._frames_since_detect >= self.motion_gate_max_skip
+    
+    def _detect(self, frame):
+        """
+        Run the detection backend and draw the vehicle boxes on the frame.
+        
+        With tracking enabled the count is the number of confirmed tracks,
+        which stays stable when a vehicle is missed for a frame or two.
+        
+        Args:
+            frame: Current video frame
+            
+        Returns:
+            int: Number of vehicles detected
         """
         try:
-            # Apply background subtraction
-            fg_mask = self.bg_subtractor.apply(frame)
-            
-            # Remove shadows and noise
-            _, fg_mask = cv2.threshold(fg_mask, 244, 255, cv2.THRESH_BINARY)
-            
-            # Morphological operations to remove noise
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
-            
-            # Find contours
-            contours, _ = cv2.findContours(
-                fg_mask,
-                cv2.RETR_EXTERNAL,
-                cv2.CHAIN_APPROX_SIMPLE
-            )
-            
-            # Count significant contours (potential vehicles)
-            min_area = 1000  # Minimum area for a vehicle
-            vehicle_count = 0
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > min_area:
-                    vehicle_count += 1
+            started = time.perf_counter()
+            boxes = self.backend.detect(frame)
+            detected = time.perf_counter()
+            if self.backend.stage_times:
+                for stage, seconds in self.backend.stage_times:
+                    DETECTOR_STAGE_SECONDS.observe(seconds, self.metrics_label, stage)
+            else:
+                DETECTOR_STAGE_SECONDS.observe(detected - started, self.metrics_label, 'inference')
+            
+            if self._roi_polygon is not None and not self.backend.applies_roi:
+                # Count only vehicles whose centre lies on the approach lane
+                boxes = [
+                    box for box in boxes
+                    if cv2.pointPolygonTest(
+                        self._roi_polygon, (box[0] + box[2] / 2, box[1] + box[3] / 2), False
+                    ) >= 0
+                ]
+            
+            if self.tracker is None:
+                for x, y, w, h, confidence in boxes:
                     # Draw bounding box
-                    x, y, w, h = cv2.boundingRect(contour)
                     cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+                return len(boxes)
             
-            return vehicle_count
+            # Recordings are tracked in media time, whatever the playback speed
+            timestamp = self._frame_timestamp if self._frame_timestamp is not None else time.monotonic()
+            self.tracker.update(boxes, timestamp)
+            for track_id, (x, y, w, h), dwell in self.tracker.get_tracks():
+                # Draw bounding box with the persistent track ID
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+                cv2.putText(frame, f'#{track_id}', (x, max(y - 5, 10)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+            DETECTOR_STAGE_SECONDS.observe(time.perf_counter() - detected, self.metrics_label, 'tracking')
+            return self.tracker.queue_length
             
         except Exception as e:
-            logger.error(f"Error in motion detection: {e}")
+            logger.error(f"Error in vehicle detection: {e}")
             return 0
     
-    def get_test_detection(self):
+    def get_tracking_state(self):
         """
-        Simulate vehicle detection for testing without cameras.
+        Get the tracked scene for this camera.
         
         Returns:
-            int: Random vehicle count (0 or 1)
+            dict or None: Presence, queue length and dwell times, or None
+                          if tracking is disabled
         """
-        import random
-        return random.choice([0, 0, 0, 1])  # 25% chance of detecting a vehicle
+        if self.tracker is None:
+            return None
+        return self.tracker.get_state()
+
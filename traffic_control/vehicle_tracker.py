@@ -0,0 +1,221 @@
+"""
+Vehicle Tracker Module
+Associates per-frame detections into persistent vehicle tracks
+"""
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Compute pairwise intersection-over-union of two sets of boxes.
+
+    Args:
+        boxes_a: Array (N, 4) of (x, y, w, h)
+        boxes_b: Array (M, 4) of (x, y, w, h)
+
+    Returns:
+        ndarray: Array (N, M) of IoU values
+    """
+    ax1, ay1 = boxes_a[:, 0:1], boxes_a[:, 1:2]
+    ax2, ay2 = ax1 + boxes_a[:, 2:3], ay1 + boxes_a[:, 3:4]
+    bx1, by1 = boxes_b[:, 0], boxes_b[:, 1]
+    bx2, by2 = bx1 + boxes_b[:, 2], by1 + boxes_b[:, 3]
+
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = inter_w * inter_h
+
+    area_a = boxes_a[:, 2:3] * boxes_a[:, 3:4]
+    area_b = boxes_b[:, 2] * boxes_b[:, 3]
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def centroid_distances(boxes_a, boxes_b):
+    """
+    Compute pairwise distances between box centroids.
+
+    Args:
+        boxes_a: Array (N, 4) of (x, y, w, h)
+        boxes_b: Array (M, 4) of (x, y, w, h)
+
+    Returns:
+        ndarray: Array (N, M) of distances in pixels
+    """
+    centres_a = boxes_a[:, :2] + boxes_a[:, 2:] / 2
+    centres_b = boxes_b[:, :2] + boxes_b[:, 2:] / 2
+    return np.linalg.norm(centres_a[:, None, :] - centres_b[None, :, :], axis=2)
+
+
+def greedy_match(scores, threshold):
+    """
+    Greedily pair rows and columns by descending score.
+
+    Args:
+        scores: Array (N, M), higher is better
+        threshold: Minimum score for a pair
+
+    Returns:
+        list: (row, column) pairs
+    """
+    scores = scores.copy()
+    pairs = []
+    for _ in range(min(scores.shape)):
+        flat = np.argmax(scores)
+        row, col = divmod(int(flat), scores.shape[1])
+        if scores[row, col] < threshold:
+            break
+        pairs.append((row, col))
+        scores[row, :] = -np.inf
+        scores[:, col] = -np.inf
+    return pairs
+
+
+class VehicleTracker:
+    """
+    Lightweight IoU/centroid tracker.
+
+    Detections are matched to existing tracks first by IoU and then, for fast
+    movers whose boxes no longer overlap, by centroid distance. A track is
+    confirmed after min_hits detections and survives max_age seconds without
+    one, which smooths out single-frame detection dropouts.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_distance=80, max_age=1.5, min_hits=2):
+        """
+        Initialize tracker.
+
+        Args:
+            iou_threshold: Minimum IoU to continue a track
+            max_distance: Maximum centroid jump in pixels for a non-overlapping match
+            max_age: Seconds a track is kept without a matching detection
+            min_hits: Detections needed before a track counts as a vehicle
+        """
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.reset()
+
+    def reset(self):
+        """Forget all tracks."""
+        # Track table, one row per track
+        self._ids = np.empty(0, dtype=np.int64)
+        self._boxes = np.empty((0, 4), dtype=np.float32)
+        self._first_seen = np.empty(0, dtype=np.float64)
+        self._last_seen = np.empty(0, dtype=np.float64)
+        self._hits = np.empty(0, dtype=np.int32)
+        self._next_id = 1
+        self._now = 0.0
+        self._publish()
+
+    def update(self, boxes, timestamp):
+        """
+        Feed the detections of one frame.
+
+        Args:
+            boxes: Iterable of (x, y, w, h) or (x, y, w, h, confidence)
+            timestamp: Frame time in seconds (monotonic)
+        """
+        self._now = timestamp
+        detections = np.array([box[:4] for box in boxes], dtype=np.float32).reshape(-1, 4)
+        matched_tracks = np.zeros(len(self._ids), dtype=bool)
+        matched_detections = np.zeros(len(detections), dtype=bool)
+
+        if len(self._ids) and len(detections):
+            # First pass: overlap
+            for row, col in greedy_match(iou_matrix(self._boxes, detections), self.iou_threshold):
+                matched_tracks[row] = matched_detections[col] = True
+                self._continue_track(row, detections[col])
+
+            # Second pass: centroid distance for what is left
+            rows = np.flatnonzero(~matched_tracks)
+            cols = np.flatnonzero(~matched_detections)
+            if len(rows) and len(cols):
+                distances = centroid_distances(self._boxes[rows], detections[cols])
+                for row, col in greedy_match(-distances, -self.max_distance):
+                    matched_tracks[rows[row]] = matched_detections[cols[col]] = True
+                    self._continue_track(rows[row], detections[cols[col]])
+
+        # Drop tracks that have not been seen for too long
+        alive = matched_tracks | (timestamp - self._last_seen <= self.max_age)
+        if not alive.all():
+            self._ids = self._ids[alive]
+            self._boxes = self._boxes[alive]
+            self._first_seen = self._first_seen[alive]
+            self._last_seen = self._last_seen[alive]
+            self._hits = self._hits[alive]
+
+        # Start tracks for new detections
+        new = detections[~matched_detections]
+        if len(new):
+            count = len(new)
+            self._ids = np.concatenate([self._ids, np.arange(self._next_id, self._next_id + count)])
+            self._next_id += count
+            self._boxes = np.concatenate([self._boxes, new])
+            self._first_seen = np.concatenate([self._first_seen, np.full(count, timestamp)])
+            self._last_seen = np.concatenate([self._last_seen, np.full(count, timestamp)])
+            self._hits = np.concatenate([self._hits, np.ones(count, dtype=np.int32)])
+
+        self._publish()
+
+    def _publish(self):
+        """
+        Publish the confirmed tracks for readers on other threads.
+
+        update() swaps the track arrays one by one, so request threads read
+        this snapshot instead; it is replaced with a single assignment and
+        never modified afterwards.
+        """
+        confirmed = self._confirmed()
+        self._snapshot = (self._ids[confirmed].copy(), self._boxes[confirmed].copy(),
+                          self._first_seen[confirmed].copy(), self._now)
+
+    def _continue_track(self, row, box):
+        """Move a track to its newly matched detection."""
+        self._boxes[row] = box
+        self._last_seen[row] = self._now
+        self._hits[row] += 1
+
+    def _confirmed(self):
+        """Boolean mask of tracks that count as vehicles."""
+        return self._hits >= self.min_hits
+
+    @property
+    def queue_length(self):
+        """Number of confirmed vehicles currently tracked."""
+        return len(self._snapshot[0])
+
+    @property
+    def presence(self):
+        """True if at least one confirmed vehicle is tracked."""
+        return len(self._snapshot[0]) > 0
+
+    def get_tracks(self):
+        """
+        Get the confirmed tracks.
+
+        Returns:
+            list: (track_id, (x, y, w, h), dwell_seconds) per vehicle
+        """
+        ids, boxes, first_seen, now = self._snapshot
+        return [
+            (int(track_id), tuple(int(v) for v in box), float(now - seen))
+            for track_id, box, seen in zip(ids, boxes, first_seen)
+        ]
+
+    def get_state(self):
+        """
+        Get a summary of the tracked scene.
+
+        Returns:
+            dict: Presence, queue length and dwell times
+        """
+        ids, _, first_seen, now = self._snapshot
+        dwell = now - first_seen
+        return {
+            'presence': bool(len(ids)),
+            'queue_length': len(ids),
+            'max_dwell': float(dwell.max()) if len(dwell) else 0.0,
+            'tracks': {int(track_id): round(float(d), 2)
+                       for track_id, d in zip(ids, dwell)},
+        }
@@ -0,0 +1,265 @@
+"""
+Video Sources Module
+Recorded footage (video files or image sequences) as a camera replacement
+"""
+import os
+import queue
+import threading
+import time
+import logging
+import cv2
+
+logger = logging.getLogger('traffic_control')
+
+# How recorded frames are paced:
+#   realtime - at the recording's own timestamps, dropping frames the reader is too slow for
+#   fast     - as fast as the reader consumes them, never dropping
+#   fixed    - at a fixed frame rate (REPLAY_FPS), dropping like realtime
+PLAYBACK_MODES = ('realtime', 'fast', 'fixed')
+
+# Files of a directory source that are read as an image sequence
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Frame rate assumed when a recording does not report one
+DEFAULT_FPS = 30.0
+
+
+def is_replay_source(source):
+    """
+    Check whether a camera setting names recorded footage instead of a device.
+
+    Args:
+        source: Camera index, or path of a video file or image directory
+
+    Returns:
+        bool: True for a path
+    """
+    return isinstance(source, (str, os.PathLike)) and not str(source).isdigit()
+
+
+class ReplaySource:
+    """
+    Plays a video file (mp4, mjpeg, ...) or a directory of images like a camera.
+
+    Offers the subset of the cv2.VideoCapture interface VehicleDetector uses
+    (isOpened, read, set, get, release). Frames are decoded ahead in a
+    background thread into a small queue; read() hands them out paced by the
+    playback mode. Every frame carries its media timestamp (position, in
+    seconds), so time-based logic such as the tracker's max age sees the
+    recording's time even when it is played faster than real time.
+    """
+
+    def __init__(self, path, playback='realtime', fps=None, loop=False,
+                 frame_size=(640, 480), buffer_frames=8):
+        """
+        Initialize replay source and start decoding.
+
+        Args:
+            path: Video file or directory of images (sorted by name)
+            playback: One of PLAYBACK_MODES
+            fps: Frame rate for 'fixed' playback and for images (defaults to
+                 the recording's rate)
+            loop: Start over at the end of the recording
+            frame_size: Resize frames to (width, height) like a configured
+                 camera, so ROIs keep their meaning; None keeps the original size
+            buffer_frames: Frames decoded ahead
+
+        Raises:
+            ValueError: If the playback mode is unknown
+        """
+        if playback not in PLAYBACK_MODES:
+            raise ValueError(f"Unknown playback mode: {playback} (expected one of {PLAYBACK_MODES})")
+        self.path = str(path)
+        self.playback = playback
+        self.loop = loop
+        self.frame_size = tuple(frame_size) if frame_size else None
+
+        self._images = None
+        self._capture = None
+        if os.path.isdir(self.path):
+            self._images = sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            native_fps = None
+        else:
+            self._capture = cv2.VideoCapture(self.path)
+            native_fps = self._capture.get(cv2.CAP_PROP_FPS) if self._capture.isOpened() else None
+        self.native_fps = native_fps if native_fps and native_fps > 0 else None
+        self.fps = fps or self.native_fps or DEFAULT_FPS
+
+        # Media timestamp of the last frame handed out
+        self.position = None
+        self.frames_decoded = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.loops = 0
+        self.finished = False
+
+        self._queue = queue.Queue(maxsize=max(1, buffer_frames))
+        self._stop_event = threading.Event()
+        self._playback_origin = None  # time.monotonic() minus the media time it corresponds to
+        self._decode_thread = None
+        if self.isOpened():
+            self._decode_thread = threading.Thread(target=self._decode_loop,
+                                                   name=f'replay-{os.path.basename(self.path)}',
+                                                   daemon=True)
+            self._decode_thread.start()
+
+    def isOpened(self):
+        """Check whether the recording could be opened."""
+        if self._images is not None:
+            return bool(self._images)
+        return self._capture is not None and self._capture.isOpened()
+
+    def set(self, prop, value):
+        """Capture properties of a recording cannot be changed."""
+        return False
+
+    def get(self, prop):
+        """
+        Get a capture property.
+
+        Args:
+            prop: cv2.CAP_PROP_* constant
+
+        Returns:
+            float: Property value (0 if unsupported)
+        """
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_read)
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return 1000.0 * (self.position or 0.0)
+        return 0.0
+
+    def _frames(self):
+        """
+        Decode the recording once.
+
+        Yields:
+            tuple: (frame, media time in seconds from the start)
+        """
+        if self._images is not None:
+            for index, image_path in enumerate(self._images):
+                frame = cv2.imread(image_path)
+                if frame is None:
+                    logger.warning(f"Skipping unreadable image {image_path}")
+                    continue
+                yield frame, index / self.fps
+            return
+
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        index = 0
+        last_time = None
+        while not self._stop_event.is_set():
+            ok, frame = self._capture.read()
+            if not ok or frame is None:
+                return
+            if self.playback == 'fixed' or self.native_fps is None:
+                media_time = index / self.fps
+            else:
+                # Container timestamps keep variable-rate recordings accurate
+                media_time = self._capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if last_time is not None and media_time <= last_time:
+                    media_time = last_time + 1.0 / self.native_fps
+            last_time = media_time
+            index += 1
+            yield frame, media_time
+
+    def _decode_loop(self):
+        """Decode frames ahead into the queue until the end or stop."""
+        offset = 0.0
+        try:
+            while not self._stop_event.is_set():
+                media_time = None
+                for frame, media_time in self._frames():
+                    if self.frame_size and (frame.shape[1], frame.shape[0]) != self.frame_size:
+                        frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+                    self.frames_decoded += 1
+                    if not self._put((frame, offset + media_time)):
+                        return
+                if not self.loop or media_time is None:
+                    break
+                # Continue the media clock across the loop seamlessly
+                offset += media_time + 1.0 / self.fps
+                self.loops += 1
+        except Exception as e:
+            logger.error(f"Error decoding {self.path}: {e}")
+        self._put(None)
+
+    def _put(self, item):
+        """Queue an item, giving up when the source is released."""
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(self):
+        """
+        Get the next frame, waiting until it is due in realtime/fixed playback.
+
+        Returns:
+            tuple: (ok, frame) like cv2.VideoCapture.read()
+        """
+        while not self.finished:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                # Decoder stalled (slow storage) - report no frame like a camera would
+                return False, None
+            if item is None:
+                self.finished = True
+                logger.info(f"Replay of {self.path} finished ({self.frames_read} frames)")
+                break
+
+            frame, media_time = item
+            if self.playback != 'fast':
+                now = time.monotonic()
+                if self._playback_origin is None:
+                    self._playback_origin = now - media_time
+                due = self._playback_origin + media_time
+                if now - due > 1.0 / self.fps:
+                    # The reader fell behind - drop the frame as a live camera would
+                    self.frames_dropped += 1
+                    continue
+                if due > now:
+                    time.sleep(due - now)
+
+            self.position = media_time
+            self.frames_read += 1
+            return True, frame
+        return False, None
+
+    def release(self):
+        """Stop decoding and close the recording."""
+        self._stop_event.set()
+        if self._decode_thread and self._decode_thread.is_alive():
+            self._decode_thread.join(timeout=2)
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def get_stats(self):
+        """
+        Get replay statistics.
+
+        Returns:
+            dict: Playback mode, position and frame counters
+        """
+        return {
+            'path': self.path,
+            'playback': self.playback,
+            'fps': self.fps,
+            'position': self.position,
+            'frames_decoded': self.frames_decoded,
+            'frames_read': self.frames_read,
+            'frames_dropped': self.frames_dropped,
+            'buffered': self._queue.qsize(),
+            'loops': self.loops,
+            'finished': self.finished,
+        }
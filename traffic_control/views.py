@@ -1,233 +1,600 @@
 from django.shortcuts import render
-from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponse, HttpResponseNotModified, Http404
 from django.views.decorators.csrf import csrf_exempt
+from django.core.handlers.asgi import ASGIRequest
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import Q
 from datetime import timedelta
-from .models import TrafficEvent, SystemStatus
-from .traffic_controller import TrafficController
-from .vehicle_detector import VehicleDetector
+from .models import TrafficEvent, SystemStatus, TrafficRollup
+from .rollups import PERIOD_FLOORS, ROLLUP_FIELDS
+from .supervisor import Supervisor
+from .frame_hub import stop_all_hubs, get_hub_stats
+from .vehicle_detector import get_detector_options
+from .intersection import get_approaches, direction_labels
+from . import stream_broadcaster
+from . import live_status
+from . import event_stream
+from . import metrics as metrics_registry
+from . import profiling
+import base64
+import csv
 import json
-import cv2
-import time
+import queue
 
-# Global traffic controller instance
-traffic_controller = None
+# Global supervisor hosting the traffic controller of every intersection
+supervisor = Supervisor(settings.TRAFFIC_CONFIG)
 
-# Global camera instances for video streaming
-stream_camera_1 = None
-stream_camera_2 = None
+
+def _resolve_intersection(intersection_id):
+    """
+    Resolve the intersection of a request.
+    
+    Args:
+        intersection_id: ID from the /i/<intersection_id>/ URL, or None for the root URLs
+    
+    Returns:
+        tuple: (intersection_id, intersection config)
+    
+    Raises:
+        Http404: If the intersection is not configured
+    """
+    if intersection_id is None:
+        intersection_id = supervisor.default_intersection
+    config = supervisor.get_config(intersection_id)
+    if config is None:
+        raise Http404('Unknown intersection')
+    return intersection_id, config
+
+
+def _current_status(intersection_id):
+    """
+    Get the live status snapshot, seeding it from the database checkpoint once.
+    
+    Args:
+        intersection_id: Intersection identifier
+    
+    Returns:
+        StatusSnapshot: Current status snapshot
+    """
+    snapshot = live_status.get_snapshot(intersection_id)
+    if snapshot is None:
+        status = SystemStatus.objects.filter(intersection=intersection_id).first()
+        if status:
+            snapshot = live_status.publish(
+                intersection_id=intersection_id,
+                last_update=status.last_update,
+                is_running=status.is_running,
+                direction_1_light=status.direction_1_light,
+                direction_2_light=status.direction_2_light,
+                direction_1_vehicles=status.direction_1_vehicles,
+                direction_2_vehicles=status.direction_2_vehicles,
+                approaches=status.approaches,
+            )
+        else:
+            snapshot = live_status.publish(intersection_id=intersection_id)
+    return snapshot
 
 
-def dashboard(request):
+def dashboard(request, intersection_id=None):
     """Main dashboard view."""
+    base_url = '' if intersection_id is None else f'/i/{intersection_id}'
+    intersection_id, config = _resolve_intersection(intersection_id)
     try:
-        status = SystemStatus.objects.first()
-        if not status:
-            status = SystemStatus.objects.create()
+        status = _current_status(intersection_id).data
     except Exception:
         status = None
     
-    recent_events = TrafficEvent.objects.all()[:20]
+    # One card per approach with its last known light and vehicle count
+    states = {state['name']: state for state in (status or {}).get('approaches', [])}
+    approaches = []
+    for approach in get_approaches(config):
+        state = states.get(approach.name, {})
+        if not state and approach.number <= 2 and status:
+            state = {'light': status[f'direction_{approach.number}_light'],
+                     'vehicles': status[f'direction_{approach.number}_vehicles']}
+        approaches.append({
+            'name': approach.name,
+            'number': approach.number,
+            'light': state.get('light', 'RED'),
+            'vehicles': state.get('vehicles', 0),
+        })
+    
+    recent_events = TrafficEvent.objects.filter(intersection=intersection_id)[:20]
     
     context = {
         'status': status,
+        'approaches': approaches,
         'recent_events': recent_events,
+        'push_updates': config.get('DASHBOARD_PUSH', True),
+        'intersection_id': intersection_id,
+        'intersections': list(supervisor.intersections),
+        'base_url': base_url,
     }
     return render(request, 'dashboard.html', context)
 
 
-def get_status(request):
-    """API endpoint to get current system status."""
+def get_status(request, intersection_id=None):
+    """API endpoint to get current system status (served from memory)."""
+    intersection_id, _ = _resolve_intersection(intersection_id)
     try:
-        status = SystemStatus.objects.first()
-        if not status:
-            status = SystemStatus.objects.create()
+        snapshot = _current_status(intersection_id)
         
-        data = {
-            'is_running': status.is_running,
-            'direction_1_light': status.direction_1_light,
-            'direction_2_light': status.direction_2_light,
-            'direction_1_vehicles': status.direction_1_vehicles,
-            'direction_2_vehicles': status.direction_2_vehicles,
-            'last_update': status.last_update.isoformat(),
-        }
-        return JsonResponse(data)
+        # Unchanged since the client's last poll
+        if snapshot.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot.body, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        response['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-def get_events(request):
-    """API endpoint to get recent traffic events."""
+# Columns returned by /api/events/ (JSON keys, NDJSON keys and CSV header)
+EVENT_COLUMNS = ('id', 'timestamp') + event_stream.EVENT_FIELDS
+
+# Largest page /api/events/ returns in JSON mode
+MAX_EVENTS_PAGE = 1000
+
+
+def _encode_cursor(timestamp, event_id):
+    """Encode the position after an event as an opaque cursor."""
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{event_id}'.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """
+    Decode a cursor from _encode_cursor.
+    
+    Returns:
+        tuple: (timestamp, event_id)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        timestamp = parse_datetime(timestamp)
+        event_id = int(event_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if timestamp is None:
+        raise ValueError('Invalid cursor')
+    return timestamp, event_id
+
+
+def _filter_events(params, intersection_id, config):
+    """
+    Build the event query for /api/events/ parameters.
+    
+    Events are ordered newest first on (timestamp, id) and the cursor is a
+    keyset position in that order, so every page is an index range scan on
+    the timestamp (or direction, timestamp) index instead of an OFFSET. Ties
+    are broken by ascending id, the order in which those indexes already
+    store rows with equal timestamps, so no extra sort is needed.
+    
+    Args:
+        params: Query parameters (hours, direction, event_type, cursor)
+        intersection_id: Intersection identifier
+        config: Intersection config (for the valid directions)
+    
+    Returns:
+        QuerySet: Filtered and ordered TrafficEvent query
+    
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    hours = int(params.get('hours', 24))
+    events = TrafficEvent.objects.filter(
+        intersection=intersection_id,
+        timestamp__gte=timezone.now() - timedelta(hours=hours)
+    )
+    
+    direction = params.get('direction')
+    if direction:
+        if direction not in direction_labels(config):
+            raise ValueError(f'Unknown direction: {direction}')
+        events = events.filter(direction=direction)
+    
+    event_type = params.get('event_type')
+    if event_type:
+        if event_type not in dict(TrafficEvent.EVENT_TYPES):
+            raise ValueError(f'Unknown event type: {event_type}')
+        events = events.filter(event_type=event_type)
+    
+    cursor = params.get('cursor')
+    if cursor:
+        timestamp, event_id = _decode_cursor(cursor)
+        # Written as a range plus exclusion rather than an OR so SQLite
+        # keeps a single index range scan in index order
+        events = events.filter(timestamp__lte=timestamp).exclude(
+            Q(timestamp=timestamp) & Q(id__lte=event_id)
+        )
+    
+    return events.order_by('-timestamp', 'id').values_list(*EVENT_COLUMNS)
+
+
+class _Echo:
+    """File-like object that returns what is written, for streaming csv output."""
+    
+    def write(self, value):
+        return value
+
+
+def _export_events(events, export_format):
+    """
+    Stream events as NDJSON or CSV with constant memory.
+    
+    Args:
+        events: values_list query from _filter_events
+        export_format: 'ndjson' or 'csv'
+    
+    Returns:
+        StreamingHttpResponse: Export response
+    """
+    rows = events.iterator(chunk_size=2000)
+    
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        
+        def generate():
+            yield writer.writerow(EVENT_COLUMNS)
+            for row in rows:
+                yield writer.writerow((row[0], row[1].isoformat()) + row[2:])
+        
+        content_type = 'text/csv'
+    else:
+        def generate():
+            for row in rows:
+                record = dict(zip(EVENT_COLUMNS, row))
+                record['timestamp'] = row[1].isoformat()
+                yield json.dumps(record) + '\n'
+        
+        content_type = 'application/x-ndjson'
+    
+    response = StreamingHttpResponse(generate(), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="traffic_events.{export_format}"'
+    return response
+
+
+def get_events(request, intersection_id=None):
+    """
+    API endpoint to get traffic events.
+    
+    Query parameters: hours, direction, event_type, cursor, limit and
+    format ('json' pages, or 'ndjson'/'csv' to stream the whole range).
+    """
+    intersection_id, config = _resolve_intersection(intersection_id)
     try:
-        limit = int(request.GET.get('limit', 50))
-        hours = int(request.GET.get('hours', 24))
+        events = _filter_events(request.GET, intersection_id, config)
         
-        since = timezone.now() - timedelta(hours=hours)
-        events = TrafficEvent.objects.filter(timestamp__gte=since)[:limit]
+        export_format = request.GET.get('format', 'json')
+        if export_format in ('ndjson', 'csv'):
+            return _export_events(events, export_format)
+        if export_format != 'json':
+            raise ValueError(f'Unknown format: {export_format}')
+        
+        limit = min(max(int(request.GET.get('limit', 50)), 1), MAX_EVENTS_PAGE)
+        rows = list(events[:limit + 1])
+        
+        # The extra row only tells whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1][1], rows[-1][0])
         
         data = {
             'events': [
-                {
-                    'timestamp': event.timestamp.isoformat(),
-                    'direction': event.direction,
-                    'event_type': event.event_type,
-                    'description': event.description,
-                    'vehicles_detected': event.vehicles_detected,
-                    'light_state': event.light_state,
-                }
-                for event in events
-            ]
+                dict(zip(EVENT_COLUMNS, row), timestamp=row[1].isoformat())
+                for row in rows
+            ],
+            'next_cursor': next_cursor,
         }
         return JsonResponse(data)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@csrf_exempt
-def start_system(request):
-    """API endpoint to start the traffic control system."""
-    global traffic_controller
+# Longest range /api/stats/ answers from minute rollups by default (hours)
+MINUTE_RESOLUTION_HOURS = 3
+
+
+def get_traffic_stats(request, intersection_id=None):
+    """
+    API endpoint to get traffic statistics from the rollup tables.
     
+    Query parameters: hours (default 24), direction and resolution
+    ('minute' or 'hour'; minute for ranges up to MINUTE_RESOLUTION_HOURS).
+    The cost depends on the number of buckets in the range, not on the
+    number of events.
+    """
+    intersection_id, config = _resolve_intersection(intersection_id)
+    try:
+        hours = float(request.GET.get('hours', 24))
+        if hours <= 0:
+            raise ValueError('hours must be positive')
+        
+        resolution = request.GET.get('resolution')
+        if resolution is None:
+            resolution = 'minute' if hours <= MINUTE_RESOLUTION_HOURS else 'hour'
+        period = resolution.upper()
+        if period not in PERIOD_FLOORS:
+            raise ValueError(f'Unknown resolution: {resolution}')
+        
+        until = timezone.now()
+        since = PERIOD_FLOORS[period](until - timedelta(hours=hours))
+        rollups = TrafficRollup.objects.filter(
+            period=period, intersection=intersection_id, period_start__gte=since
+        )
+        
+        direction = request.GET.get('direction')
+        if direction:
+            if direction not in direction_labels(config):
+                raise ValueError(f'Unknown direction: {direction}')
+            rollups = rollups.filter(direction=direction)
+        
+        series = []
+        totals = {}
+        for row in rollups.values('period_start', 'direction', *ROLLUP_FIELDS):
+            total = totals.setdefault(row['direction'], dict.fromkeys(ROLLUP_FIELDS, 0))
+            for name in ROLLUP_FIELDS:
+                total[name] += row[name]
+            row['period_start'] = row['period_start'].isoformat()
+            series.append(row)
+        
+        for total in totals.values():
+            total['average_wait'] = total['wait_seconds'] / total['waits'] if total['waits'] else None
+        
+        return JsonResponse({
+            'resolution': resolution,
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'totals': totals,
+            'series': series,
+        })
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+def start_system(request, intersection_id=None):
+    """API endpoint to start the traffic control system of an intersection."""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST method required'}, status=405)
     
+    intersection_id, _ = _resolve_intersection(intersection_id)
     try:
-        if traffic_controller and traffic_controller.is_running:
+        if not supervisor.start(intersection_id):
             return JsonResponse({'message': 'System already running'})
         
-        traffic_controller = TrafficController()
-        traffic_controller.start()
-        
         # Update system status
-        status = SystemStatus.objects.first()
-        if not status:
-            status = SystemStatus.objects.create()
+        live_status.publish(intersection_id=intersection_id, is_running=True)
+        status, _ = SystemStatus.objects.get_or_create(intersection=intersection_id)
         status.is_running = True
         status.save()
         
-        # Log event
-        TrafficEvent.objects.create(
-            direction='BOTH',
-            event_type='SYSTEM_START',
-            description='Traffic control system started'
-        )
-        
         return JsonResponse({'message': 'System started successfully'})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
 @csrf_exempt
-def stop_system(request):
-    """API endpoint to stop the traffic control system."""
-    global traffic_controller, stream_camera_1, stream_camera_2
-    
+def stop_system(request, intersection_id=None):
+    """API endpoint to stop the traffic control system of an intersection."""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST method required'}, status=405)
     
+    intersection_id, _ = _resolve_intersection(intersection_id)
     try:
-        if traffic_controller:
-            traffic_controller.stop()
-            traffic_controller = None
-        
-        # Stop streaming cameras
-        if stream_camera_1:
-            stream_camera_1.stop()
-            stream_camera_1 = None
-        if stream_camera_2:
-            stream_camera_2.stop()
-            stream_camera_2 = None
+        supervisor.stop(intersection_id)
+        
+        # Release cameras still held by video feeds once no intersection runs
+        if not supervisor.controllers:
+            stop_all_hubs()
         
         # Update system status
-        status = SystemStatus.objects.first()
+        live_status.publish(
+            intersection_id=intersection_id,
+            is_running=False,
+            direction_1_light='RED',
+            direction_2_light='RED'
+        )
+        status = SystemStatus.objects.filter(intersection=intersection_id).first()
         if status:
             status.is_running = False
             status.direction_1_light = 'RED'
             status.direction_2_light = 'RED'
             status.save()
         
-        # Log event
-        TrafficEvent.objects.create(
-            direction='BOTH',
-            event_type='SYSTEM_STOP',
-            description='Traffic control system stopped'
-        )
-        
         return JsonResponse({'message': 'System stopped successfully'})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-def generate_frames(camera_index):
-    """Generate frames for video streaming."""
-    global stream_camera_1, stream_camera_2
-    
-    # Get or create camera instance
-    if camera_index == 0:
-        if stream_camera_1 is None:
-            from django.conf import settings
-            stream_camera_1 = VehicleDetector(
-                camera_index=settings.TRAFFIC_CONFIG['CAMERA_DIRECTION_1']
-            )
-            stream_camera_1.start()
-        camera = stream_camera_1
+def status_stream(request, intersection_id=None):
+    """
+    Server-Sent Events endpoint pushing status changes and traffic events.
+    
+    Clients resume after the Last-Event-ID header (sent by EventSource on
+    reconnect) or the last_event_id query parameter. Under ASGI the stream
+    is served by an async generator so idle clients do not hold a thread.
+    """
+    intersection_id, _ = _resolve_intersection(intersection_id)
+    try:
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    
+    try:
+        # Seed the snapshot here - async streams must not touch the database
+        _current_status(intersection_id)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
+    def snapshot_message(message_id):
+        snapshot = live_status.get_snapshot(intersection_id)
+        return event_stream.encode_message(message_id, 'status', snapshot.body)
+    
+    if isinstance(request, ASGIRequest):
+        messages = event_stream.stream_async(last_id, snapshot_message, intersection_id)
     else:
-        if stream_camera_2 is None:
-            from django.conf import settings
-            stream_camera_2 = VehicleDetector(
-                camera_index=settings.TRAFFIC_CONFIG['CAMERA_DIRECTION_2']
-            )
-            stream_camera_2.start()
-        camera = stream_camera_2
-    
-    while True:
-        try:
-            if camera and camera.is_active:
-                vehicle_count, frame = camera.detect_vehicles()
-                
-                if frame is not None:
-                    # Add vehicle count overlay
-                    cv2.putText(frame, f'Vehicles: {vehicle_count}', 
-                               (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
-                               1, (0, 255, 0), 2)
-                    
-                    # Add camera label
-                    label = f'Camera {camera_index + 1}'
-                    cv2.putText(frame, label, 
-                               (10, frame.shape[0] - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 
-                               0.7, (255, 255, 255), 2)
-                    
-                    # Encode frame as JPEG
-                    ret, buffer = cv2.imencode('.jpg', frame, 
-                                              [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                else:
-                    # No frame available - send placeholder
-                    time.sleep(0.1)
-            else:
-                # Camera not active - send placeholder or break
-                time.sleep(0.1)
-        except Exception as e:
-            print(f"Error generating frame: {e}")
-            time.sleep(0.1)
-
-
-def video_feed_1(request):
-    """Video streaming endpoint for camera 1."""
-    return StreamingHttpResponse(
-        generate_frames(0),
-        content_type='multipart/x-mixed-replace; boundary=frame'
+        messages = event_stream.stream(last_id, snapshot_message, intersection_id)
+    
+    response = StreamingHttpResponse(messages, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def generate_frames(approach, config):
+    """Generate frames for video streaming."""
+    # Subscribe to the broadcaster that encodes each frame once for all viewers
+    broadcaster, client = stream_broadcaster.subscribe(
+        approach.camera,
+        label=f'Camera {approach.number}',
+        jpeg_quality=config.get('STREAM_JPEG_QUALITY', 85),
+        process_worker=config.get('DETECTION_PROCESSES', False),
+        **get_detector_options(config, approach)
     )
+    
+    try:
+        while broadcaster.is_running:
+            try:
+                chunk = client.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            client.frames_sent += 1
+            yield chunk
+    finally:
+        # Client disconnected or camera stopped
+        stream_broadcaster.unsubscribe(broadcaster, client)
 
 
-def video_feed_2(request):
-    """Video streaming endpoint for camera 2."""
+def video_feed(request, number, intersection_id=None):
+    """Video streaming endpoint for the camera of approach `number` (1-based)."""
+    intersection_id, config = _resolve_intersection(intersection_id)
+    approaches = get_approaches(config)
+    if not 1 <= number <= len(approaches):
+        raise Http404('Unknown approach')
     return StreamingHttpResponse(
-        generate_frames(1),
+        generate_frames(approaches[number - 1], config),
         content_type='multipart/x-mixed-replace; boundary=frame'
     )
+
+
+def get_stream_stats(request):
+    """API endpoint to get video stream viewer and camera pipeline statistics."""
+    try:
+        return JsonResponse({
+            'streams': stream_broadcaster.get_stream_stats(),
+            'cameras': get_hub_stats(),
+            'events': event_stream.get_stats(),
+            'supervisor': supervisor.get_stats(),
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def metrics(request):
+    """Prometheus endpoint with stage latency histograms and camera, database and stream gauges."""
+    try:
+        hubs = get_hub_stats()
+        streams = stream_broadcaster.get_stream_stats()
+        events = event_stream.get_stats()
+        writer = supervisor.writer.get_stats()
+        
+        lines = metrics_registry.render_histograms()
+        lines += metrics_registry.render_samples(
+            'traffic_intersection_running', 'Whether the controller of an intersection is running', 'gauge',
+            [({'intersection': intersection_id}, supervisor.is_running(intersection_id))
+             for intersection_id in supervisor.intersections])
+        lines += metrics_registry.render_samples(
+            'traffic_camera_fps', 'Frames per second processed per camera', 'gauge',
+            [({'camera': hub['camera_index']}, hub.get('fps')) for hub in hubs])
+        lines += metrics_registry.render_samples(
+            'traffic_camera_frames_total', 'Frames processed and published per camera', 'counter',
+            [({'camera': hub['camera_index']}, hub.get('frames_published')) for hub in hubs])
+        lines += metrics_registry.render_samples(
+            'traffic_camera_frames_dropped_total', 'Captured frames dropped before detection per camera',
+            'counter', [({'camera': hub['camera_index']}, hub.get('frames_dropped')) for hub in hubs])
+        lines += metrics_registry.render_samples(
+            'traffic_persistence_queue_depth', 'Events and status updates waiting for the database writer',
+            'gauge', [({}, writer['queue_depth'])])
+        lines += metrics_registry.render_samples(
+            'traffic_persistence_events_written_total', 'Events written to the database', 'counter',
+            [({}, writer['events_written'])])
+        lines += metrics_registry.render_samples(
+            'traffic_persistence_items_dropped_total', 'Writes dropped because the queue was full', 'counter',
+            [({}, writer['items_dropped'])])
+        lines += metrics_registry.render_samples(
+            'traffic_persistence_events_dropped_total', 'Events dropped after failed database flushes',
+            'counter', [({}, writer['events_dropped'])])
+        lines += metrics_registry.render_samples(
+            'traffic_video_stream_clients', 'Connected MJPEG viewers per camera', 'gauge',
+            [({'camera': stream['camera_index']}, stream['viewers']) for stream in streams])
+        lines += metrics_registry.render_samples(
+            'traffic_slow_ticks_total', 'Control and detection ticks longer than SLOW_TICK_THRESHOLD',
+            'counter', [({}, profiling.watchdog.slow_ticks)])
+        lines += metrics_registry.render_samples(
+            'traffic_event_stream_clients', 'Connected Server-Sent Events clients per intersection', 'gauge',
+            [({'intersection': intersection_id}, stats['clients']) for intersection_id, stats in events.items()])
+        
+        return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+    except Exception as e:
+        return HttpResponse(f'# error: {e}\n', status=500, content_type='text/plain; charset=utf-8')
+
+
+@csrf_exempt
+def profile(request):
+    """
+    API endpoint that samples thread stacks for a while and returns them collapsed.
+    
+    POST only, since it blocks the request for the profile's duration. Form
+    fields: seconds (default 3, at most PROFILE_MAX_SECONDS), threads
+    (comma-separated groups: control, capture, streaming, persistence or
+    all; default control,capture,streaming) and interval (seconds between
+    samples). The response is a collapsed-stack file for flamegraph.pl or
+    speedscope.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST method required'}, status=405)
+    
+    config = settings.TRAFFIC_CONFIG
+    max_seconds = config['PROFILE_MAX_SECONDS']
+    try:
+        seconds = float(request.POST.get('seconds', min(3, max_seconds)))
+        if not 0 < seconds <= max_seconds:
+            raise ValueError(f"seconds must be between 0 and {max_seconds}")
+        interval = max(float(request.POST.get('interval', config['PROFILE_INTERVAL'])), 0.001)
+        threads = request.POST.get('threads', 'control,capture,streaming')
+        groups = None if threads == 'all' else [group for group in threads.split(',') if group]
+        
+        stacks, samples = profiling.sample_profile(seconds, groups, interval)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except RuntimeError as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
+    response = HttpResponse(profiling.format_collapsed(stacks), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="profile-{timezone.now():%Y%m%d-%H%M%S}.folded"')
+    response['X-Profile-Samples'] = str(samples)
+    return response
+
+
+def get_slow_ticks(request):
+    """API endpoint with the stacks captured by the slow-tick watchdog."""
+    try:
+        return JsonResponse(profiling.watchdog.get_stats())
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
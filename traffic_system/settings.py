@@ -62,9 +62,21 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,  # Reuse each thread's connection instead of reconnecting per request
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# SQLite tuning applied to every new connection (see traffic_control/signals.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # Readers and the writer no longer block each other
+    'synchronous': 'NORMAL',  # fsync at WAL checkpoints only (safe with WAL, no corruption on power loss)
+    'busy_timeout': 20000,  # Milliseconds to wait for the write lock before "database is locked"
+    'mmap_size': 64 * 1024 * 1024,  # Read pages through a memory map instead of read() calls
+    'cache_size': -8000,  # Page cache per connection in KiB
+    'temp_store': 'MEMORY',  # Sorts and temporary indexes stay off the SD card
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -99,12 +111,59 @@ TRAFFIC_CONFIG = {
     'LED_PIN': 18,  # GPIO pin for LED strip
     'LED_COUNT': 6,  # Total LEDs (3 per direction)
     'LED_BRIGHTNESS': 255,
-    'CAMERA_DIRECTION_1': 0,  # Camera index for direction 1
+    'CAMERA_DIRECTION_1': 0,  # Camera index for direction 1, or a video file / image directory to replay
     'CAMERA_DIRECTION_2': 1,  # Camera index for direction 2
+    # Intersection layout. None = two approaches from the CAMERA_/ROI_DIRECTION_* keys
+    # (LEDs 0-2 and 3-5). Otherwise a list of approaches, e.g.
+    # [{'name': 'north', 'camera': 0, 'leds': [0, 1, 2], 'roi': None}, ...]
+    'APPROACHES': None,
+    'PHASES': None,  # Approach groups that may be green together, e.g. [['north', 'south'], ['east', 'west']]
+    # Several intersections in one process: {'main-st': {overrides}, 'oak-ave': {...}}, each
+    # merged over this dict (typically APPROACHES, PHASES, LED_PIN). None = one intersection
+    'INTERSECTIONS': None,
     'DETECTION_THRESHOLD': 0.3,  # Confidence threshold for vehicle detection
     'MIN_GREEN_TIME': 5,  # Minimum green light duration in seconds
     'MAX_GREEN_TIME': 60,  # Maximum green light duration in seconds
-    'CHECK_INTERVAL': 1,  # Check for vehicles every N seconds
+    'CHECK_INTERVAL': 1,  # Poll interval for simulated detections when no camera is available
+    'SIMULATION_MODEL': 'poisson',  # Traffic without cameras: 'poisson', 'rush-hour' or 'platoon' arrivals
+    'SIMULATION_RATES': [6, 2],  # Simulated (off-peak) arrivals per minute per approach (repeated to fit)
+    'SIMULATION_HEADWAY': 2.0,  # Seconds between simulated departures from a green approach
+    'SIMULATION_MISS_RATE': 0.0,  # Probability that the simulated detector misses a queued vehicle
+    'SIMULATION_SEED': None,  # Seed of the simulated traffic (None = different every run)
+    'TIMING_MODE': 'fixed',  # 'fixed' (round-robin, green until empty) or 'adaptive' (max-pressure + gap-out)
+    'GAP_OUT_TIME': 0.5,  # Adaptive: end green after the queue has read empty for this many seconds
+    'ARRIVAL_RATE_WINDOW': 60,  # Time constant (seconds) of the measured arrival rate per approach
+    'STATUS_CHECKPOINT_INTERVAL': 30,  # Copy the live status to the database every N seconds
+    'DASHBOARD_PUSH': True,  # Dashboard uses the Server-Sent Events stream instead of polling
+    'THREADED_CAPTURE': True,  # Grab frames in a background thread per camera
+    'REPLAY_PLAYBACK': 'realtime',  # Recorded sources: 'realtime', 'fast' (no pacing) or 'fixed' (REPLAY_FPS)
+    'REPLAY_FPS': None,  # Frame rate for 'fixed' playback and image directories (None = recording's rate / 30)
+    'REPLAY_LOOP': True,  # Start recorded sources over when they end
+    'STREAM_JPEG_QUALITY': 85,  # JPEG quality for the MJPEG video feeds
+    'DETECTION_SCALE': 0.5,  # Run detection at this fraction of the frame size
+    'ROI_DIRECTION_1': None,  # Approach lane polygon [(x, y), ...] or None for full frame
+    'ROI_DIRECTION_2': None,
+    'MOTION_GATE_THRESHOLD': 0.1,  # % of thumbnail pixels that must change to run full detection (None = always)
+    'MOTION_GATE_MAX_SKIP': 30,  # Run full detection at least every N frames
+    'TRACKING_ENABLED': True,  # Count tracked vehicles instead of raw per-frame contours
+    'TRACK_IOU_THRESHOLD': 0.3,  # Minimum overlap to continue a track
+    'TRACK_MAX_AGE': 1.5,  # Seconds a vehicle is remembered without a detection
+    'TRACK_MIN_HITS': 2,  # Detections before a track counts as a vehicle
+    'DETECTION_PROCESSES': False,  # Run each camera's capture and detection in its own process
+    'PERSIST_BATCH_SIZE': 50,  # Flush queued events/status once this many are pending
+    'PERSIST_FLUSH_INTERVAL': 1.0,  # ...or after this many seconds
+    'EVENT_RETENTION_DAYS': 30,  # Delete raw events older than this (rollups are kept)
+    'EVENT_ARCHIVE_DIR': BASE_DIR / 'archive',  # Compressed per-day archive of pruned events (None = delete only)
+    'RETENTION_BATCH_SIZE': 500,  # Events deleted per transaction
+    'RETENTION_INTERVAL': 3600,  # Seconds between in-process pruning runs (0 = management command only)
+    'DETECTOR_BACKEND': 'motion',  # 'motion' (MOG2) or 'dnn' (OpenCV dnn on an ONNX model)
+    'DNN_MODEL_PATH': BASE_DIR / 'models' / 'yolov8n.onnx',
+    'DNN_MODEL_FORMAT': 'yolov8',  # 'yolov5', 'yolov8' or 'ssd'
+    'DNN_INPUT_SIZE': 320,  # Square network input size in pixels
+    'DNN_NMS_THRESHOLD': 0.45,  # IoU threshold for non-maximum suppression
+    'SLOW_TICK_THRESHOLD': 1.0,  # Log the stack of control/detection ticks slower than this (seconds, 0 = off)
+    'PROFILE_MAX_SECONDS': 5,  # Longest profile /api/profile/ takes (it blocks a request worker)
+    'PROFILE_INTERVAL': 0.005,  # Seconds between stack samples of a profile
 }
 
 # Logging configuration